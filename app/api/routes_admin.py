@@ -1,13 +1,17 @@
 """Admin API routes for rate management"""
 from fastapi import APIRouter, Depends, HTTPException, Request
-from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
+from fastapi.responses import HTMLResponse, JSONResponse
 from app.config import settings
+from app.views.templating import templates
 from app.domain.rates import TaxRates
+from app.services import metrics
+from app.services.profiler import request_profiler
+from app.services.flight_recorder import flight_recorder
+from app.services.rates_cache import rates_cache
+from app.views.fragments import fragment_cache
 import yaml
 
 router = APIRouter()
-templates = Jinja2Templates(directory=str(settings.TEMPLATES_DIR))
 
 
 @router.get("/admin/rates", response_class=HTMLResponse)
@@ -57,6 +61,8 @@ async def update_rates(request: Request):
         
         # If successful, replace the original
         temp_path.replace(settings.TAX_RATES_PATH)
+        rates_cache.invalidate()
+        fragment_cache.invalidate()
         
     except Exception as e:
         # Clean up temp file if it exists
@@ -65,3 +71,104 @@ async def update_rates(request: Request):
         raise HTTPException(status_code=400, detail=f"Invalid rates structure: {str(e)}")
     
     return {"status": "success", "message": "Rates updated successfully"}
+
+
+@router.get("/admin/loop")
+async def admin_loop_stats(request: Request):
+    """Event loop lag histogram and stacks of recent blocking calls"""
+    if not settings.ADMIN_ENABLED:
+        raise HTTPException(status_code=403, detail="Admin interface disabled")
+    
+    loop_monitor = request.app.state.loop_monitor
+    if loop_monitor is None:
+        return {"running": False}
+    
+    return loop_monitor.snapshot()
+
+
+@router.get("/admin/engine-timings")
+async def admin_engine_timings(reset: bool = False):
+    """Sampled per-calculator latency summaries"""
+    if not settings.ADMIN_ENABLED:
+        raise HTTPException(status_code=403, detail="Admin interface disabled")
+    
+    timings = metrics.calculator_timings
+    if timings is None:
+        return {"enabled": False, "calculators": {}}
+    
+    summary = timings.summary()
+    if reset:
+        timings.reset()
+    
+    return {"enabled": True, "sample_every": timings.sample_every, "calculators": summary}
+
+
+@router.get("/admin/slow-requests")
+async def admin_slow_requests(reset: bool = False):
+    """Recent requests slower than the flight recorder threshold"""
+    if not settings.ADMIN_ENABLED:
+        raise HTTPException(status_code=403, detail="Admin interface disabled")
+    
+    snapshot = flight_recorder.snapshot()
+    if reset:
+        flight_recorder.clear()
+    
+    return snapshot
+
+
+@router.get("/admin/slow-requests/download")
+async def download_slow_requests():
+    """Flight recorder contents as a JSON file for offline replay"""
+    if not settings.ADMIN_ENABLED:
+        raise HTTPException(status_code=403, detail="Admin interface disabled")
+    
+    return JSONResponse(
+        flight_recorder.snapshot(),
+        headers={"Content-Disposition": 'attachment; filename="slow_requests.json"'},
+    )
+
+
+@router.post("/admin/profile")
+async def arm_profiler(route: str = "/calc", requests: int | None = None, seconds: float | None = None):
+    """Arm the sampling profiler for the next N requests or T seconds on a route"""
+    if not settings.ADMIN_ENABLED:
+        raise HTTPException(status_code=403, detail="Admin interface disabled")
+    
+    try:
+        return request_profiler.arm(route, requests=requests, seconds=seconds)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/admin/profile")
+async def profiler_status():
+    """Capture progress and the hottest functions sampled so far"""
+    if not settings.ADMIN_ENABLED:
+        raise HTTPException(status_code=403, detail="Admin interface disabled")
+    
+    return request_profiler.status()
+
+
+@router.delete("/admin/profile")
+async def disarm_profiler():
+    """Stop an in-progress capture, keeping its samples"""
+    if not settings.ADMIN_ENABLED:
+        raise HTTPException(status_code=403, detail="Admin interface disabled")
+    
+    request_profiler.disarm()
+    return request_profiler.status()
+
+
+@router.get("/admin/profile/download")
+async def download_profile():
+    """Aggregated capture as a speedscope file"""
+    if not settings.ADMIN_ENABLED:
+        raise HTTPException(status_code=403, detail="Admin interface disabled")
+    
+    if request_profiler.route is None:
+        raise HTTPException(status_code=404, detail="No profile captured")
+    
+    return JSONResponse(
+        request_profiler.export_speedscope(),
+        headers={"Content-Disposition": 'attachment; filename="bleedrate.speedscope.json"'},
+    )
@@ -1,38 +1,63 @@
 """Public API routes"""
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session
-from app.api.schemas import CalcRequest, CalcResponse, RatesResponse, ScenarioSaveRequest, ScenarioResponse
-from app.domain.rates import TaxRates
-from app.domain.profiles import PersonalProfile, ConsumptionProfile, TransportAndPropertyProfile, InvestmentProfile
+import csv
+import hashlib
+import io
+import json
+from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import JSONResponse, RedirectResponse, Response
+from app.api.schemas import (
+    CalcRequest, CalcResponse, RatesResponse, ResultResponse, ResultScenarioRequest,
+    ScenarioSaveRequest, ScenarioResponse,
+)
+from app.domain.profiles import build_profiles, flatten_profiles
 from app.domain.engine import TaxEngine
 from app.config import settings
+from app.services import flight_recorder, metrics
+from app.services.calc_query import canonical_query, parse_query
+from app.services.rates_cache import rates_cache
+from app.services.result_store import StoredResult, result_store
 from db.session import get_session
-from db.models import Scenario
 import yaml
 
 router = APIRouter()
 
 
-def get_tax_engine() -> TaxEngine:
+def get_tax_engine(http_request: Request) -> TaxEngine:
     """Dependency: Load tax rates and create engine"""
-    rates = TaxRates.load_from_yaml(settings.TAX_RATES_PATH)
-    return TaxEngine(rates)
+    with metrics.stage(http_request, "engine_lookup"):
+        rates, hit = rates_cache.get()
+        engine = TaxEngine(rates, instrumentation=metrics.engine_instrumentation)
+    flight_recorder.record_cache_status(http_request, "rates", hit)
+    metrics.set_rates_version(rates.version)
+    return engine
 
 
 @router.post("/api/calc", response_model=CalcResponse)
-def calculate_tax(request: CalcRequest, engine: TaxEngine = Depends(get_tax_engine)):
+def calculate_tax(
+    request: CalcRequest,
+    http_request: Request,
+    engine: TaxEngine = Depends(get_tax_engine)
+):
     """Calculate tax breakdown from user input"""
-    # Convert Pydantic models to domain profiles
-    personal = PersonalProfile(**request.personal.model_dump())
-    consumption = ConsumptionProfile(**request.consumption.model_dump())
-    transport_property = TransportAndPropertyProfile(**request.transport_property.model_dump())
-    investment = InvestmentProfile(**request.investment.model_dump())
+    metrics.mark_handler_start(http_request)
+    
+    # Convert Pydantic models to domain profiles the same way GET /api/calc does,
+    # so both forms include the (default) travel profile
+    profiles = build_profiles({
+        **request.personal.model_dump(),
+        **request.consumption.model_dump(),
+        **request.transport_property.model_dump(),
+        **request.investment.model_dump(),
+    })
+    flight_recorder.attach_inputs(http_request, flatten_profiles(profiles), engine.rates.version)
     
     # Run calculation
-    breakdown, total = engine.run(personal, consumption, transport_property, investment)
+    with metrics.stage(http_request, "engine_run"):
+        breakdown, total = engine.run(*profiles)
     
     # Calculate effective rate
-    gross_income = personal.annual_salary + personal.annual_bonus
+    gross_income = profiles[0].annual_salary + profiles[0].annual_bonus
     effective_rate = (total / gross_income * 100.0) if gross_income > 0 else 0.0
     
     return CalcResponse(
@@ -43,6 +68,71 @@ def calculate_tax(request: CalcRequest, engine: TaxEngine = Depends(get_tax_engi
     )
 
 
+def _etag_matches(header: str, etag: str) -> bool:
+    """Weak comparison, as If-None-Match requires"""
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip() == "*" or candidate.strip().removeprefix("W/") == opaque
+        for candidate in header.split(",")
+    )
+
+
+@router.get("/api/calc", response_model=CalcResponse)
+def calculate_tax_query(
+    http_request: Request,
+    engine: TaxEngine = Depends(get_tax_engine)
+):
+    """Cacheable GET form of /api/calc, taking flat profile fields as query parameters
+    
+    Non-canonical queries are redirected to the canonical URL (see
+    app.services.calc_query) so caches hold one copy per calculation. The
+    weak ETag covers the query and the rates version (a hash of the rates file
+    the engine loaded, also sent as X-Rates-Version), so it changes whenever
+    the rates do.
+    """
+    metrics.mark_handler_start(http_request)
+    
+    try:
+        inputs = parse_query(http_request.query_params.multi_items())
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    query = canonical_query(inputs)
+    if query != http_request.url.query:
+        return RedirectResponse(
+            f"{http_request.url.path}?{query}",
+            status_code=301,
+            headers={"Cache-Control": "public, max-age=86400"},
+        )
+    
+    digest = hashlib.blake2b(query.encode(), digest_size=8).hexdigest()
+    headers = {
+        "Cache-Control": f"public, max-age={settings.CALC_CACHE_MAX_AGE}",
+        "ETag": f'W/"{engine.rates.version}-{digest}"',
+        "Vary": "Accept-Encoding",
+        "X-Rates-Version": engine.rates.version,
+    }
+    if_none_match = http_request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    
+    profiles = build_profiles(inputs)
+    flight_recorder.attach_inputs(http_request, flatten_profiles(profiles), engine.rates.version)
+    with metrics.stage(http_request, "engine_run"):
+        breakdown, total = engine.run(*profiles)
+    
+    gross_income = profiles[0].annual_salary + profiles[0].annual_bonus
+    effective_rate = (total / gross_income * 100.0) if gross_income > 0 else 0.0
+    
+    response = CalcResponse(
+        breakdown=breakdown,
+        total=total,
+        effective_rate_vs_gross=effective_rate,
+        monthly_total=total / 12
+    )
+    return JSONResponse(response.model_dump(), headers=headers)
+
+
 @router.get("/api/rates", response_model=RatesResponse)
 def get_rates():
     """Get current tax rates"""
@@ -55,9 +145,11 @@ def get_rates():
 @router.post("/api/scenario", response_model=ScenarioResponse)
 def save_scenario(
     request: ScenarioSaveRequest,
-    session: Session = Depends(get_session)
+    session=Depends(get_session)
 ):
     """Save a calculation scenario"""
+    from db.models import Scenario
+    
     scenario = Scenario(
         label=request.label,
         inputs_json=request.calc_request.model_dump_json(),
@@ -78,8 +170,10 @@ def save_scenario(
 
 
 @router.get("/api/scenario/{scenario_id}", response_model=ScenarioResponse)
-def get_scenario(scenario_id: str, session: Session = Depends(get_session)):
+def get_scenario(scenario_id: str, session=Depends(get_session)):
     """Retrieve a saved scenario"""
+    from db.models import Scenario
+    
     scenario = session.get(Scenario, scenario_id)
     
     if not scenario:
@@ -92,3 +186,79 @@ def get_scenario(scenario_id: str, session: Session = Depends(get_session)):
         inputs=scenario.inputs,
         outputs=scenario.outputs
     )
+
+
+def get_stored_result(handle: str) -> StoredResult:
+    """Dependency: Look up a result handle issued by /calc"""
+    result = result_store.get(handle)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Result not found or expired")
+    return result
+
+
+def _calc_response(result: StoredResult) -> CalcResponse:
+    return CalcResponse(
+        breakdown=dict(result.breakdown),
+        total=result.total,
+        effective_rate_vs_gross=result.effective_rate,
+        monthly_total=result.monthly_total,
+    )
+
+
+@router.get("/api/results/{handle}", response_model=ResultResponse)
+def get_result(result: StoredResult = Depends(get_stored_result)):
+    """Fetch a stored calculation result"""
+    expires_at = datetime.fromtimestamp(result.created_at + result_store.ttl, tz=timezone.utc)
+    return ResultResponse(
+        **_calc_response(result).model_dump(),
+        handle=result.handle,
+        inputs=result.inputs,
+        rates_version=result.rates_version,
+        expires_at=expires_at.isoformat(),
+    )
+
+
+@router.get("/api/results/{handle}/export.csv")
+def export_result(result: StoredResult = Depends(get_stored_result)):
+    """Download a stored result's breakdown as CSV"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["category", "annual", "monthly", "share_percent"])
+    for category, amount in result.breakdown:
+        share = (amount / result.total * 100.0) if result.total > 0 else 0.0
+        writer.writerow([category, f"{amount:.2f}", f"{amount / 12:.2f}", f"{share:.1f}"])
+    writer.writerow(["Total", f"{result.total:.2f}", f"{result.monthly_total:.2f}", "100.0"])
+    
+    return Response(
+        buffer.getvalue(),
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="bleedrate-{result.handle}.csv"'},
+    )
+
+
+@router.post("/api/results/{handle}/scenario", response_model=ScenarioResponse)
+def save_result_scenario(
+    request: ResultScenarioRequest,
+    result: StoredResult = Depends(get_stored_result),
+    session=Depends(get_session)
+):
+    """Save a stored result as a scenario without recalculating it"""
+    from db.models import Scenario
+    
+    scenario = Scenario(
+        label=request.label,
+        inputs_json=json.dumps(result.inputs),
+        outputs_json=json.dumps({**_calc_response(result).model_dump(), "rates_version": result.rates_version})
+    )
+    
+    session.add(scenario)
+    session.commit()
+    session.refresh(scenario)
+    
+    return ScenarioResponse(
+        id=scenario.id,
+        label=scenario.label,
+        created_at=scenario.created_at.isoformat(),
+        inputs=scenario.inputs,
+        outputs=scenario.outputs
+    )
@@ -77,6 +77,14 @@ class CalcResponse(BaseModel):
     monthly_total: float
 
 
+class ResultResponse(CalcResponse):
+    """Stored calculation result fetched by handle"""
+    handle: str
+    inputs: dict
+    rates_version: str
+    expires_at: str
+
+
 class RatesResponse(BaseModel):
     """Tax rates response"""
     rates: dict
@@ -90,6 +98,11 @@ class ScenarioSaveRequest(BaseModel):
     calc_response: CalcResponse
 
 
+class ResultScenarioRequest(BaseModel):
+    """Request to save a stored result as a scenario"""
+    label: Optional[str] = Field(default=None, max_length=200)
+
+
 class ScenarioResponse(BaseModel):
     """Saved scenario response"""
     id: str
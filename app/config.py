@@ -42,6 +42,46 @@ class Settings:
     TEMPLATES_DIR: Path = BASE_DIR / "app" / "templates"
     STATIC_DIR: Path = BASE_DIR / "app" / "static"
     
+    # Jinja: compiled templates cached on disk across restarts ("" disables);
+    # templates are only re-checked for changes outside production
+    TEMPLATE_CACHE_DIR: str = os.getenv("TEMPLATE_CACHE_DIR", ".cache/jinja")
+    TEMPLATES_AUTO_RELOAD: bool = os.getenv("TEMPLATES_AUTO_RELOAD", str(not IS_PRODUCTION)).lower() == "true"
+    # Rendered breakdown fragments kept for repeated results (0 disables)
+    FRAGMENT_CACHE_MAX_MB: int = int(os.getenv("FRAGMENT_CACHE_MAX_MB", "16"))
+    
+    # Event loop monitoring (lag histogram + blocking-call stack capture)
+    LOOP_MONITOR_ENABLED: bool = os.getenv("LOOP_MONITOR_ENABLED", "True").lower() == "true"
+    LOOP_MONITOR_INTERVAL_MS: float = float(os.getenv("LOOP_MONITOR_INTERVAL_MS", "50"))
+    LOOP_BLOCK_THRESHOLD_MS: float = float(os.getenv("LOOP_BLOCK_THRESHOLD_MS", "250"))
+    
+    # Time each calculator on 1 in N engine runs (0 disables)
+    ENGINE_TIMING_SAMPLE_EVERY: int = int(os.getenv("ENGINE_TIMING_SAMPLE_EVERY", "100"))
+    
+    # Tracing: head-sampled spans written as JSON lines
+    TRACING_ENABLED: bool = os.getenv("TRACING_ENABLED", "False").lower() == "true"
+    TRACE_SAMPLE_RATE: float = float(os.getenv("TRACE_SAMPLE_RATE", "0.01"))
+    TRACE_EXPORT_PATH: Path = BASE_DIR / os.getenv("TRACE_EXPORT_PATH", "traces/spans.jsonl")
+    # Rotate the span file to <name>.1 past this size; drop spans beyond this many waiting to be written
+    TRACE_EXPORT_MAX_MB: int = int(os.getenv("TRACE_EXPORT_MAX_MB", "50"))
+    TRACE_EXPORT_QUEUE_SIZE: int = int(os.getenv("TRACE_EXPORT_QUEUE_SIZE", "10000"))
+    # Honour the sampled flag of incoming traceparent headers (only behind a trusted proxy)
+    TRACE_TRUST_UPSTREAM: bool = os.getenv("TRACE_TRUST_UPSTREAM", "False").lower() == "true"
+    
+    # Keep the last N requests slower than the threshold for offline replay
+    SLOW_REQUEST_THRESHOLD_MS: float = float(os.getenv("SLOW_REQUEST_THRESHOLD_MS", "250"))
+    SLOW_REQUEST_BUFFER_SIZE: int = int(os.getenv("SLOW_REQUEST_BUFFER_SIZE", "100"))
+    # Inputs kept per entry: "bucketed" (coarsened amounts), "hash" only, or exact "raw" (opt-in)
+    SLOW_REQUEST_INPUTS: str = os.getenv("SLOW_REQUEST_INPUTS", "bucketed").lower()
+    
+    # Calculation results kept server-side so share/export links don't recompute;
+    # RESULT_STORE_PATH (SQLite) keeps them across restarts and workers, "" is memory only
+    RESULT_TTL_SECONDS: float = float(os.getenv("RESULT_TTL_SECONDS", "86400"))
+    RESULT_STORE_SIZE: int = int(os.getenv("RESULT_STORE_SIZE", "5000"))
+    RESULT_STORE_PATH: str = os.getenv("RESULT_STORE_PATH", "")
+    
+    # Browser/CDN cache lifetime for GET /api/calc responses
+    CALC_CACHE_MAX_AGE: int = int(os.getenv("CALC_CACHE_MAX_AGE", "3600"))
+    
     # Admin
     ADMIN_ENABLED: bool = os.getenv("ADMIN_ENABLED", "True").lower() == "true"
     
@@ -49,6 +89,16 @@ class Settings:
     SUPABASE_URL: str = os.getenv("SUPABASE_URL", "")
     SUPABASE_KEY: str = os.getenv("SUPABASE_KEY", "")
     ENABLE_SUBMISSION_LOGGING: bool = os.getenv("ENABLE_SUBMISSION_LOGGING", "False").lower() == "true"
+    # ip-api.com compatible endpoint; {ip} is replaced with the client address
+    GEO_LOOKUP_URL: str = os.getenv("GEO_LOOKUP_URL", "http://ip-api.com/json/{ip}")
+    # Breakdowns can be recomputed from inputs + rates version, so only store when needed
+    SUBMISSION_STORE_BREAKDOWN: bool = os.getenv("SUBMISSION_STORE_BREAKDOWN", "False").lower() == "true"
+    # Identical re-submits from the same session within this window are counted, not logged
+    LOG_DEDUP_WINDOW_SECONDS: float = float(os.getenv("LOG_DEDUP_WINDOW_SECONDS", "300"))
+    # Adaptive sampling kicks in above these pending-task / event-loop lag levels
+    LOG_SAMPLE_QUEUE_THRESHOLD: int = int(os.getenv("LOG_SAMPLE_QUEUE_THRESHOLD", "50"))
+    LOG_SAMPLE_LAG_THRESHOLD_MS: float = float(os.getenv("LOG_SAMPLE_LAG_THRESHOLD_MS", "100"))
+    LOG_SAMPLE_MIN_RATE: float = float(os.getenv("LOG_SAMPLE_MIN_RATE", "0.1"))
     
     # Google AdSense
     GOOGLE_ADSENSE_CLIENT_ID: str = os.getenv("GOOGLE_ADSENSE_CLIENT_ID", "")
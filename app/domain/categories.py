@@ -0,0 +1,68 @@
+"""Stable short codes for breakdown categories
+
+Calculators label their output with human-readable category names. Those
+names are display text and may be reworded, so anything persisted or sent to
+the client should reference categories by these codes instead. Codes must
+never be reused or renamed once published.
+"""
+
+CATEGORY_CODES: dict[str, str] = {
+    # Direct income taxes
+    "PAYE (Income Tax)": "paye",
+    "UIF": "uif",
+    # Indirect taxes
+    "VAT": "vat",
+    "Fuel Levies": "fuel",
+    "Electricity Environmental Levy": "elec",
+    "Health Promotion Levy (Sugar Tax)": "hpl",
+    "Plastic Bag Levy": "bags",
+    # Alcohol excise
+    "Beer Excise": "beer",
+    "Wine Excise": "wine",
+    "Spirits Excise": "spirits",
+    # Tobacco excise
+    "Cigarette Excise": "cigs",
+    "Cigar Excise": "cigars",
+    "Pipe Tobacco Excise": "pipe",
+    # Property and transport
+    "Vehicle License Fees": "veh_lic",
+    "Toll Fees": "tolls",
+    "Municipal Rates & Services": "muni_rates",
+    "Transfer Duty (One-time)": "transfer",
+    "Vehicle Import Duty (in installments)": "veh_import",
+    # Investment taxes
+    "Dividends Tax": "divs",
+    "Capital Gains Tax": "cgt",
+    # Embedded corporate taxes
+    "Corporate Income Tax (embedded)": "emb_cit",
+    "SDL/UIF Employer Contribution (embedded)": "emb_sdl",
+    "Tax Administration Costs (embedded)": "emb_admin",
+    "Regulatory Compliance Costs (embedded)": "emb_reg",
+    "Supply Chain Tax Cascade (embedded)": "emb_chain",
+    # Other levies
+    "Tyre Levy": "tyres",
+    "TV License": "tv",
+    "Import Duties (Consumer Goods)": "imp_goods",
+    "Import VAT (Online Purchases)": "imp_vat_online",
+    "Import Duties (Online Purchases)": "imp_duty_online",
+    "Airport Taxes (Domestic)": "air_dom",
+    "Airport Taxes & Tourism Levy (International)": "air_intl",
+    "Accommodation Tourism Levy": "accom",
+    # Municipal services
+    "Municipal Water Charges": "muni_water",
+    "Municipal Sewerage Charges": "muni_sewer",
+    "Municipal Refuse Removal": "muni_refuse",
+    "Other Municipal Charges": "muni_other",
+}
+
+CATEGORY_NAMES: dict[str, str] = {code: name for name, code in CATEGORY_CODES.items()}
+
+
+def category_code(name: str) -> str:
+    """Return the stable code for a category, or the name itself if unmapped"""
+    return CATEGORY_CODES.get(name, name)
+
+
+def category_name(code: str) -> str:
+    """Return the display name for a code, or the code itself if unmapped"""
+    return CATEGORY_NAMES.get(code, code)
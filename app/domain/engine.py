@@ -1,4 +1,6 @@
 """Tax calculation engine - orchestrates all calculators"""
+import time
+from app.domain.instrumentation import CalculatorTimings
 from app.domain.rates import TaxRates
 from app.domain.profiles import (
     PersonalProfile,
@@ -20,11 +22,27 @@ from app.domain.calculators import (
 )
 
 
+# Calculators in the order run() applies them, with the run() arguments each takes.
+# _run_timed() iterates this; run() calls them directly to stay cheap.
+CALCULATOR_STEPS = (
+    ("paye_calc", ("personal",)),
+    ("indirect_calc", ("consumption",)),
+    ("alcohol_calc", ("consumption",)),
+    ("tobacco_calc", ("consumption",)),
+    ("property_calc", ("transport_property",)),
+    ("investment_calc", ("investment",)),
+    ("embedded_calc", ("consumption",)),
+    ("other_levies_calc", ("consumption", "travel")),
+    ("municipal_calc", ("transport_property",)),
+)
+
+
 class TaxEngine:
     """Orchestrates all tax calculations"""
     
-    def __init__(self, rates: TaxRates):
+    def __init__(self, rates: TaxRates, instrumentation: CalculatorTimings | None = None):
         self.rates = rates
+        self.instrumentation = instrumentation
         self.paye_calc = PAYECalculator(rates)
         self.indirect_calc = IndirectTaxesCalculator(rates)
         self.alcohol_calc = AlcoholTaxCalculator(rates)
@@ -34,6 +52,10 @@ class TaxEngine:
         self.embedded_calc = EmbeddedCorporateTaxCalculator(rates)
         self.other_levies_calc = OtherLeviesCalculator(rates)
         self.municipal_calc = MunicipalServicesCalculator(rates)
+        self._steps = tuple(
+            (getattr(self, attr), type(getattr(self, attr)).__name__, args)
+            for attr, args in CALCULATOR_STEPS
+        )
     
     def run(
         self,
@@ -48,9 +70,17 @@ class TaxEngine:
         Returns:
             tuple of (breakdown_dict, total_tax_amount)
         """
-        breakdown = {}
+        if travel is None:
+            travel = TravelProfile()
+        
+        instrumentation = self.instrumentation
+        if instrumentation is not None and instrumentation.should_sample():
+            return self._run_timed(
+                instrumentation, personal, consumption, transport_property, investment, travel
+            )
         
-        # Calculate each category
+        # Direct calls on the hot path; keep in step with CALCULATOR_STEPS
+        breakdown = {}
         breakdown.update(self.paye_calc.calculate(personal))
         breakdown.update(self.indirect_calc.calculate(consumption))
         breakdown.update(self.alcohol_calc.calculate(consumption))
@@ -58,19 +88,37 @@ class TaxEngine:
         breakdown.update(self.property_calc.calculate(transport_property))
         breakdown.update(self.investment_calc.calculate(investment))
         breakdown.update(self.embedded_calc.calculate(consumption))
-        
-        # Add other levies if travel profile provided
-        if travel is None:
-            travel = TravelProfile()
         breakdown.update(self.other_levies_calc.calculate(consumption, travel))
-        
-        # Add municipal services
         breakdown.update(self.municipal_calc.calculate(transport_property))
         
-        # Calculate total
-        total = sum(breakdown.values())
+        return breakdown, sum(breakdown.values())
+    
+    def _run_timed(
+        self,
+        instrumentation: CalculatorTimings,
+        personal: PersonalProfile,
+        consumption: ConsumptionProfile,
+        transport_property: TransportAndPropertyProfile,
+        investment: InvestmentProfile,
+        travel: TravelProfile,
+    ) -> tuple[dict[str, float], float]:
+        """Same as run(), recording each calculator's latency"""
+        profiles = {
+            "personal": personal,
+            "consumption": consumption,
+            "transport_property": transport_property,
+            "investment": investment,
+            "travel": travel,
+        }
+        breakdown = {}
+        perf_counter = time.perf_counter
+        for calculator, name, args in self._steps:
+            started = perf_counter()
+            result = calculator.calculate(*[profiles[arg] for arg in args])
+            instrumentation.record(name, perf_counter() - started)
+            breakdown.update(result)
         
-        return breakdown, total
+        return breakdown, sum(breakdown.values())
     
     def summary_list(
         self,
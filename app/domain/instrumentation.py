@@ -0,0 +1,66 @@
+"""Optional timing hooks for TaxEngine
+
+TaxEngine accepts an instrumentation object and, for the runs it chooses to
+sample, times each calculator's ``calculate`` call. Without one, the engine
+runs its normal path with a single ``is None`` check of overhead.
+"""
+import itertools
+import threading
+from collections import deque
+from typing import Dict
+
+
+class CalculatorTimings:
+    """Sampled per-calculator latency aggregation
+
+    Keeps a running count/total/max per calculator plus a bounded window of
+    recent samples for percentile estimates.
+    """
+
+    def __init__(self, sample_every: int = 100, window: int = 1000):
+        self.sample_every = max(1, sample_every)
+        self.window = window
+        self._runs = itertools.count()
+        self._lock = threading.Lock()
+        self._stats: Dict[str, dict] = {}
+
+    def should_sample(self) -> bool:
+        """True for one in every ``sample_every`` engine runs"""
+        return next(self._runs) % self.sample_every == 0
+
+    def record(self, calculator: str, seconds: float) -> None:
+        """Record one timed ``calculate`` call"""
+        with self._lock:
+            stats = self._stats.get(calculator)
+            if stats is None:
+                stats = self._stats[calculator] = {
+                    "count": 0, "total": 0.0, "max": 0.0, "recent": deque(maxlen=self.window),
+                }
+            stats["count"] += 1
+            stats["total"] += seconds
+            stats["max"] = max(stats["max"], seconds)
+            stats["recent"].append(seconds)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Per-calculator latency summary in microseconds"""
+        with self._lock:
+            snapshot = {name: (dict(s), sorted(s["recent"])) for name, s in self._stats.items()}
+
+        def percentile(ordered: list, q: float) -> float:
+            return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+        return {
+            name: {
+                "count": stats["count"],
+                "mean_us": stats["total"] / stats["count"] * 1e6,
+                "p50_us": percentile(ordered, 0.50) * 1e6,
+                "p95_us": percentile(ordered, 0.95) * 1e6,
+                "p99_us": percentile(ordered, 0.99) * 1e6,
+                "max_us": stats["max"] * 1e6,
+            }
+            for name, (stats, ordered) in sorted(snapshot.items())
+        }
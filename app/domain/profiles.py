@@ -1,5 +1,5 @@
 """User profile data models"""
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
 
 
 @dataclass
@@ -90,3 +90,32 @@ class InvestmentProfile:
     """Investment income and gains"""
     sa_dividends_annual: float = 0.0
     taxable_cgt_base_annual: float = 0.0  # The taxable gain (already calculated)
+
+
+# Profile classes in the argument order expected by TaxEngine.run
+PROFILE_TYPES = (
+    PersonalProfile,
+    ConsumptionProfile,
+    TransportAndPropertyProfile,
+    InvestmentProfile,
+    TravelProfile,
+)
+
+
+def build_profiles(inputs: dict) -> tuple:
+    """Split a flat dict of input fields into the profiles TaxEngine.run expects
+    
+    Unknown keys are ignored and missing fields take the profile defaults.
+    """
+    profiles = []
+    for profile_type in PROFILE_TYPES:
+        kwargs = {
+            f.name: inputs[f.name] for f in fields(profile_type) if f.name in inputs
+        }
+        profiles.append(profile_type(**kwargs))
+    return tuple(profiles)
+
+
+def flatten_profiles(profiles: tuple) -> dict:
+    """Inverse of build_profiles: one flat dict of every profile field"""
+    return {f.name: getattr(profile, f.name) for profile in profiles for f in fields(profile)}
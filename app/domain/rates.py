@@ -1,6 +1,7 @@
 """Tax rates data models and YAML loader"""
 from dataclasses import dataclass
 from typing import List, Optional
+import hashlib
 import yaml
 from pathlib import Path
 
@@ -111,11 +112,15 @@ class TaxRates:
     # Transfer duty
     transfer_duty: List[TransferDutyBand]
     
+    # Content hash of the source YAML, identifies which rates produced a result
+    version: str = ""
+    
     @classmethod
     def load_from_yaml(cls, file_path: str | Path) -> "TaxRates":
         """Load tax rates from YAML file"""
-        with open(file_path, 'r') as f:
-            data = yaml.safe_load(f)
+        with open(file_path, 'rb') as f:
+            raw = f.read()
+        data = yaml.safe_load(raw)
         
         # Parse PAYE brackets
         paye_brackets = [
@@ -179,4 +184,5 @@ class TaxRates:
             dividends_tax_rate=data['dividends_tax_rate'],
             cgt_effective_max_rate=data['cgt_effective_max_rate'],
             transfer_duty=transfer_duty,
+            version=hashlib.sha256(raw).hexdigest()[:12],
         )
@@ -1,16 +1,72 @@
 """FastAPI application factory and configuration"""
+import asyncio
+from contextlib import asynccontextmanager
 from pathlib import Path
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
-from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from app.config import settings
 from app.api.routes_public import router as public_router
 from app.api.routes_admin import router as admin_router
 from app.views.pages import router as views_router
+from app.views.templating import templates
+from app.views.prerendered import page_cache
+from app.views.fragments import fragment_cache
+from app.services.logger import submission_logger
+from app.services.loop_monitor import LoopMonitor
+from app.services import metrics
+from app.services.profiler import ProfilerMiddleware, request_profiler
+from app.services.flight_recorder import FlightRecorderMiddleware, flight_recorder
+from app.services.assets import StaticAssets
+from app.services.compression import CompressionMiddleware, compressed_body_cache
+from app.services.tracing import TracingMiddleware, tracer
+from app.services.user_agent import classify_user_agent
+from app.services.rates_cache import rates_cache
+from app.services.result_store import result_store
+from app.services.warmup import Warmup, default_steps
 from db.session import create_db_and_tables
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop background instrumentation with the server"""
+    loop_monitor = None
+    if settings.LOOP_MONITOR_ENABLED:
+        loop_monitor = LoopMonitor(
+            interval_ms=settings.LOOP_MONITOR_INTERVAL_MS,
+            block_threshold_ms=settings.LOOP_BLOCK_THRESHOLD_MS,
+        )
+        loop_monitor.start()
+        # Shed submission logging when the loop falls behind
+        submission_logger.sampler.lag_provider = loop_monitor.current_lag_ms
+        metrics.registry.callback(
+            "bleedrate_event_loop_lag_seconds",
+            "Current event loop lag",
+            lambda: loop_monitor.current_lag_ms() / 1000.0,
+        )
+    app.state.loop_monitor = loop_monitor
+    
+    # Slow one-off setup kept out of import time (CLI tools import app modules too)
+    await asyncio.to_thread(create_db_and_tables)
+    await asyncio.to_thread(submission_logger.connect)
+    
+    # Warm up off the event loop so /health answers while /ready is still 503
+    warmup_task = asyncio.create_task(
+        asyncio.to_thread(app.state.warmup.run, default_steps(templates.env))
+    )
+    
+    yield
+    
+    await warmup_task
+    
+    if loop_monitor is not None:
+        submission_logger.sampler.lag_provider = None
+        await loop_monitor.stop()
+    
+    if tracer.enabled:
+        tracer.exporter.flush()
+
+
 def create_app() -> FastAPI:
     """Create and configure FastAPI application"""
     
@@ -18,24 +74,24 @@ def create_app() -> FastAPI:
         title="SA Tax Footprint Calculator",
         description="Calculate your complete South African tax footprint",
         version="1.0.0",
-        debug=settings.DEBUG
+        debug=settings.DEBUG,
+        lifespan=lifespan
     )
-    
-    # Initialize database
-    create_db_and_tables()
+    app.state.loop_monitor = None
+    app.state.warmup = Warmup()
     
     # Mount static files - create directory if it doesn't exist
     static_dir = Path(settings.STATIC_DIR)
     static_dir.mkdir(parents=True, exist_ok=True)
     
     try:
-        app.mount("/static", StaticFiles(directory=str(static_dir)), name="static")
+        app.mount("/static", StaticAssets(directory=str(static_dir)), name="static")
     except RuntimeError as e:
         # Static directory issue - log but don't crash (using Tailwind CDN anyway)
         print(f"Warning: Could not mount static files: {e}")
     
     # Add middleware
-    app.add_middleware(GZipMiddleware, minimum_size=1000)
+    app.add_middleware(CompressionMiddleware, minimum_size=1000)
     
     if settings.DEBUG:
         app.add_middleware(
@@ -53,6 +109,36 @@ def create_app() -> FastAPI:
     if settings.ADMIN_ENABLED:
         app.include_router(admin_router, tags=["admin"])
     
+    # Only does work while a capture is armed from /admin/profile
+    app.add_middleware(ProfilerMiddleware, profiler=request_profiler)
+    
+    # Inside MetricsMiddleware, which provides the start time and stage timings
+    app.add_middleware(FlightRecorderMiddleware, recorder=flight_recorder)
+    
+    # Outermost, so it times everything including compression
+    app.add_middleware(metrics.MetricsMiddleware)
+    
+    if tracer.enabled:
+        app.add_middleware(TracingMiddleware, tracer=tracer)
+    
+    metrics.registry.register_cache("user_agent", lambda: tuple(classify_user_agent.cache_info()[:2]))
+    metrics.registry.register_cache("rates", rates_cache.stats)
+    metrics.registry.register_cache("page", page_cache.stats)
+    metrics.registry.register_cache("fragment", fragment_cache.stats)
+    metrics.registry.register_cache("result", result_store.stats)
+    metrics.registry.register_cache("compressed_body", compressed_body_cache.stats)
+    metrics.registry.callback(
+        "bleedrate_logger_queue_depth",
+        "Submission logging tasks in flight",
+        lambda: submission_logger.queue_depth,
+    )
+    metrics.registry.callback(
+        "bleedrate_submissions_total",
+        "Submissions seen by the logger by outcome",
+        lambda: [({"outcome": k}, v) for k, v in submission_logger.counters.items()],
+        type="counter",
+    )
+    
     @app.get("/health")
     def health_check():
         """Health check endpoint for Railway and monitoring"""
@@ -63,6 +149,20 @@ def create_app() -> FastAPI:
             "debug": settings.DEBUG,
         }
     
+    @app.get("/ready")
+    def readiness_check():
+        """Readiness probe: 503 until startup warmup has completed"""
+        warmup = app.state.warmup
+        return JSONResponse(warmup.status(), status_code=200 if warmup.ready else 503)
+    
+    @app.get("/metrics", response_class=PlainTextResponse)
+    def metrics_endpoint():
+        """Prometheus metrics in text exposition format"""
+        return PlainTextResponse(
+            metrics.registry.render(),
+            media_type="text/plain; version=0.0.4; charset=utf-8"
+        )
+    
     return app
 
 
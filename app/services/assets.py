@@ -0,0 +1,151 @@
+"""Static asset pipeline: fingerprinting, precompression and serving
+
+``python -m app.services.assets`` (run while building the image) copies each
+file under app/static to app/static/dist/ with a content hash in its name,
+writes .gz and .br siblings where compression pays off, and records
+``{source path: hashed path}`` in dist/manifest.json.
+
+Templates call ``static_url("images/logo.png")``, which returns the hashed
+URL when the manifest has one and the plain /static URL otherwise (e.g. in
+development before a build). ``StaticAssets`` serves hashed files with
+``Cache-Control: immutable`` and picks the precompressed sibling the client
+accepts, so nothing under /static is compressed at request time.
+"""
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+import stat
+from pathlib import Path
+from typing import Dict
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from app.config import settings
+from app.services.compression import available_encodings, compress, negotiate
+
+DIST_DIR = "dist"
+MANIFEST_NAME = "manifest.json"
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+# Precompressed siblings on disk, in preference order
+SIBLING_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+# Already-compressed formats gain nothing from gzip/brotli
+INCOMPRESSIBLE = {".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif", ".woff", ".woff2", ".gz", ".br", ".zip"}
+
+
+def _fingerprinted_name(path: Path, digest: str) -> str:
+    return f"{path.stem}.{digest}{path.suffix}"
+
+
+def build(static_dir: Path = settings.STATIC_DIR, min_saving: float = 0.05) -> Dict[str, str]:
+    """Fingerprint and precompress every asset into ``static_dir/dist``
+
+    Returns:
+        The manifest mapping source paths to hashed paths (relative to
+        ``static_dir``)
+    """
+    static_dir = Path(static_dir)
+    dist = static_dir / DIST_DIR
+    if dist.exists():
+        shutil.rmtree(dist)
+
+    manifest = {}
+    for source in sorted(static_dir.rglob("*")):
+        relative = source.relative_to(static_dir)
+        if not source.is_file() or relative.parts[0] == DIST_DIR or source.name.startswith("."):
+            continue
+        if source.suffix == ".md":
+            continue
+
+        body = source.read_bytes()
+        digest = hashlib.blake2b(body, digest_size=5).hexdigest()
+        target = dist / relative.parent / _fingerprinted_name(relative, digest)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(body)
+
+        if source.suffix.lower() not in INCOMPRESSIBLE:
+            for encoding, suffix in SIBLING_SUFFIXES.items():
+                if encoding not in available_encodings():
+                    continue
+                compressed = compress(body, encoding)
+                if len(compressed) <= len(body) * (1 - min_saving):
+                    target.with_name(target.name + suffix).write_bytes(compressed)
+
+        manifest[relative.as_posix()] = target.relative_to(static_dir).as_posix()
+
+    (dist / MANIFEST_NAME).write_text(json.dumps(manifest, indent=1, sort_keys=True) + "\n")
+    return manifest
+
+
+class AssetManifest:
+    """Source path -> hashed URL lookups from dist/manifest.json"""
+
+    def __init__(self, static_dir: Path = settings.STATIC_DIR, url_prefix: str = "/static"):
+        self.static_dir = Path(static_dir)
+        self.url_prefix = url_prefix
+        self.entries: Dict[str, str] = {}
+        self.load()
+
+    def load(self) -> None:
+        path = self.static_dir / DIST_DIR / MANIFEST_NAME
+        try:
+            self.entries = json.loads(path.read_text())
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def url(self, path: str) -> str:
+        """Hashed URL for ``path`` if it has been built, else the plain URL"""
+        path = path.lstrip("/")
+        return f"{self.url_prefix}/{self.entries.get(path, path)}"
+
+
+asset_manifest = AssetManifest()
+
+
+def static_url(path: str) -> str:
+    """Jinja helper: ``{{ static_url('images/logo.png') }}``"""
+    return asset_manifest.url(path)
+
+
+class StaticAssets(StaticFiles):
+    """StaticFiles that serves dist/ assets immutable and precompressed"""
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        relative = os.path.relpath(full_path, os.path.realpath(self.directory))
+        if Path(relative).parts[0] != DIST_DIR:
+            return super().file_response(full_path, stat_result, scope, status_code)
+
+        media_type = mimetypes.guess_type(str(full_path))[0] or "text/plain"
+        headers = {"Cache-Control": IMMUTABLE, "Vary": "Accept-Encoding"}
+
+        siblings = {}
+        for encoding, suffix in SIBLING_SUFFIXES.items():
+            sibling = f"{full_path}{suffix}"
+            try:
+                sibling_stat = os.stat(sibling)
+            except OSError:
+                continue
+            if stat.S_ISREG(sibling_stat.st_mode):
+                siblings[encoding] = (sibling, sibling_stat)
+
+        encoding = negotiate(request_headers.get("accept-encoding", ""), siblings)
+        if encoding != "identity":
+            full_path, stat_result = siblings[encoding]
+            headers["Content-Encoding"] = encoding
+
+        response = FileResponse(
+            full_path, status_code=status_code, stat_result=stat_result, media_type=media_type, headers=headers
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+if __name__ == "__main__":
+    built = build()
+    asset_manifest.load()
+    print(f"Fingerprinted {len(built)} assets into {settings.STATIC_DIR / DIST_DIR}")
@@ -0,0 +1,90 @@
+"""Canonical query-string form of calculator inputs for GET /api/calc
+
+Inputs are the flat profile fields (see ``build_profiles``). The canonical
+query sorts the fields, omits every field left at its default and writes
+numbers in their shortest form (``500000`` not ``500000.0``, booleans as
+``1``/``0``), so each distinct calculation has exactly one URL and an HTTP
+cache or CDN stores it once.
+"""
+import math
+import typing
+from dataclasses import fields
+from typing import Any, Dict, Iterable, Tuple
+from urllib.parse import urlencode
+from app.domain.profiles import PROFILE_TYPES
+from app.services.submission_codec import INPUT_DEFAULTS
+
+REQUIRED_FIELDS = ("annual_salary",)
+
+MAX_AGE_YEARS = 120
+
+
+def _base_type(annotation) -> type:
+    """``float | None`` -> float"""
+    args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+    return args[0] if args else annotation
+
+
+FIELD_TYPES: Dict[str, type] = {
+    f.name: _base_type(f.type) for profile_type in PROFILE_TYPES for f in fields(profile_type)
+}
+
+
+def _parse_value(name: str, raw: str) -> Any:
+    kind = FIELD_TYPES[name]
+    if kind is bool:
+        if raw.lower() in ("1", "true"):
+            return True
+        if raw.lower() in ("0", "false"):
+            return False
+        raise ValueError(f"{name} must be 1 or 0")
+    try:
+        value = float(raw)
+    except ValueError:
+        raise ValueError(f"{name} must be a number") from None
+    if not math.isfinite(value) or value < 0:
+        raise ValueError(f"{name} must be a non-negative number")
+    if kind is int:
+        if not value.is_integer():
+            raise ValueError(f"{name} must be a whole number")
+        value = int(value)
+    if name == "age" and value > MAX_AGE_YEARS:
+        raise ValueError(f"age must be at most {MAX_AGE_YEARS}")
+    return value
+
+
+def parse_query(params: Iterable[Tuple[str, str]]) -> Dict[str, Any]:
+    """Flat inputs from query parameters
+
+    Raises:
+        ValueError: For unknown, repeated, missing or malformed fields
+    """
+    inputs: Dict[str, Any] = {}
+    for name, raw in params:
+        if name not in FIELD_TYPES:
+            raise ValueError(f"Unknown field: {name}")
+        if name in inputs:
+            raise ValueError(f"Repeated field: {name}")
+        inputs[name] = _parse_value(name, raw)
+    for name in REQUIRED_FIELDS:
+        if name not in inputs:
+            raise ValueError(f"Missing required field: {name}")
+    return inputs
+
+
+def format_value(value: Any) -> str:
+    """Shortest text for a field value"""
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def canonical_query(inputs: Dict[str, Any]) -> str:
+    """Sorted, default-omitting query string for ``inputs``"""
+    return urlencode([
+        (name, format_value(value))
+        for name, value in sorted(inputs.items())
+        if value is not None and (name not in INPUT_DEFAULTS or INPUT_DEFAULTS[name] != value)
+    ])
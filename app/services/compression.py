@@ -0,0 +1,270 @@
+"""Content encodings: negotiation, one-off compression and response middleware
+
+gzip is always available. Brotli (``brotli`` or ``brotlicffi``) and zstd
+(``zstandard``) are optional dependencies; their encodings are only offered
+when the package is installed.
+"""
+import gzip
+import hashlib
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+from starlette.datastructures import Headers, MutableHeaders
+from app.services.metrics import record_stage
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - depends on the environment
+    zstandard = None
+
+# Server preference when the client accepts several encodings equally
+PREFERENCE = ("br", "zstd", "gzip")
+
+# Levels for bodies compressed once and served many times
+MAX_LEVELS = {"br": 11, "zstd": 19, "gzip": 9}
+
+
+def available_encodings() -> tuple:
+    """Encodings this process can produce, in preference order"""
+    return tuple(
+        encoding for encoding in PREFERENCE
+        if encoding == "gzip" or (encoding == "br" and brotli) or (encoding == "zstd" and zstandard)
+    )
+
+
+def compress(body: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    """Compress ``body`` with ``encoding`` (maximum level by default)"""
+    level = MAX_LEVELS[encoding] if level is None else level
+    if encoding == "gzip":
+        # mtime=0 keeps the output (and so ETags) identical across workers
+        return gzip.compress(body, compresslevel=level, mtime=0)
+    if encoding == "br" and brotli:
+        return brotli.compress(body, quality=level)
+    if encoding == "zstd" and zstandard:
+        return zstandard.ZstdCompressor(level=level).compress(body)
+    raise ValueError(f"Unsupported content encoding: {encoding}")
+
+
+def compress_all(body: bytes, encodings: Optional[Iterable[str]] = None) -> Dict[str, bytes]:
+    """``{encoding: bytes}`` for identity plus every available encoding"""
+    variants = {"identity": body}
+    for encoding in encodings or available_encodings():
+        variants[encoding] = compress(body, encoding)
+    return variants
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """``{coding: q}`` from an Accept-Encoding header"""
+    accepted = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate(header: str, offered: Iterable[str]) -> str:
+    """Pick the best of ``offered`` for an Accept-Encoding header
+
+    Among encodings with the highest q-value, server preference order wins.
+    Falls back to "identity".
+    """
+    accepted = parse_accept_encoding(header or "")
+    best, best_q = "identity", 0.0
+    for encoding in offered:
+        if encoding == "identity":
+            continue
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+# Levels for bodies compressed per response: whole bodies are cached by
+# content hash so they can afford more effort than streamed chunks
+BODY_LEVELS = {"br": 6, "zstd": 9, "gzip": 6}
+STREAM_LEVELS = {"br": 4, "zstd": 3, "gzip": 5}
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "application/xml",
+                      "application/x-ndjson", "image/svg+xml")
+
+
+def _compressible(content_type: str) -> bool:
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class StreamCompressor:
+    """Incremental compressor that flushes after each chunk
+
+    Flushing keeps streamed responses (e.g. NDJSON) arriving line by line
+    instead of waiting for the compressor's internal buffer to fill.
+    """
+
+    def __init__(self, encoding: str, level: Optional[int] = None):
+        level = STREAM_LEVELS[encoding] if level is None else level
+        self.encoding = encoding
+        if encoding == "gzip":
+            self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)
+        elif encoding == "br" and brotli:
+            self._obj = brotli.Compressor(quality=level)
+        elif encoding == "zstd" and zstandard:
+            self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+        else:
+            raise ValueError(f"Unsupported content encoding: {encoding}")
+
+    def chunk(self, data: bytes, final: bool = False) -> bytes:
+        if self.encoding == "gzip":
+            out = self._obj.compress(data)
+            return out + self._obj.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+        if self.encoding == "br":
+            out = self._obj.process(data)
+            return out + (self._obj.finish() if final else self._obj.flush())
+        out = self._obj.compress(data)
+        return out + self._obj.flush(
+            zstandard.COMPRESSOBJ_FLUSH_FINISH if final else zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        )
+
+
+class CompressedBodyCache:
+    """LRU of compressed bodies keyed by (encoding, body hash), bounded in bytes"""
+
+    def __init__(self, max_bytes: int = 8 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, bytes], bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compress(self, body: bytes, encoding: str) -> bytes:
+        key = (encoding, hashlib.blake2b(body, digest_size=16).digest())
+        with self._lock:
+            compressed = self._entries.get(key)
+            if compressed is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return compressed
+            self.misses += 1
+
+        compressed = compress(body, encoding, BODY_LEVELS[encoding])
+        if len(compressed) <= self.max_bytes // 4:
+            with self._lock:
+                if key not in self._entries:
+                    self._entries[key] = compressed
+                    self.size += len(compressed)
+                while self.size > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self.size -= len(evicted)
+        return compressed
+
+    def stats(self) -> Tuple[int, int]:
+        return self.hits, self.misses
+
+
+compressed_body_cache = CompressedBodyCache()
+
+
+class CompressionMiddleware:
+    """Negotiated br/zstd/gzip response compression
+
+    Whole bodies go through ``CompressedBodyCache``, so repeated responses
+    (identical breakdown fragments, API results) are compressed once.
+    Streaming responses are compressed chunk by chunk at a faster level.
+    Responses that already carry a Content-Encoding (pre-rendered pages,
+    precompressed static files) and non-text content are passed through.
+
+    Time spent compressing is recorded as the "gzip" request stage, the name
+    the stage had when only gzip was supported.
+    """
+
+    def __init__(self, app, minimum_size: int = 1000, cache: Optional[CompressedBodyCache] = None):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.cache = cache if cache is not None else compressed_body_cache
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept = Headers(scope=scope).get("accept-encoding", "")
+        encoding = negotiate(accept, available_encodings()) if accept else "identity"
+        if encoding == "identity":
+            await self.app(scope, receive, send)
+            record_stage(scope, "gzip", 0.0)
+            return
+
+        state = {"start": None, "mode": None, "stream": None, "seconds": 0.0}
+
+        async def compressing_send(message):
+            if message["type"] == "http.response.start":
+                state["start"] = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            start = state["start"]
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if state["mode"] is None:
+                headers = MutableHeaders(raw=start["headers"])
+                if (
+                    "content-encoding" in headers
+                    or not _compressible(headers.get("content-type", ""))
+                    or (not more_body and len(body) < self.minimum_size)
+                ):
+                    state["mode"] = "passthrough"
+                    await send(start)
+                    await send(message)
+                    return
+
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if not more_body:
+                    started = time.perf_counter()
+                    compressed = self.cache.get_or_compress(body, encoding)
+                    state["seconds"] += time.perf_counter() - started
+                    headers["Content-Length"] = str(len(compressed))
+                    state["mode"] = "body"
+                    await send(start)
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+
+                del headers["Content-Length"]
+                state["mode"] = "stream"
+                state["stream"] = StreamCompressor(encoding)
+                await send(start)
+
+            if state["mode"] == "passthrough":
+                await send(message)
+                return
+
+            started = time.perf_counter()
+            chunk = state["stream"].chunk(body, final=not more_body)
+            state["seconds"] += time.perf_counter() - started
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, compressing_send)
+        record_stage(scope, "gzip", state["seconds"])
@@ -0,0 +1,329 @@
+"""Columnar Parquet export of logged submissions for offline analytics
+
+Pages through the submission store with keyset pagination (``id > last``),
+flattens the compact form_data/results into typed columns, and writes Hive
+style month partitions::
+
+    <out_dir>/month=2025-10/part-000001234-000005678.parquet
+
+Progress is checkpointed in ``<out_dir>/_export_state.json`` after every page,
+so re-running the export only fetches rows added since the last run.
+
+Usage:
+    python -m app.services.export --out exports/submissions
+    python -m app.services.export --out exports/submissions --source submissions.jsonl
+
+Requires the optional ``pyarrow`` package.
+"""
+import argparse
+import bisect
+import json
+import logging
+from collections import defaultdict
+from dataclasses import fields
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Protocol, Tuple
+from app.config import settings
+from app.domain.categories import CATEGORY_CODES, category_code
+from app.domain.engine import TaxEngine
+from app.domain.profiles import PROFILE_TYPES
+from app.domain.rates import TaxRates
+from app.services.submission_codec import decode_submission
+
+logger = logging.getLogger(__name__)
+
+STATE_FILE = "_export_state.json"
+
+# Submission metadata columns copied through as strings / numbers / booleans
+METADATA_STRING_COLUMNS = (
+    "country_code", "region", "city", "browser", "browser_version", "os",
+    "os_version", "device_type", "referrer_domain", "utm_source", "utm_medium",
+    "utm_campaign", "language",
+)
+METADATA_INT_COLUMNS = (
+    "screen_width", "screen_height", "viewport_width", "viewport_height",
+    "time_to_complete_seconds",
+)
+METADATA_BOOL_COLUMNS = ("touch_support", "do_not_track", "cookies_enabled")
+
+
+class SubmissionSource(Protocol):
+    """Anything that can return submission rows ordered by id"""
+
+    def fetch_page(self, after_id: int, limit: int) -> List[Dict[str, Any]]:
+        """Return up to ``limit`` rows with ``id > after_id`` in id order"""
+        ...
+
+
+class SupabaseSource:
+    """Read submissions from the Supabase ``submissions`` table"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def fetch_page(self, after_id: int, limit: int) -> List[Dict[str, Any]]:
+        response = (
+            self.client.table("submissions")
+            .select("*")
+            .gt("id", after_id)
+            .order("id")
+            .limit(limit)
+            .execute()
+        )
+        return response.data or []
+
+
+class JsonlSource:
+    """Read submissions from a local JSON lines file (one row per line)
+
+    Serves as a stand-in for Supabase in development and tests. Rows are
+    appended in id order, so each page resumes from the byte offset where the
+    previous one stopped and a full export reads the file once. A file that
+    turns out not to be in id order is loaded and sorted once instead.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._resume: Optional[Tuple[int, int]] = None  # (last id returned, byte offset after it)
+        self._sorted: Optional[List[Dict[str, Any]]] = None
+        self._sorted_ids: List[int] = []
+
+    def fetch_page(self, after_id: int, limit: int) -> List[Dict[str, Any]]:
+        if self._sorted is not None:
+            return self._sorted_page(after_id, limit)
+
+        resuming = self._resume is not None and self._resume[0] == after_id
+        rows: List[Dict[str, Any]] = []
+        previous_id = after_id if resuming else None
+        with open(self.path, "rb") as f:
+            f.seek(self._resume[1] if resuming else 0)
+            while len(rows) < limit:
+                line = f.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                row = json.loads(line)
+                if previous_id is not None and row["id"] <= previous_id:
+                    self._load_sorted()
+                    return self._sorted_page(after_id, limit)
+                previous_id = row["id"]
+                if row["id"] > after_id:
+                    rows.append(row)
+            self._resume = (rows[-1]["id"] if rows else after_id, f.tell())
+        return rows
+
+    def _load_sorted(self) -> None:
+        with open(self.path, "r") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        rows.sort(key=lambda r: r["id"])
+        self._sorted = rows
+        self._sorted_ids = [r["id"] for r in rows]
+
+    def _sorted_page(self, after_id: int, limit: int) -> List[Dict[str, Any]]:
+        start = bisect.bisect_right(self._sorted_ids, after_id)
+        return self._sorted[start:start + limit]
+
+
+def _input_columns() -> Dict[str, str]:
+    """Map every profile field to its column kind (float, int or bool)"""
+    columns = {}
+    for profile_type in PROFILE_TYPES:
+        for f in fields(profile_type):
+            columns[f.name] = f.type.__name__ if f.type in (bool, int) else "float"
+    return columns
+
+
+INPUT_COLUMNS = _input_columns()
+
+
+def _coerce(value: Any, kind: str) -> Any:
+    """Cast a JSON value to the column kind, treating blanks as null"""
+    if value is None or value == "":
+        return None
+    if kind == "bool":
+        return value if isinstance(value, bool) else str(value).lower() == "true"
+    if kind == "int":
+        return int(float(value))
+    if kind == "str":
+        return str(value)
+    return float(value)
+
+
+def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def flatten_row(row: Dict[str, Any], engine: Optional[TaxEngine] = None) -> Dict[str, Any]:
+    """Flatten one submission row into a dict of typed scalar columns"""
+    decoded = decode_submission(row, engine)
+    inputs, results = decoded["form_data"], decoded["results"]
+
+    flat: Dict[str, Any] = {
+        "id": int(row["id"]),
+        "timestamp": _parse_timestamp(row.get("timestamp")),
+        "sample_weight": _coerce(row.get("sample_weight"), "float") or 1.0,
+        "rates_version": results.get("rates_version"),
+        "total_annual": _coerce(results.get("total_annual"), "float"),
+        "effective_rate": _coerce(results.get("percentage"), "float"),
+        "gross_income": _coerce(results.get("gross_income"), "float"),
+    }
+    for name, kind in INPUT_COLUMNS.items():
+        flat[name] = _coerce(inputs.get(name), kind)
+
+    # Legacy rows keyed the breakdown by display name
+    breakdown = results.get("breakdown")
+    by_code = {category_code(k): v for k, v in breakdown.items()} if breakdown else None
+    for code in CATEGORY_CODES.values():
+        flat[f"tax_{code}"] = _coerce(by_code.get(code, 0.0), "float") if by_code is not None else None
+
+    for name in METADATA_STRING_COLUMNS:
+        flat[name] = _coerce(row.get(name), "str")
+    for name in METADATA_INT_COLUMNS:
+        flat[name] = _coerce(row.get(name), "int")
+    for name in METADATA_BOOL_COLUMNS:
+        flat[name] = _coerce(row.get(name), "bool")
+    return flat
+
+
+def _arrow_schema():
+    import pyarrow as pa
+
+    kinds = {"float": pa.float64(), "int": pa.int64(), "bool": pa.bool_(), "str": pa.string()}
+    columns = [
+        ("id", pa.int64()),
+        ("timestamp", pa.timestamp("us", tz="UTC")),
+        ("sample_weight", pa.float64()),
+        ("rates_version", pa.string()),
+        ("total_annual", pa.float64()),
+        ("effective_rate", pa.float64()),
+        ("gross_income", pa.float64()),
+    ]
+    columns += [(name, kinds[kind]) for name, kind in INPUT_COLUMNS.items()]
+    columns += [(f"tax_{code}", pa.float64()) for code in CATEGORY_CODES.values()]
+    columns += [(name, pa.string()) for name in METADATA_STRING_COLUMNS]
+    columns += [(name, pa.int64()) for name in METADATA_INT_COLUMNS]
+    columns += [(name, pa.bool_()) for name in METADATA_BOOL_COLUMNS]
+    return pa.schema(columns)
+
+
+def _month_of(flat: Dict[str, Any]) -> str:
+    timestamp = flat["timestamp"]
+    return timestamp.strftime("%Y-%m") if timestamp else "unknown"
+
+
+def load_state(out_dir: Path) -> int:
+    """Return the last exported submission id (0 if nothing exported yet)"""
+    state_path = out_dir / STATE_FILE
+    if not state_path.exists():
+        return 0
+    return int(json.loads(state_path.read_text())["last_id"])
+
+
+def save_state(out_dir: Path, last_id: int) -> None:
+    """Atomically checkpoint the last exported id"""
+    tmp_path = out_dir / f"{STATE_FILE}.tmp"
+    tmp_path.write_text(json.dumps({"last_id": last_id}))
+    tmp_path.replace(out_dir / STATE_FILE)
+
+
+def iter_pages(source: SubmissionSource, after_id: int, page_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Yield successive pages of rows using keyset pagination"""
+    while True:
+        page = source.fetch_page(after_id, page_size)
+        if not page:
+            return
+        yield page
+        after_id = page[-1]["id"]
+
+
+def write_partitions(out_dir: Path, flat_rows: Iterable[Dict[str, Any]]) -> List[Path]:
+    """Write flattened rows to month partitions, one file per month per call"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema()
+    by_month: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for flat in flat_rows:
+        by_month[_month_of(flat)].append(flat)
+
+    written = []
+    for month, rows in sorted(by_month.items()):
+        partition = out_dir / f"month={month}"
+        partition.mkdir(parents=True, exist_ok=True)
+        path = partition / f"part-{rows[0]['id']:09d}-{rows[-1]['id']:09d}.parquet"
+        table = pa.Table.from_pylist(rows, schema=schema)
+        pq.write_table(table, path, compression="zstd")
+        written.append(path)
+    return written
+
+
+def export_submissions(
+    source: SubmissionSource,
+    out_dir: str | Path,
+    page_size: int = 5000,
+    engine: Optional[TaxEngine] = None,
+) -> int:
+    """Export rows added since the last run to partitioned Parquet
+
+    Args:
+        source: Submission store to page through
+        out_dir: Root directory of the partitioned dataset
+        page_size: Rows fetched per keyset page
+        engine: Optional engine used to recompute breakdowns that weren't stored
+
+    Returns:
+        Number of rows exported
+    """
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as e:
+        raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)") from e
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    last_id = load_state(out_dir)
+    exported = 0
+
+    for page in iter_pages(source, last_id, page_size):
+        write_partitions(out_dir, (flatten_row(row, engine) for row in page))
+        last_id = page[-1]["id"]
+        save_state(out_dir, last_id)
+        exported += len(page)
+        logger.info(f"Exported {exported} submissions (last id {last_id})")
+
+    return exported
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Export submissions to partitioned Parquet")
+    parser.add_argument("--out", required=True, help="Output dataset directory")
+    parser.add_argument("--source", help="Local JSON lines file to read instead of Supabase")
+    parser.add_argument("--page-size", type=int, default=5000)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    if args.source:
+        source: SubmissionSource = JsonlSource(args.source)
+    else:
+        from supabase import create_client
+
+        if not (settings.SUPABASE_URL and settings.SUPABASE_KEY):
+            parser.error("SUPABASE_URL/SUPABASE_KEY not configured; pass --source for a local file")
+        source = SupabaseSource(create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY))
+
+    engine = TaxEngine(TaxRates.load_from_yaml(settings.TAX_RATES_PATH))
+    count = export_submissions(source, args.out, page_size=args.page_size, engine=engine)
+    print(f"Exported {count} submissions to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""Slow-request flight recorder
+
+Requests slower than a threshold are kept in a bounded ring buffer together
+with everything needed to reproduce them offline: the calculation inputs,
+per-stage timings, rates version, cache hit/miss status and the worker that
+served them. No client identifiers (IP, user agent, session) are kept.
+
+Salaries and spending are personal, so by default inputs are bucketed
+(amounts to two significant figures, age to five years) before they are
+kept: close enough to replay a slow calculation's cost, not the user's exact
+figures. ``SLOW_REQUEST_INPUTS=hash`` keeps only a hash; ``raw`` (opt-in)
+keeps the exact inputs for faithful replays.
+
+Handlers attach their inputs with ``attach_inputs``; the middleware decides
+at the end of the request whether it was slow enough to record.
+
+Replaying a dump against the current rates:
+    python -m app.services.flight_recorder slow_requests.json
+"""
+import argparse
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+from app.config import settings
+from app.domain.engine import TaxEngine
+from app.domain.profiles import build_profiles
+from app.services import metrics
+
+INPUTS_KEY = "flight_inputs"
+CACHE_KEY = "cache_status"
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def input_hash(inputs: Dict[str, Any]) -> str:
+    """Stable hash of a normalized input dict, for grouping repeat offenders"""
+    canonical = json.dumps(inputs, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(canonical.encode(), digest_size=8).hexdigest()
+
+
+def normalize_inputs(inputs: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop unset values so equivalent requests normalize identically"""
+    return {key: value for key, value in sorted(inputs.items()) if value is not None}
+
+
+INPUT_MODES = ("hash", "bucketed", "raw")
+
+
+def bucket_value(key: str, value: Any) -> Any:
+    """Coarsen one input: amounts to 2 significant figures, age to 5 years"""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return value
+    if key == "age":
+        return int(value) // 5 * 5
+    if isinstance(value, float):
+        return float(f"{value:.2g}")
+    return value
+
+
+def bucket_inputs(inputs: Dict[str, Any]) -> Dict[str, Any]:
+    """Bucketed copy of a normalized input dict"""
+    return {key: bucket_value(key, value) for key, value in inputs.items()}
+
+
+def attach_inputs(request, inputs: Dict[str, Any], rates_version: Optional[str] = None) -> None:
+    """Remember this request's calculation inputs in case it turns out slow"""
+    request.scope[INPUTS_KEY] = (inputs, rates_version)
+
+
+def record_cache_status(request, cache: str, hit: bool) -> None:
+    """Note whether a cache consulted while serving this request hit"""
+    request.scope.setdefault(CACHE_KEY, {})[cache] = "hit" if hit else "miss"
+
+
+class FlightRecorder:
+    """Ring buffer of requests slower than ``threshold_ms``"""
+
+    def __init__(self, threshold_ms: float = 250.0, capacity: int = 100, inputs_mode: str = "bucketed"):
+        if inputs_mode not in INPUT_MODES:
+            raise ValueError(f"inputs_mode must be one of {INPUT_MODES}, got {inputs_mode!r}")
+        self.threshold = threshold_ms / 1000.0
+        self.inputs_mode = inputs_mode
+        self.entries: deque = deque(maxlen=capacity)
+        self.recorded = 0
+        self._lock = threading.Lock()
+
+    def observe(self, scope: dict, duration: float, status: int) -> bool:
+        """Record the request if it was slow; returns whether it was recorded"""
+        if duration < self.threshold:
+            return False
+
+        entry: Dict[str, Any] = {
+            "timestamp": time.time(),
+            "method": scope.get("method"),
+            "path": scope.get("path"),
+            "route": metrics.route_label(scope),
+            "status": status,
+            "duration_ms": round(duration * 1000.0, 3),
+            "stages_ms": {
+                stage: round(seconds * 1000.0, 3)
+                for stage, seconds in scope.get(metrics.TIMINGS_KEY, {}).items()
+            },
+            "cache": dict(scope.get(CACHE_KEY, {})),
+            "worker": WORKER_ID,
+            "rates_version": None,
+            "input_hash": None,
+            "inputs_mode": self.inputs_mode,
+            "inputs": None,
+        }
+        attached = scope.get(INPUTS_KEY)
+        if attached is not None:
+            inputs = normalize_inputs(attached[0])
+            entry["rates_version"] = attached[1]
+            entry["input_hash"] = input_hash(inputs)
+            if self.inputs_mode == "raw":
+                entry["inputs"] = inputs
+            elif self.inputs_mode == "bucketed":
+                entry["inputs"] = bucket_inputs(inputs)
+
+        with self._lock:
+            self.entries.append(entry)
+            self.recorded += 1
+        return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self.entries.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Recorded entries, newest first"""
+        with self._lock:
+            entries = list(self.entries)
+        return {
+            "threshold_ms": self.threshold * 1000.0,
+            "capacity": self.entries.maxlen,
+            "worker": WORKER_ID,
+            "recorded_total": self.recorded,
+            "entries": entries[::-1],
+        }
+
+
+class FlightRecorderMiddleware:
+    """ASGI middleware handing finished requests to the flight recorder
+
+    Must sit inside MetricsMiddleware, which sets the request start time and
+    the stage timings dict.
+    """
+
+    def __init__(self, app, recorder: FlightRecorder):
+        self.app = app
+        self.recorder = recorder
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            started = scope.get(metrics.START_KEY)
+            if started is not None:
+                self.recorder.observe(scope, time.perf_counter() - started, status["code"])
+
+
+def replay(entry: Dict[str, Any], engine: TaxEngine, repeat: int = 1) -> Dict[str, Any]:
+    """Re-run a recorded request's calculation and time it"""
+    profiles = build_profiles(entry["inputs"])
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        _, total = engine.run(*profiles)
+        timings.append(time.perf_counter() - started)
+    return {
+        "input_hash": entry.get("input_hash"),
+        "recorded_ms": entry.get("duration_ms"),
+        "recorded_engine_run_ms": entry.get("stages_ms", {}).get("engine_run"),
+        "replay_min_ms": min(timings) * 1000.0,
+        "total": total,
+        "same_rates": entry.get("rates_version") == engine.rates.version,
+        "exact_inputs": entry.get("inputs_mode", "raw") == "raw",
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command line entry point: replay a JSON dump against TaxEngine"""
+    from app.domain.rates import TaxRates
+
+    parser = argparse.ArgumentParser(description="Replay recorded slow requests against TaxEngine")
+    parser.add_argument("dump", help="JSON saved from /admin/slow-requests/download")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per entry (fastest is reported)")
+    args = parser.parse_args(argv)
+
+    with open(args.dump, "r") as f:
+        entries = json.load(f)["entries"]
+
+    engine = TaxEngine(TaxRates.load_from_yaml(settings.TAX_RATES_PATH))
+    for entry in entries:
+        if not entry.get("inputs"):
+            continue
+        result = replay(entry, engine, repeat=args.repeat)
+        notes = "" if result["same_rates"] else " (rates changed since recording)"
+        if not result["exact_inputs"]:
+            notes += " (bucketed inputs)"
+        print(
+            f"{result['input_hash']}: recorded {result['recorded_ms']}ms "
+            f"(engine {result['recorded_engine_run_ms']}ms), replay {result['replay_min_ms']:.3f}ms{notes}"
+        )
+
+
+# Global instance
+flight_recorder = FlightRecorder(
+    threshold_ms=settings.SLOW_REQUEST_THRESHOLD_MS,
+    capacity=settings.SLOW_REQUEST_BUFFER_SIZE,
+    inputs_mode=settings.SLOW_REQUEST_INPUTS,
+)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,19 @@
 """Submission logging service using Supabase"""
+import asyncio
 import logging
 import hashlib
-import httpx
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import TYPE_CHECKING, Optional, Dict, Any
 from urllib.parse import urlparse, parse_qs
 from uuid import uuid4
-from supabase import create_client, Client
 from app.config import settings
+from app.services.sampling import RotatingBloomFilter, AdaptiveSampler, dedup_key
+from app.services.submission_codec import encode_inputs, encode_results
+from app.services.tracing import tracer
+from app.services.user_agent import classify_user_agent
+
+if TYPE_CHECKING:
+    from supabase import Client
 
 logger = logging.getLogger(__name__)
 
@@ -17,26 +23,52 @@ class SubmissionLogger:
     
     def __init__(self):
         self.enabled = settings.ENABLE_SUBMISSION_LOGGING
-        self.client: Optional[Client] = None
+        self.client: Optional["Client"] = None
         
-        if self.enabled and settings.SUPABASE_URL and settings.SUPABASE_KEY:
-            try:
-                self.client = create_client(
-                    settings.SUPABASE_URL,
-                    settings.SUPABASE_KEY
-                )
-                logger.info("Supabase submission logging enabled")
-            except Exception as e:
-                logger.error(f"Failed to initialize Supabase client: {e}")
-                self.enabled = False
-        else:
+        # Background logging tasks still in flight (also keeps them referenced)
+        self._pending: set[asyncio.Task] = set()
+        self.dedup = RotatingBloomFilter(window_seconds=settings.LOG_DEDUP_WINDOW_SECONDS)
+        self.sampler = AdaptiveSampler(
+            queue_threshold=settings.LOG_SAMPLE_QUEUE_THRESHOLD,
+            lag_threshold_ms=settings.LOG_SAMPLE_LAG_THRESHOLD_MS,
+            min_rate=settings.LOG_SAMPLE_MIN_RATE,
+        )
+        self.counters = {"received": 0, "duplicates": 0, "sampled_out": 0, "enqueued": 0}
+        
+        if self.enabled and not (settings.SUPABASE_URL and settings.SUPABASE_KEY):
             logger.info("Submission logging disabled (missing Supabase config)")
+            self.enabled = False
+    
+    def connect(self) -> Optional["Client"]:
+        """
+        Create the Supabase client on first use.
+        
+        Importing supabase and building the client is slow, so this is done
+        from the app lifespan (in a worker thread) rather than at import time.
+        """
+        if self.client is not None or not self.enabled:
+            return self.client
+        
+        try:
+            from supabase import create_client
+            
+            self.client = create_client(
+                settings.SUPABASE_URL,
+                settings.SUPABASE_KEY
+            )
+            logger.info("Supabase submission logging enabled")
+        except Exception as e:
+            logger.error(f"Failed to initialize Supabase client: {e}")
+            self.enabled = False
+        return self.client
     
     async def get_geo_data(self, ip_address: str) -> Optional[Dict[str, Any]]:
         """Get geographic data from IP address using ip-api.com (free, no key needed)"""
         try:
+            import httpx
+            
             async with httpx.AsyncClient(timeout=5.0) as client:
-                response = await client.get(f"http://ip-api.com/json/{ip_address}")
+                response = await client.get(settings.GEO_LOOKUP_URL.format(ip=ip_address))
                 if response.status_code == 200:
                     data = response.json()
                     if data.get("status") == "success":
@@ -55,50 +87,7 @@ class SubmissionLogger:
     
     def parse_user_agent(self, user_agent: str) -> Dict[str, Optional[str]]:
         """Parse user agent string to extract browser, OS, and device info"""
-        # Basic parsing - you could use 'user-agents' library for more accuracy
-        ua_lower = user_agent.lower()
-        
-        # Detect browser
-        if "edg/" in ua_lower or "edge/" in ua_lower:
-            browser = "Edge"
-        elif "chrome/" in ua_lower and "edg/" not in ua_lower:
-            browser = "Chrome"
-        elif "firefox/" in ua_lower:
-            browser = "Firefox"
-        elif "safari/" in ua_lower and "chrome" not in ua_lower:
-            browser = "Safari"
-        elif "opera/" in ua_lower or "opr/" in ua_lower:
-            browser = "Opera"
-        else:
-            browser = "Other"
-        
-        # Detect OS
-        if "windows" in ua_lower:
-            os = "Windows"
-        elif "mac os x" in ua_lower or "macos" in ua_lower:
-            os = "macOS"
-        elif "linux" in ua_lower:
-            os = "Linux"
-        elif "android" in ua_lower:
-            os = "Android"
-        elif "iphone" in ua_lower or "ipad" in ua_lower:
-            os = "iOS"
-        else:
-            os = "Other"
-        
-        # Detect device type
-        if "mobile" in ua_lower or "iphone" in ua_lower:
-            device_type = "mobile"
-        elif "tablet" in ua_lower or "ipad" in ua_lower:
-            device_type = "tablet"
-        else:
-            device_type = "desktop"
-        
-        return {
-            "browser": browser,
-            "os": os,
-            "device_type": device_type
-        }
+        return classify_user_agent(user_agent).as_dict()
     
     def parse_referrer(self, referrer: str) -> Dict[str, Optional[str]]:
         """Extract domain and UTM parameters from referrer URL"""
@@ -136,11 +125,146 @@ class SubmissionLogger:
             logger.warning(f"Invalid UUID format: {value}, setting to None")
             return None
     
-    async def log_submission(
+    @property
+    def queue_depth(self) -> int:
+        """Number of background logging tasks not yet finished"""
+        return len(self._pending)
+    
+    def enqueue(
         self,
         form_data: Dict[str, Any],
         results: Dict[str, Any],
         request_data: Dict[str, Any]
+    ) -> bool:
+        """
+        Schedule a submission for background logging.
+        
+        Re-submits of the same inputs by the same session within the dedup
+        window are counted but not logged, and submissions are sampled down
+        when the logging queue or event loop is under pressure.
+        
+        Must be called from within a running event loop.
+        
+        Returns:
+            True if a logging task was scheduled, False otherwise
+        """
+        if not self.enabled or not self.connect():
+            return False
+        
+        self.counters["received"] += 1
+        client_key = request_data.get("session_id") or request_data.get("ip_address") or ""
+        if self.dedup.check_and_add(dedup_key(client_key, form_data)):
+            self.counters["duplicates"] += 1
+            return False
+        
+        keep, sample_weight = self.sampler.sample(self.queue_depth)
+        if not keep:
+            self.counters["sampled_out"] += 1
+            return False
+        
+        task = asyncio.create_task(
+            self.log_submission(form_data, results, request_data, sample_weight=sample_weight)
+        )
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+        self.counters["enqueued"] += 1
+        return True
+    
+    def build_submission(
+        self,
+        form_data: Dict[str, Any],
+        results: Dict[str, Any],
+        request_data: Dict[str, Any],
+        geo_data: Optional[Dict[str, Any]],
+        sample_weight: float = 1.0
+    ) -> Dict[str, Any]:
+        """Build the submissions table row from a request and its enrichment data"""
+        # Extract IP address
+        ip_address = request_data.get("ip_address", "")
+        ip_hash = hashlib.sha256(ip_address.encode()).hexdigest() if ip_address else None
+        
+        # Parse user agent
+        user_agent = request_data.get("user_agent", "")
+        with tracer.span("logger.parse_user_agent"):
+            ua_data = self.parse_user_agent(user_agent) if user_agent else {}
+        
+        # Parse referrer
+        referrer = request_data.get("referrer", "")
+        with tracer.span("logger.parse_referrer"):
+            referrer_data = self.parse_referrer(referrer)
+        
+        # Build submission record
+        submission = {
+            # Core metrics (ensure proper types)
+            "timestamp": datetime.utcnow().isoformat(),
+            "annual_salary": int(float(form_data.get("annual_salary", 0))) if form_data.get("annual_salary") else None,
+            "total_to_govt": float(results.get("total_annual", 0)) if results.get("total_annual") else None,
+            "effective_rate": float(results.get("percentage", 0)) if results.get("percentage") else None,
+            "sample_weight": sample_weight,
+            
+            # Compact inputs/results (see app/services/submission_codec.py)
+            "form_data": encode_inputs(form_data),
+            "results": encode_results(results, settings.SUBMISSION_STORE_BREAKDOWN),
+            
+            # Geographic data
+            "ip_hash": ip_hash,
+            "country_code": geo_data.get("country_code") if geo_data else None,
+            "country_name": geo_data.get("country_name") if geo_data else None,
+            "region": geo_data.get("region") if geo_data else None,
+            "city": geo_data.get("city") if geo_data else None,
+            "timezone": geo_data.get("timezone") if geo_data else None,
+            "latitude": float(geo_data.get("latitude")) if geo_data and geo_data.get("latitude") else None,
+            "longitude": float(geo_data.get("longitude")) if geo_data and geo_data.get("longitude") else None,
+            
+            # Browser & Device
+            "user_agent": user_agent[:500] if user_agent else None,
+            "browser": ua_data.get("browser"),
+            "browser_version": ua_data.get("browser_version"),
+            "os": ua_data.get("os"),
+            "os_version": ua_data.get("os_version"),
+            "device_type": ua_data.get("device_type"),
+            
+            # Screen & Display (from client-side data, ensure integers)
+            "screen_width": int(request_data.get("screen_width")) if request_data.get("screen_width") else None,
+            "screen_height": int(request_data.get("screen_height")) if request_data.get("screen_height") else None,
+            "screen_color_depth": int(request_data.get("screen_color_depth")) if request_data.get("screen_color_depth") else None,
+            "pixel_ratio": float(request_data.get("pixel_ratio")) if request_data.get("pixel_ratio") else None,
+            "viewport_width": int(request_data.get("viewport_width")) if request_data.get("viewport_width") else None,
+            "viewport_height": int(request_data.get("viewport_height")) if request_data.get("viewport_height") else None,
+            
+            # Traffic Source
+            "referrer": referrer[:500] if referrer else None,
+            "referrer_domain": referrer_data.get("referrer_domain"),
+            "utm_source": referrer_data.get("utm_source"),
+            "utm_medium": referrer_data.get("utm_medium"),
+            "utm_campaign": referrer_data.get("utm_campaign"),
+            "utm_term": referrer_data.get("utm_term"),
+            "utm_content": referrer_data.get("utm_content"),
+            
+            # Session & Behavior (validate UUID format)
+            "session_id": self._validate_uuid(request_data.get("session_id")),
+            "language": request_data.get("language", "")[:20] if request_data.get("language") else None,
+            "languages": request_data.get("languages", "")[:200] if request_data.get("languages") else None,
+            "time_to_complete_seconds": int(request_data.get("time_to_complete_seconds")) if request_data.get("time_to_complete_seconds") else None,
+            
+            # Browser Capabilities (from client-side)
+            "cookies_enabled": request_data.get("cookies_enabled"),
+            "do_not_track": request_data.get("do_not_track"),
+            "online": request_data.get("online"),
+            "touch_support": request_data.get("touch_support"),
+            "webgl_support": request_data.get("webgl_support"),
+            "local_storage_support": request_data.get("local_storage_support"),
+        }
+        
+        return submission
+    
+    @tracer.traced("logger.log_submission")
+    async def log_submission(
+        self,
+        form_data: Dict[str, Any],
+        results: Dict[str, Any],
+        request_data: Dict[str, Any],
+        sample_weight: float = 1.0
     ) -> bool:
         """
         Log a form submission with comprehensive metadata.
@@ -149,6 +273,7 @@ class SubmissionLogger:
             form_data: Form input values
             results: Calculation results
             request_data: Request metadata (headers, client info, etc.)
+            sample_weight: Inverse of the sampling rate this row was kept at
         
         Returns:
             True if logged successfully, False otherwise
@@ -157,83 +282,17 @@ class SubmissionLogger:
             return False
         
         try:
-            # Extract IP address
-            ip_address = request_data.get("ip_address", "")
-            ip_hash = hashlib.sha256(ip_address.encode()).hexdigest() if ip_address else None
-            
             # Get geographic data
-            geo_data = await self.get_geo_data(ip_address) if ip_address else {}
-            
-            # Parse user agent
-            user_agent = request_data.get("user_agent", "")
-            ua_data = self.parse_user_agent(user_agent) if user_agent else {}
-            
-            # Parse referrer
-            referrer = request_data.get("referrer", "")
-            referrer_data = self.parse_referrer(referrer)
+            ip_address = request_data.get("ip_address", "")
+            with tracer.span("logger.geo_lookup"):
+                geo_data = await self.get_geo_data(ip_address) if ip_address else {}
             
-            # Build submission record
-            submission = {
-                # Core metrics (ensure proper types)
-                "timestamp": datetime.utcnow().isoformat(),
-                "annual_salary": int(float(form_data.get("annual_salary", 0))) if form_data.get("annual_salary") else None,
-                "total_to_govt": float(results.get("total_annual", 0)) if results.get("total_annual") else None,
-                "effective_rate": float(results.get("percentage", 0)) if results.get("percentage") else None,
-                
-                # Full data
-                "form_data": form_data,
-                "results": results,
-                
-                # Geographic data
-                "ip_hash": ip_hash,
-                "country_code": geo_data.get("country_code") if geo_data else None,
-                "country_name": geo_data.get("country_name") if geo_data else None,
-                "region": geo_data.get("region") if geo_data else None,
-                "city": geo_data.get("city") if geo_data else None,
-                "timezone": geo_data.get("timezone") if geo_data else None,
-                "latitude": float(geo_data.get("latitude")) if geo_data and geo_data.get("latitude") else None,
-                "longitude": float(geo_data.get("longitude")) if geo_data and geo_data.get("longitude") else None,
-                
-                # Browser & Device
-                "user_agent": user_agent[:500] if user_agent else None,
-                "browser": ua_data.get("browser"),
-                "os": ua_data.get("os"),
-                "device_type": ua_data.get("device_type"),
-                
-                # Screen & Display (from client-side data, ensure integers)
-                "screen_width": int(request_data.get("screen_width")) if request_data.get("screen_width") else None,
-                "screen_height": int(request_data.get("screen_height")) if request_data.get("screen_height") else None,
-                "screen_color_depth": int(request_data.get("screen_color_depth")) if request_data.get("screen_color_depth") else None,
-                "pixel_ratio": float(request_data.get("pixel_ratio")) if request_data.get("pixel_ratio") else None,
-                "viewport_width": int(request_data.get("viewport_width")) if request_data.get("viewport_width") else None,
-                "viewport_height": int(request_data.get("viewport_height")) if request_data.get("viewport_height") else None,
-                
-                # Traffic Source
-                "referrer": referrer[:500] if referrer else None,
-                "referrer_domain": referrer_data.get("referrer_domain"),
-                "utm_source": referrer_data.get("utm_source"),
-                "utm_medium": referrer_data.get("utm_medium"),
-                "utm_campaign": referrer_data.get("utm_campaign"),
-                "utm_term": referrer_data.get("utm_term"),
-                "utm_content": referrer_data.get("utm_content"),
-                
-                # Session & Behavior (validate UUID format)
-                "session_id": self._validate_uuid(request_data.get("session_id")),
-                "language": request_data.get("language", "")[:20] if request_data.get("language") else None,
-                "languages": request_data.get("languages", "")[:200] if request_data.get("languages") else None,
-                "time_to_complete_seconds": int(request_data.get("time_to_complete_seconds")) if request_data.get("time_to_complete_seconds") else None,
-                
-                # Browser Capabilities (from client-side)
-                "cookies_enabled": request_data.get("cookies_enabled"),
-                "do_not_track": request_data.get("do_not_track"),
-                "online": request_data.get("online"),
-                "touch_support": request_data.get("touch_support"),
-                "webgl_support": request_data.get("webgl_support"),
-                "local_storage_support": request_data.get("local_storage_support"),
-            }
+            with tracer.span("logger.build_submission"):
+                submission = self.build_submission(form_data, results, request_data, geo_data, sample_weight)
             
             # Insert into Supabase
-            response = self.client.table("submissions").insert(submission).execute()
+            with tracer.span("logger.insert"):
+                response = self.client.table("submissions").insert(submission).execute()
             
             if response.data:
                 logger.info(f"Logged submission {response.data[0].get('id')}")
@@ -253,7 +312,7 @@ class SubmissionLogger:
         Returns:
             Dict with statistics or None if disabled
         """
-        if not self.enabled or not self.client:
+        if not self.enabled or not self.connect():
             return None
         
         try:
@@ -268,6 +327,7 @@ class SubmissionLogger:
             return {
                 'total_submissions': total_count,
                 'average_effective_rate': avg_rate,
+                'logging_counters': dict(self.counters),
             }
         except Exception as e:
             logger.error(f"Failed to get statistics: {e}")
@@ -0,0 +1,183 @@
+"""Event-loop lag measurement and blocking-call detection
+
+A heartbeat coroutine sleeps for a fixed interval and records how late it
+wakes up; that overshoot is the event-loop lag every other request waiting on
+the loop experienced. A watchdog thread watches the heartbeat and, when the
+loop has not ticked for longer than the blocking threshold, captures the loop
+thread's current stack so the offending synchronous call can be found.
+"""
+import asyncio
+import bisect
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the lag histogram buckets; the last bucket is +Inf
+LAG_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class LagHistogram:
+    """Fixed-bucket histogram of lag samples in milliseconds"""
+
+    def __init__(self, buckets_ms: tuple = LAG_BUCKETS_MS):
+        self.buckets_ms = buckets_ms
+        self.counts = [0] * (len(buckets_ms) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, value_ms: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets_ms, value_ms)] += 1
+        self.count += 1
+        self.total_ms += value_ms
+        self.max_ms = max(self.max_ms, value_ms)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket containing the q-th quantile"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        running = 0
+        for i, bucket_count in enumerate(self.counts):
+            running += bucket_count
+            if running >= target:
+                return float(self.buckets_ms[i]) if i < len(self.buckets_ms) else self.max_ms
+        return self.max_ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean_ms": self.total_ms / self.count if self.count else 0.0,
+            "max_ms": self.max_ms,
+            "p50_ms": self.quantile(0.50),
+            "p99_ms": self.quantile(0.99),
+            "buckets": {
+                **{f"le_{b}": c for b, c in zip(self.buckets_ms, self.counts)},
+                "le_inf": self.counts[-1],
+            },
+        }
+
+
+class LoopMonitor:
+    """Measure event-loop lag and capture stacks of blocking callbacks
+
+    Call ``start()`` from inside the running loop (e.g. the app lifespan) and
+    ``await stop()`` on shutdown.
+    """
+
+    def __init__(
+        self,
+        interval_ms: float = 50.0,
+        block_threshold_ms: float = 250.0,
+        max_stalls: int = 20,
+    ):
+        self.interval = interval_ms / 1000.0
+        self.block_threshold = block_threshold_ms / 1000.0
+        self.histogram = LagHistogram()
+        self.stalls: deque = deque(maxlen=max_stalls)
+        self.last_lag_ms = 0.0
+
+        self._last_beat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._open_stall: Optional[Dict[str, Any]] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start the heartbeat task and watchdog thread"""
+        if self.running:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+        logger.info("Event loop monitor started")
+
+    async def stop(self) -> None:
+        """Stop the heartbeat task and watchdog thread"""
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1.0)
+            self._watchdog = None
+
+    def current_lag_ms(self) -> float:
+        """Most recent lag, including a stall that is still in progress"""
+        in_progress = (time.monotonic() - self._last_beat - self.interval) * 1000.0
+        return max(self.last_lag_ms, in_progress, 0.0)
+
+    async def _heartbeat(self) -> None:
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag_ms = max(0.0, (now - started - self.interval) * 1000.0)
+            self.last_lag_ms = lag_ms
+            self.histogram.observe(lag_ms)
+            self._last_beat = now
+
+            stall = self._open_stall
+            if stall is not None:
+                # The blocking call has returned: record how long it really took
+                stall["duration_ms"] = round(lag_ms, 1)
+                self._open_stall = None
+
+    def _watch(self) -> None:
+        check_every = max(self.block_threshold / 4, 0.01)
+        while not self._stop.wait(check_every):
+            last_beat = self._last_beat
+            blocked_for = time.monotonic() - last_beat - self.interval
+            if blocked_for < self.block_threshold:
+                continue
+            if self._open_stall is not None and self._open_stall["beat"] == last_beat:
+                continue  # already captured this stall
+            self._capture_stall(last_beat, blocked_for)
+
+    def _capture_stall(self, last_beat: float, blocked_for: float) -> None:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = "".join(traceback.format_stack(frame)) if frame is not None else ""
+        stall = {
+            "beat": last_beat,
+            "detected_at": time.time(),
+            "blocked_for_ms": round(blocked_for * 1000.0, 1),
+            "duration_ms": None,
+            "stack": stack,
+        }
+        self._open_stall = stall
+        self.stalls.append(stall)
+        logger.warning(
+            f"Event loop blocked for {stall['blocked_for_ms']}ms, current stack:\n{stack}"
+        )
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Lag histogram and recent stalls for the admin interface"""
+        stalls: List[Dict[str, Any]] = [
+            {k: v for k, v in stall.items() if k != "beat"} for stall in list(self.stalls)
+        ]
+        return {
+            "running": self.running,
+            "interval_ms": self.interval * 1000.0,
+            "block_threshold_ms": self.block_threshold * 1000.0,
+            "current_lag_ms": self.current_lag_ms() if self.running else 0.0,
+            "lag": self.histogram.snapshot(),
+            "stalls": stalls,
+        }
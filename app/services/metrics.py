@@ -0,0 +1,351 @@
+"""In-process metrics with Prometheus text exposition
+
+Counters and histograms keep one shard of values per thread, so the hot path
+(event loop plus the threadpool running sync endpoints) only ever touches its
+own dict and never takes a lock. Shards are summed when /metrics is scraped.
+When a thread exits (threadpool workers are replaced after idling) its shard
+is folded into a single "retired" shard, so the shard list stays as long as
+the number of live threads.
+
+Per-request stage timings are also kept in the ASGI scope (``scope["timings"]``)
+so other instrumentation can read the same numbers for a single request.
+"""
+import bisect
+import os
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from app.config import settings
+from app.domain.instrumentation import CalculatorTimings
+from app.services.tracing import TracingInstrumentation, tracer
+
+# Latency buckets in seconds, tuned for a sub-100ms app
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+TIMINGS_KEY = "timings"
+START_KEY = "request_start"
+
+
+class _ShardOwner:
+    """Lives in a thread's local storage; its finalizer retires the shard"""
+    __slots__ = ("__weakref__",)
+
+
+class _Sharded:
+    """Per-thread value dicts, registered once per thread"""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards: List[dict] = []
+        self._retired: dict = {}
+        # Reentrant: a finalizer can run in a thread that is registering a shard
+        self._register_lock = threading.RLock()
+
+    def _shard(self) -> dict:
+        try:
+            return self._local.values
+        except AttributeError:
+            values: dict = {}
+            owner = _ShardOwner()
+            with self._register_lock:
+                self._shards.append(values)
+            finalizer = weakref.finalize(owner, self._retire, values)
+            finalizer.atexit = False
+            self._local.values = values
+            self._local.owner = owner
+            return values
+
+    def _retire(self, values: dict) -> None:
+        """Fold a dead thread's shard into the retired shard"""
+        with self._register_lock:
+            # Compare by identity: distinct shards can hold equal values
+            self._shards = [shard for shard in self._shards if shard is not values]
+            retired: dict = {}
+            self._merge(retired, list(self._retired.items()))
+            self._merge(retired, list(values.items()))
+            self._retired = retired
+
+    def _merge(self, totals: dict, items: list) -> None:
+        raise NotImplementedError
+
+    def _snapshots(self) -> List[list]:
+        # list(dict.items()) is a single C call, so live shards are safe under the GIL
+        with self._register_lock:
+            return [list(self._retired.items())] + [list(shard.items()) for shard in self._shards]
+
+
+class Counter(_Sharded):
+    """Monotonic counter with optional labels"""
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__()
+        self.name, self.help, self.labelnames = name, help, labelnames
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0.0) + amount
+
+    def _merge(self, totals: Dict[tuple, float], items: list) -> None:
+        for labels, value in items:
+            totals[labels] = totals.get(labels, 0.0) + value
+
+    def collect(self) -> Dict[tuple, float]:
+        totals: Dict[tuple, float] = {}
+        for items in self._snapshots():
+            self._merge(totals, items)
+        return totals
+
+    def samples(self) -> Iterator[Tuple[str, Dict[str, str], float]]:
+        for labels, value in sorted(self.collect().items()):
+            yield self.name, dict(zip(self.labelnames, labels)), value
+
+
+class Histogram(_Sharded):
+    """Fixed-bucket histogram with optional labels"""
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        super().__init__()
+        self.name, self.help, self.labelnames, self.buckets = name, help, labelnames, buckets
+
+    def observe(self, value: float, *labels: str) -> None:
+        shard = self._shard()
+        state = shard.get(labels)
+        if state is None:
+            # [bucket counts..., +Inf count, sum]
+            state = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        state[bisect.bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def _merge(self, totals: Dict[tuple, list], items: list) -> None:
+        for labels, state in items:
+            merged = totals.setdefault(labels, [0] * len(state[:-1]) + [0.0])
+            for i, v in enumerate(state):
+                merged[i] += v
+
+    def collect(self) -> Dict[tuple, list]:
+        totals: Dict[tuple, list] = {}
+        for items in self._snapshots():
+            self._merge(totals, items)
+        return totals
+
+    def samples(self) -> Iterator[Tuple[str, Dict[str, str], float]]:
+        for labels, state in sorted(self.collect().items()):
+            base = dict(zip(self.labelnames, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                yield f"{self.name}_bucket", {**base, "le": repr(bound)}, cumulative
+            cumulative += state[len(self.buckets)]
+            yield f"{self.name}_bucket", {**base, "le": "+Inf"}, cumulative
+            yield f"{self.name}_sum", base, state[-1]
+            yield f"{self.name}_count", base, cumulative
+
+
+class CallbackMetric:
+    """Metric whose samples are computed at scrape time"""
+
+    def __init__(self, name: str, help: str, type: str, fn: Callable[[], Any]):
+        self.name, self.help, self.type, self.fn = name, help, type, fn
+
+    def samples(self) -> Iterator[Tuple[str, Dict[str, str], float]]:
+        value = self.fn()
+        if isinstance(value, (int, float)):
+            yield self.name, {}, value
+            return
+        for labels, v in value:
+            yield self.name, labels, v
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+class MetricsRegistry:
+    """Ordered collection of metrics rendered in Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._caches: Dict[str, Callable[[], Tuple[int, int]]] = {}
+
+    def register(self, metric):
+        """Add (or replace, by name) a metric"""
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Tuple[str, ...] = (), **kwargs) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, **kwargs))
+
+    def callback(self, name: str, help: str, fn: Callable[[], Any], type: str = "gauge") -> CallbackMetric:
+        return self.register(CallbackMetric(name, help, type, fn))
+
+    def register_cache(self, name: str, stats: Callable[[], Tuple[int, int]]) -> None:
+        """Expose hit/miss counts of a cache; ``stats`` returns (hits, misses)"""
+        self._caches[name] = stats
+
+    def _cache_samples(self, index: int) -> List[Tuple[Dict[str, str], float]]:
+        return [({"cache": name}, stats()[index]) for name, stats in sorted(self._caches.items())]
+
+    def _cache_ratios(self) -> List[Tuple[Dict[str, str], float]]:
+        ratios = []
+        for name, stats in sorted(self._caches.items()):
+            hits, misses = stats()[:2]
+            ratios.append(({"cache": name}, hits / (hits + misses) if hits + misses else 0.0))
+        return ratios
+
+    def render(self) -> str:
+        """Render every metric in Prometheus text exposition format 0.0.4"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for sample_name, labels, value in metric.samples():
+                lines.append(f"{sample_name}{_format_labels(labels)} {float(value)!r}")
+        return "\n".join(lines) + "\n"
+
+
+def process_rss_bytes() -> float:
+    """Current resident set size of this process"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        # Peak RSS in KiB on Linux: the best we can do without /proc
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+registry = MetricsRegistry()
+
+REQUESTS = registry.counter(
+    "bleedrate_requests_total", "HTTP requests by route and status", ("route", "status")
+)
+REQUEST_SECONDS = registry.histogram(
+    "bleedrate_request_seconds", "End-to-end request latency by route", ("route",)
+)
+STAGE_SECONDS = registry.histogram(
+    "bleedrate_stage_seconds", "Latency of request processing stages", ("route", "stage")
+)
+registry.callback("process_resident_memory_bytes", "Resident memory size in bytes", process_rss_bytes)
+registry.callback(
+    "bleedrate_cache_hits_total", "Cache hits by cache", lambda: registry._cache_samples(0), "counter"
+)
+registry.callback(
+    "bleedrate_cache_misses_total", "Cache misses by cache", lambda: registry._cache_samples(1), "counter"
+)
+registry.callback("bleedrate_cache_hit_ratio", "Cache hit ratio by cache", registry._cache_ratios)
+
+# Shared by every TaxEngine the app builds; None disables calculator timing
+calculator_timings: Optional[CalculatorTimings] = (
+    CalculatorTimings(sample_every=settings.ENGINE_TIMING_SAMPLE_EVERY)
+    if settings.ENGINE_TIMING_SAMPLE_EVERY > 0
+    else None
+)
+
+# What get_tax_engine passes to TaxEngine: adds calculator spans when tracing
+engine_instrumentation = (
+    TracingInstrumentation(tracer, calculator_timings) if tracer.enabled else calculator_timings
+)
+
+_rates_version: Optional[str] = None
+
+
+def set_rates_version(version: str) -> None:
+    """Remember the rates version most recently used for a calculation"""
+    global _rates_version
+    _rates_version = version
+
+
+registry.callback(
+    "bleedrate_rates_info",
+    "Version (content hash) of the tax rates in use",
+    lambda: [({"version": _rates_version}, 1)] if _rates_version else [],
+)
+
+
+def route_label(scope: dict) -> str:
+    """Low-cardinality route label: the matched path template"""
+    route = scope.get("route")
+    if route is not None:
+        return getattr(route, "path", "unmatched")
+    return scope.get("root_path") or "unmatched"
+
+
+def record_stage(scope: dict, stage: str, seconds: float) -> None:
+    """Record a stage duration for this request and in the stage histogram"""
+    timings = scope.get(TIMINGS_KEY)
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+    STAGE_SECONDS.observe(seconds, route_label(scope), stage)
+
+
+@contextmanager
+def stage(request, name: str):
+    """Time a block of request handling as a named stage (and trace span)"""
+    started = time.perf_counter()
+    try:
+        with tracer.span(f"stage.{name}"):
+            yield
+    finally:
+        record_stage(request.scope, name, time.perf_counter() - started)
+
+
+def mark_handler_start(request) -> None:
+    """Record the "parse" stage: routing, body/form parsing and validation
+
+    Dependency stages (e.g. engine lookup) that ran before the handler are
+    excluded so they aren't double counted.
+    """
+    scope = request.scope
+    started = scope.get(START_KEY)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    already_recorded = sum(scope.get(TIMINGS_KEY, {}).values())
+    record_stage(scope, "parse", max(0.0, elapsed - already_recorded))
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request counts and end-to-end latency"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        scope[START_KEY] = started = time.perf_counter()
+        scope[TIMINGS_KEY] = {}
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = route_label(scope)
+            REQUESTS.inc(route, str(status["code"]))
+            REQUEST_SECONDS.observe(time.perf_counter() - started, route)
@@ -0,0 +1,230 @@
+"""On-demand sampling profiler for live requests
+
+An admin arms the profiler for the next N requests (or T seconds) on a route.
+While a matching request is in flight, a background thread samples the stacks
+of the event loop thread serving it and of the threadpool workers running sync
+dependencies and endpoints, when they are executing application code. Helper
+threads that idle inside app code (the loop watchdog, the trace exporter) are
+never sampled. Samples are aggregated and exported in speedscope's
+sampled-profile format.
+
+Nothing runs unless armed: the middleware checks one attribute per request and
+the sampler thread only exists while a capture is active. Requests that run
+concurrently with a profiled one on the same worker also contribute samples.
+"""
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Set, Tuple
+from app.config import settings
+
+# Frames from these paths mark a thread as doing work for the app
+_APP_PATHS = (str(settings.BASE_DIR / "app"), str(settings.BASE_DIR / "db"))
+
+# Name of the threads anyio's threadpool runs sync endpoints and dependencies in
+_WORKER_THREAD_NAME = "AnyIO worker thread"
+
+Frame = Tuple[str, str, int]  # (function name, file, first line)
+
+
+class SamplingProfiler:
+    """Stack sampler armed for a bounded number of requests or seconds"""
+
+    MAX_REQUESTS = 1000
+    MAX_SECONDS = 300.0
+
+    def __init__(self, interval_ms: float = 1.0):
+        self.interval = interval_ms / 1000.0
+        self.armed = False
+        self.route: Optional[str] = None
+        self.requests_wanted: Optional[int] = None
+        self.deadline: Optional[float] = None
+        self.captured = 0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+        self._in_flight = 0
+        self._loop_threads: Set[int] = set()
+        self._active = threading.Event()
+        self._lock = threading.Lock()
+        self._stacks: Counter = Counter()
+        self._thread: Optional[threading.Thread] = None
+
+    def arm(self, route: str, requests: Optional[int] = None, seconds: Optional[float] = None) -> Dict[str, Any]:
+        """Start a new capture, discarding any previous results"""
+        if requests is None and seconds is None:
+            raise ValueError("Specify a number of requests and/or seconds")
+        if requests is not None and not 0 < requests <= self.MAX_REQUESTS:
+            raise ValueError(f"requests must be between 1 and {self.MAX_REQUESTS}")
+        if seconds is not None and not 0 < seconds <= self.MAX_SECONDS:
+            raise ValueError(f"seconds must be between 0 and {self.MAX_SECONDS}")
+
+        self.disarm()
+        with self._lock:
+            self._stacks = Counter()
+        self._loop_threads = set()
+        self.route = route
+        self.requests_wanted = requests
+        self.deadline = time.monotonic() + seconds if seconds is not None else None
+        self.captured = 0
+        self.started_at = time.time()
+        self.finished_at = None
+        self.armed = True
+        self._thread = threading.Thread(target=self._sample_loop, name="request-profiler", daemon=True)
+        self._thread.start()
+        return self.status()
+
+    def disarm(self) -> None:
+        """Stop capturing; collected samples are kept for download"""
+        if not self.armed:
+            return
+        self.armed = False
+        self.finished_at = time.time()
+        self._active.set()  # wake the sampler so it can exit
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+        self._thread = None
+        self._active.clear()
+
+    def matches(self, path: str) -> bool:
+        if not self.armed:
+            return False
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            self.disarm()
+            return False
+        return path == self.route
+
+    def begin_request(self) -> None:
+        """Called on the event loop thread serving an armed request"""
+        self._loop_threads.add(threading.get_ident())
+        self._in_flight += 1
+        self._active.set()
+
+    def end_request(self) -> None:
+        self._in_flight -= 1
+        self.captured += 1
+        if self._in_flight == 0:
+            self._active.clear()
+        if self.requests_wanted is not None and self.captured >= self.requests_wanted:
+            self.disarm()
+
+    def _sample_loop(self) -> None:
+        while self.armed:
+            if not self._active.wait(timeout=0.1):
+                if self.deadline is not None and time.monotonic() >= self.deadline:
+                    self.disarm()
+                continue
+            if not self.armed:
+                break
+            self._sample()
+            time.sleep(self.interval)
+
+    def _serving_threads(self) -> Set[int]:
+        """The event loop threads of armed requests plus the threadpool workers"""
+        workers = {t.ident for t in threading.enumerate() if t.name.startswith(_WORKER_THREAD_NAME)}
+        return workers | self._loop_threads
+
+    def _sample(self) -> None:
+        samples = []
+        serving = self._serving_threads()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id not in serving:
+                continue
+            stack: List[Frame] = []
+            in_app = False
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                in_app = in_app or code.co_filename.startswith(_APP_PATHS)
+                frame = frame.f_back
+            if in_app:
+                samples.append(tuple(reversed(stack)))
+        if samples:
+            with self._lock:
+                self._stacks.update(samples)
+
+    def status(self) -> Dict[str, Any]:
+        """Capture state plus the hottest functions so far"""
+        with self._lock:
+            stacks = list(self._stacks.items())
+        self_counts: Counter = Counter()
+        total_counts: Counter = Counter()
+        for stack, count in stacks:
+            self_counts[stack[-1]] += count
+            for frame in set(stack):
+                total_counts[frame] += count
+
+        def describe(frame: Frame, count: int) -> Dict[str, Any]:
+            return {"function": frame[0], "file": frame[1], "line": frame[2], "samples": count}
+
+        return {
+            "armed": self.armed,
+            "route": self.route,
+            "requests_wanted": self.requests_wanted,
+            "requests_captured": self.captured,
+            "interval_ms": self.interval * 1000.0,
+            "samples": sum(count for _, count in stacks),
+            "top_self": [describe(f, c) for f, c in self_counts.most_common(20)],
+            "top_total": [describe(f, c) for f, c in total_counts.most_common(20)],
+        }
+
+    def export_speedscope(self) -> Dict[str, Any]:
+        """Aggregated samples as a speedscope file (https://www.speedscope.app)"""
+        with self._lock:
+            stacks = list(self._stacks.items())
+
+        frame_index: Dict[Frame, int] = {}
+        frames = []
+        samples = []
+        weights = []
+        interval_ms = self.interval * 1000.0
+        for stack, count in stacks:
+            indices = []
+            for frame in stack:
+                if frame not in frame_index:
+                    frame_index[frame] = len(frames)
+                    frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+                indices.append(frame_index[frame])
+            samples.append(indices)
+            weights.append(count * interval_ms)
+
+        name = f"BleedRate {self.route} ({self.captured} requests)"
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "bleedrate",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+
+
+class ProfilerMiddleware:
+    """ASGI middleware that brackets armed requests for the profiler"""
+
+    def __init__(self, app, profiler: SamplingProfiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if not self.profiler.armed or scope["type"] != "http" or not self.profiler.matches(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        self.profiler.begin_request()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.profiler.end_request()
+
+
+# Global instance
+request_profiler = SamplingProfiler()
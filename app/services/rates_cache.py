@@ -0,0 +1,55 @@
+"""Parsed tax rates shared across requests
+
+Parsing data/tax_rates.yml takes several milliseconds, so the parsed
+``TaxRates`` is kept and only reloaded when the file's mtime or size changes
+(e.g. after an edit through /admin/rates).
+"""
+import os
+import threading
+from pathlib import Path
+from typing import Optional, Tuple
+from app.config import settings
+from app.domain.rates import TaxRates
+
+
+class RatesCache:
+    """Loads ``path`` once and reloads it when the file changes"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.hits = 0
+        self.misses = 0
+        self._key: Optional[Tuple[int, int]] = None
+        self._rates: Optional[TaxRates] = None
+        self._lock = threading.Lock()
+
+    def _file_key(self) -> Tuple[int, int]:
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def get(self) -> Tuple[TaxRates, bool]:
+        """Return the current rates and whether they came from the cache"""
+        key = self._file_key()
+        rates = self._rates
+        if rates is not None and key == self._key:
+            self.hits += 1
+            return rates, True
+
+        with self._lock:
+            if self._rates is None or self._key != key:
+                self._rates = TaxRates.load_from_yaml(self.path)
+                self._key = key
+            self.misses += 1
+            return self._rates, False
+
+    def invalidate(self) -> None:
+        """Force the next ``get`` to re-read the file"""
+        with self._lock:
+            self._rates = None
+            self._key = None
+
+    def stats(self) -> Tuple[int, int]:
+        return self.hits, self.misses
+
+
+rates_cache = RatesCache(settings.TAX_RATES_PATH)
@@ -0,0 +1,209 @@
+"""Server-side store of calculation results, addressed by short handles
+
+/calc and /api/calc put each result here and hand the client a handle, so
+export, share and saved-scenario requests fetch the stored inputs and
+breakdown instead of resubmitting the form and rerunning the engine.
+
+The handle is a keyed hash of the inputs and rates version: resubmitting
+the same inputs yields the same handle (and refreshes its TTL) without
+revealing anything about them. Results live in a bounded in-memory TTL map;
+with ``path`` set they are also written to SQLite, so handles survive
+restarts and resolve in any worker. Async callers use ``put_async`` so the
+SQLite write does not block the event loop.
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+from app.config import settings
+from app.services.submission_codec import INPUT_DEFAULTS
+
+# Expired SQLite rows are purged every N puts
+PURGE_EVERY = 100
+
+
+def result_handle(inputs: Dict[str, Any], rates_version: str, key: bytes = b"") -> str:
+    """12-character URL-safe handle for ``inputs`` under ``rates_version``"""
+    canonical = json.dumps([rates_version, inputs], sort_keys=True, separators=(",", ":"))
+    digest = hashlib.blake2b(canonical.encode(), key=key[:64], digest_size=9).digest()
+    return base64.urlsafe_b64encode(digest).decode()
+
+
+@dataclass
+class StoredResult:
+    """One calculation: inputs (non-default fields only) and its breakdown"""
+    handle: str
+    changed_inputs: Dict[str, Any]
+    breakdown: Tuple[Tuple[str, float], ...]
+    total: float
+    gross_income: float
+    rates_version: str
+    created_at: float
+
+    @property
+    def inputs(self) -> Dict[str, Any]:
+        """Every input field, defaults included"""
+        return {**INPUT_DEFAULTS, **self.changed_inputs}
+
+    @property
+    def effective_rate(self) -> float:
+        return (self.total / self.gross_income * 100.0) if self.gross_income > 0 else 0.0
+
+    @property
+    def monthly_total(self) -> float:
+        return self.total / 12
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "i": self.changed_inputs,
+            "b": self.breakdown,
+            "t": self.total,
+            "g": self.gross_income,
+            "rv": self.rates_version,
+        }, separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, handle: str, created_at: float, payload: str) -> "StoredResult":
+        data = json.loads(payload)
+        return cls(
+            handle=handle,
+            changed_inputs=data["i"],
+            breakdown=tuple((name, amount) for name, amount in data["b"]),
+            total=data["t"],
+            gross_income=data["g"],
+            rates_version=data["rv"],
+            created_at=created_at,
+        )
+
+
+class ResultStore:
+    """Bounded TTL map of handle -> StoredResult, optionally backed by SQLite"""
+
+    def __init__(
+        self,
+        ttl_seconds: float = 86400.0,
+        capacity: int = 5000,
+        path: Optional[Path] = None,
+        key: bytes = b"",
+        clock: Callable[[], float] = time.time,
+    ):
+        self.ttl = ttl_seconds
+        self.capacity = capacity
+        self.path = Path(path) if path else None
+        self.key = hashlib.blake2b(key, digest_size=32).digest()
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, StoredResult]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._puts = 0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS results "
+                "(handle TEXT PRIMARY KEY, created_at REAL NOT NULL, payload TEXT NOT NULL)"
+            )
+            self._db = db
+        return self._db
+
+    def _expire(self, now: float) -> None:
+        # Entries are kept in put order, so expired ones are at the front
+        while self._entries:
+            handle, oldest = next(iter(self._entries.items()))
+            if now - oldest.created_at < self.ttl and len(self._entries) <= self.capacity:
+                break
+            del self._entries[handle]
+
+    def put(
+        self,
+        inputs: Dict[str, Any],
+        breakdown,
+        total: float,
+        gross_income: float,
+        rates_version: str,
+    ) -> StoredResult:
+        """Store a result (``breakdown`` as (name, amount) pairs) and return it"""
+        now = self.clock()
+        result = StoredResult(
+            handle=result_handle(inputs, rates_version, self.key),
+            changed_inputs={k: v for k, v in inputs.items() if k not in INPUT_DEFAULTS or INPUT_DEFAULTS[k] != v},
+            breakdown=tuple((name, float(amount)) for name, amount in breakdown),
+            total=float(total),
+            gross_income=float(gross_income),
+            rates_version=rates_version,
+            created_at=now,
+        )
+        with self._lock:
+            self._entries[result.handle] = result
+            self._entries.move_to_end(result.handle)
+            self._expire(now)
+            if self.path is not None:
+                db = self._connect()
+                db.execute(
+                    "INSERT OR REPLACE INTO results (handle, created_at, payload) VALUES (?, ?, ?)",
+                    (result.handle, now, result.to_json()),
+                )
+                self._puts += 1
+                if self._puts % PURGE_EVERY == 0:
+                    db.execute("DELETE FROM results WHERE created_at < ?", (now - self.ttl,))
+        return result
+
+    async def put_async(
+        self,
+        inputs: Dict[str, Any],
+        breakdown,
+        total: float,
+        gross_income: float,
+        rates_version: str,
+    ) -> StoredResult:
+        """``put`` for async handlers, with the SQLite write off the event loop
+
+        The write still finishes before the handle is returned, so any worker
+        can resolve the handle as soon as the client has it.
+        """
+        if self.path is None:
+            return self.put(inputs, breakdown, total, gross_income, rates_version)
+        return await asyncio.to_thread(self.put, inputs, breakdown, total, gross_income, rates_version)
+
+    def get(self, handle: str) -> Optional[StoredResult]:
+        """The stored result for ``handle``, or None if unknown or expired"""
+        now = self.clock()
+        with self._lock:
+            self._expire(now)
+            result = self._entries.get(handle)
+            if result is None and self.path is not None:
+                row = self._connect().execute(
+                    "SELECT created_at, payload FROM results WHERE handle = ? AND created_at >= ?",
+                    (handle, now - self.ttl),
+                ).fetchone()
+                if row is not None:
+                    result = StoredResult.from_json(handle, row[0], row[1])
+            if result is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return result
+
+    def stats(self) -> Tuple[int, int]:
+        return self.hits, self.misses
+
+
+result_store = ResultStore(
+    ttl_seconds=settings.RESULT_TTL_SECONDS,
+    capacity=settings.RESULT_STORE_SIZE,
+    path=settings.BASE_DIR / settings.RESULT_STORE_PATH if settings.RESULT_STORE_PATH else None,
+    key=settings.SECRET_KEY.encode(),
+)
@@ -0,0 +1,129 @@
+"""Duplicate suppression and adaptive sampling for submission logging
+
+HTMX re-submits the form while users tweak fields, so many /calc requests are
+repeats of a calculation the same session already logged. A rotating Bloom
+filter remembers recent (session, inputs) pairs cheaply, and an adaptive
+sampler sheds logging work when the background queue or event loop is under
+pressure. Every logged row records its sample weight (1 / sampling rate) so
+aggregates stay unbiased.
+"""
+import hashlib
+import json
+import math
+import random
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+class RotatingBloomFilter:
+    """Time-windowed Bloom filter built from two rotating generations
+
+    Keys are checked against both generations and added to the current one.
+    When the window elapses the current generation becomes the previous one,
+    so a key is remembered for between one and two windows.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 10_000,
+        error_rate: float = 0.01,
+        window_seconds: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.window_seconds = window_seconds
+        self._clock = clock
+        # Standard optimal sizing for n items at false-positive rate p
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._current = bytearray((self.num_bits + 7) // 8)
+        self._previous = bytearray(len(self._current))
+        self._rotated_at = clock()
+
+    def _positions(self, key: str) -> list[int]:
+        """Derive bit positions using double hashing over one digest"""
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    @staticmethod
+    def _contains(bits: bytearray, positions: list[int]) -> bool:
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in positions)
+
+    def _maybe_rotate(self) -> None:
+        now = self._clock()
+        if now - self._rotated_at >= self.window_seconds:
+            # Two idle windows means both generations have expired
+            if now - self._rotated_at >= 2 * self.window_seconds:
+                self._previous = bytearray(len(self._current))
+            else:
+                self._previous = self._current
+            self._current = bytearray(len(self._previous))
+            self._rotated_at = now
+
+    def check_and_add(self, key: str) -> bool:
+        """Record a key, returning True if it was (probably) seen in the window"""
+        self._maybe_rotate()
+        positions = self._positions(key)
+        seen = self._contains(self._current, positions) or self._contains(self._previous, positions)
+        for p in positions:
+            self._current[p >> 3] |= 1 << (p & 7)
+        return seen
+
+
+class AdaptiveSampler:
+    """Lower the logging rate as queue depth or event-loop lag grow
+
+    Below both thresholds every submission is kept. Above them the rate falls
+    in proportion to the worst pressure ratio, down to ``min_rate``.
+    """
+
+    def __init__(
+        self,
+        queue_threshold: int = 50,
+        lag_threshold_ms: float = 100.0,
+        min_rate: float = 0.1,
+        lag_provider: Optional[Callable[[], float]] = None,
+        rng: Callable[[], float] = random.random,
+    ):
+        self.queue_threshold = queue_threshold
+        self.lag_threshold_ms = lag_threshold_ms
+        self.min_rate = min_rate
+        self.lag_provider = lag_provider
+        self._rng = rng
+
+    def rate(self, queue_depth: int) -> float:
+        """Current sampling rate in (min_rate, 1]"""
+        pressure = queue_depth / self.queue_threshold if self.queue_threshold else 0.0
+        if self.lag_provider is not None and self.lag_threshold_ms:
+            pressure = max(pressure, self.lag_provider() / self.lag_threshold_ms)
+        if pressure <= 1.0:
+            return 1.0
+        return max(self.min_rate, 1.0 / pressure)
+
+    def sample(self, queue_depth: int) -> tuple[bool, float]:
+        """Decide whether to keep a submission
+
+        Returns:
+            tuple of (keep, sample_weight)
+        """
+        rate = self.rate(queue_depth)
+        if rate >= 1.0:
+            return True, 1.0
+        return self._rng() < rate, 1.0 / rate
+
+
+def dedup_key(client_key: str, form_data: Dict[str, Any]) -> str:
+    """Canonical key for a client's calculation inputs
+
+    Numbers are normalised so that e.g. ``0`` and ``0.0`` hash the same, but
+    not rounded: rates such as an import duty of 0.2 vs 0.205 must differ.
+    Callers pass every input field (see ``flatten_profiles``), so two
+    submissions share a key only if they describe the same calculation.
+    """
+    canonical = {
+        k: float(v) if isinstance(v, (int, float)) and not isinstance(v, bool) else v
+        for k, v in form_data.items()
+    }
+    payload = json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+    return f"{client_key}|{hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()}"
@@ -0,0 +1,137 @@
+"""Compact encoding of logged submissions
+
+Most of the 30 form fields are left at their defaults, and the headline
+figures already live in the annual_salary / total_to_govt / effective_rate
+columns. The encoded form_data therefore keeps only non-default inputs, and
+the encoded results keep the rates version plus (optionally) the non-zero
+breakdown keyed by stable category code. decode_submission reverses this for
+analytics, recomputing the breakdown when it wasn't stored.
+"""
+from dataclasses import fields, MISSING
+from typing import Any, Dict, Optional
+from app.domain.categories import category_code, category_name
+from app.domain.engine import TaxEngine
+from app.domain.profiles import PROFILE_TYPES, build_profiles
+
+# Bump when the encoded layout changes; rows without the marker are legacy
+ENCODING_VERSION = 2
+ENCODING_KEY = "_enc"
+
+# Version 1 rows were logged from a partial form_data (no retirement
+# contribution, ABVs, cigarette price, tyre weight or duty rate), so filling
+# those from defaults cannot reproduce their breakdown
+COMPLETE_INPUTS_VERSION = 2
+
+# Default value of every profile field that has one
+INPUT_DEFAULTS: Dict[str, Any] = {
+    f.name: f.default
+    for profile_type in PROFILE_TYPES
+    for f in fields(profile_type)
+    if f.default is not MISSING
+}
+
+
+def is_encoded(data: Optional[Dict[str, Any]]) -> bool:
+    """Check whether a stored JSON blob uses the compact encoding"""
+    return bool(data) and ENCODING_KEY in data
+
+
+def encode_inputs(form_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep only inputs that differ from the profile defaults"""
+    encoded: Dict[str, Any] = {ENCODING_KEY: ENCODING_VERSION}
+    for key, value in form_data.items():
+        if value is None:
+            continue
+        if key in INPUT_DEFAULTS and value == INPUT_DEFAULTS[key]:
+            continue
+        # Whole-rand salaries are recoverable from the annual_salary column
+        if key == "annual_salary" and float(value).is_integer():
+            continue
+        encoded[key] = value
+    return encoded
+
+
+def encode_results(results: Dict[str, Any], store_breakdown: bool = False) -> Dict[str, Any]:
+    """Reduce a results summary to the rates version and optional breakdown
+
+    Totals and the effective rate live in their own columns. The breakdown is
+    only stored when requested, since it can be recomputed from the inputs
+    while the same rates version is current.
+    """
+    encoded: Dict[str, Any] = {
+        ENCODING_KEY: ENCODING_VERSION,
+        "rv": results.get("rates_version"),
+    }
+    if store_breakdown:
+        encoded["b"] = {
+            category_code(name): round(amount, 2)
+            for name, amount in results.get("breakdown", {}).items()
+            if amount
+        }
+    return encoded
+
+
+def decode_inputs(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Rebuild the full flat input dict for a stored submission row"""
+    form_data = row.get("form_data") or {}
+    if not is_encoded(form_data):
+        return dict(form_data)
+
+    inputs = dict(INPUT_DEFAULTS)
+    inputs.update({k: v for k, v in form_data.items() if k != ENCODING_KEY})
+    if "annual_salary" not in inputs:
+        inputs["annual_salary"] = float(row.get("annual_salary") or 0)
+    return inputs
+
+
+def decode_submission(row: Dict[str, Any], engine: Optional[TaxEngine] = None) -> Dict[str, Any]:
+    """Expand a stored submission row into full form_data and results dicts
+
+    Legacy rows are returned unchanged. For encoded rows without a stored
+    breakdown, the breakdown is recomputed with ``engine`` when its rates
+    version matches the row's and the row logged every input field, and is
+    None otherwise.
+
+    Args:
+        row: Submission row as returned by Supabase (or any dict-like store)
+        engine: Optional engine used to recompute missing breakdowns
+
+    Returns:
+        Dict with ``form_data`` and ``results`` keys in the legacy layout
+    """
+    results = row.get("results") or {}
+    if not is_encoded(results):
+        return {"form_data": decode_inputs(row), "results": dict(results)}
+
+    inputs = decode_inputs(row)
+    gross_income = float(inputs.get("annual_salary") or 0) + float(inputs.get("annual_bonus") or 0)
+    total = float(row.get("total_to_govt") or 0)
+    effective_rate = float(row.get("effective_rate") or 0)
+    rates_version = results.get("rv")
+
+    breakdown: Optional[Dict[str, float]] = None
+    if "b" in results:
+        breakdown = {category_name(code): amount for code, amount in results["b"].items()}
+    elif (
+        engine is not None
+        and rates_version
+        and engine.rates.version == rates_version
+        and (row.get("form_data") or {}).get(ENCODING_KEY, 0) >= COMPLETE_INPUTS_VERSION
+    ):
+        breakdown, total = engine.run(*build_profiles(inputs))
+        effective_rate = (total / gross_income * 100.0) if gross_income > 0 else 0.0
+
+    if breakdown is not None:
+        breakdown = dict(sorted(breakdown.items(), key=lambda x: x[1], reverse=True))
+
+    return {
+        "form_data": inputs,
+        "results": {
+            "total_annual": total,
+            "monthly_total": total / 12,
+            "percentage": effective_rate,
+            "gross_income": gross_income,
+            "breakdown": breakdown,
+            "rates_version": rates_version,
+        },
+    }
@@ -0,0 +1,351 @@
+"""Lightweight in-process tracing
+
+Spans are kept in a context variable, so they follow the request through
+``await``s, into threadpool-run sync dependencies and into background tasks
+created with ``asyncio.create_task`` (which copies the current context). The
+detached submission logging task therefore shows up in the same trace as the
+request that enqueued it.
+
+Sampling is decided once, at the root of a trace (head-based): a trace is kept
+with probability ``TRACE_SAMPLE_RATE``. An incoming W3C ``traceparent`` header
+supplies the trace and parent ids, but its sampled flag is client-controlled
+and only decides sampling when ``TRACE_TRUST_UPSTREAM`` is set (i.e. behind a
+proxy that makes the decision). Outside a sampled trace every ``span()`` is a
+no-op costing one context variable lookup.
+
+Finished spans are written as JSON lines using OTLP field names, e.g.::
+
+    {"traceId": "...", "spanId": "...", "parentSpanId": "...", "name": "stage.render",
+     "startTimeUnixNano": ..., "endTimeUnixNano": ..., "attributes": {...}}
+
+The writer queue is bounded (spans are dropped and counted when it is full)
+and the file is rotated to ``<name>.1`` once it grows past its size limit.
+"""
+import asyncio
+import functools
+import json
+import logging
+import queue
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from app.config import settings
+from app.domain.instrumentation import CalculatorTimings
+
+logger = logging.getLogger(__name__)
+
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+class Span:
+    """A timed operation within a trace"""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "start_ns", "end_ns", "attributes")
+
+    def __init__(self, trace_id: str, parent_id: Optional[str], name: str, attributes: Optional[dict] = None):
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, Any] = attributes or {}
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id,
+            "name": self.name,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "attributes": self.attributes,
+        }
+
+
+class MemoryExporter:
+    """Keep finished spans in a list (tests and debugging)"""
+
+    def __init__(self):
+        self.spans: List[Dict[str, Any]] = []
+
+    def export(self, span: Span) -> None:
+        self.spans.append(span.to_dict())
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class JsonlExporter:
+    """Append finished spans to a JSON lines file from a writer thread
+
+    At most ``max_queue`` spans wait for the writer; further spans are dropped
+    (see ``dropped``) rather than growing memory. When the file reaches
+    ``max_bytes`` it is renamed to ``<name>.1`` (replacing the previous one)
+    and a new file is started, so disk use stays under twice the limit.
+    """
+
+    def __init__(self, path: str | Path, max_queue: int = 10000, max_bytes: int = 50 * 1024 * 1024):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(span.to_dict())
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped == 1:
+                logger.warning("Trace export queue full, dropping spans")
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._thread = threading.Thread(target=self._write_loop, name="trace-exporter", daemon=True)
+                self._thread.start()
+
+    def _rotate(self) -> None:
+        self.path.replace(self.path.with_name(self.path.name + ".1"))
+
+    def _write_loop(self) -> None:
+        f = open(self.path, "a")
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                if isinstance(item, threading.Event):
+                    f.flush()
+                    item.set()
+                    continue
+                if self.max_bytes and f.tell() >= self.max_bytes:
+                    f.close()
+                    self._rotate()
+                    f = open(self.path, "a")
+                f.write(json.dumps(item, default=str) + "\n")
+                if self._queue.empty():
+                    f.flush()
+        finally:
+            f.close()
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Block until every span exported so far is on disk"""
+        if self._thread is None:
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def close(self) -> None:
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=5.0)
+            self._thread = None
+
+
+class Tracer:
+    """Creates spans and hands finished ones to an exporter"""
+
+    def __init__(
+        self,
+        exporter=None,
+        sample_rate: float = 0.01,
+        rng: Optional[random.Random] = None,
+        trust_upstream: bool = False,
+    ):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.trust_upstream = trust_upstream
+        self._rng = rng or random.Random()
+        self._current: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def current_span(self) -> Optional[Span]:
+        return self._current.get()
+
+    def _parse_traceparent(self, header: Optional[str]):
+        match = _TRACEPARENT_RE.match(header or "")
+        if match is None:
+            return None
+        trace_id, parent_id, flags = match.groups()
+        return trace_id, parent_id, bool(int(flags, 16) & 1)
+
+    def start_trace(self, name: str, traceparent: Optional[str] = None, attributes: Optional[dict] = None):
+        """Make the sampling decision and open the root span (None if not sampled)
+
+        Returns a (span, token) pair to pass to ``end_trace``.
+        """
+        if not self.enabled:
+            return None
+        incoming = self._parse_traceparent(traceparent)
+        if incoming is not None:
+            trace_id, parent_id, upstream_sampled = incoming
+        else:
+            trace_id, parent_id, upstream_sampled = f"{self._rng.getrandbits(128):032x}", None, None
+        if self.trust_upstream and upstream_sampled is not None:
+            sampled = upstream_sampled
+        else:
+            # A client can set the sampled flag on every request; don't let it bypass the rate
+            sampled = self._rng.random() < self.sample_rate
+        if not sampled:
+            return None
+        span = Span(trace_id, parent_id, name, attributes)
+        return span, self._current.set(span)
+
+    def end_trace(self, started) -> None:
+        if started is None:
+            return
+        span, token = started
+        self._current.reset(token)
+        self._finish(span)
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Time a block as a child of the current span, if the trace is sampled"""
+        parent = self._current.get()
+        if parent is None:
+            yield None
+            return
+        span = Span(parent.trace_id, parent.span_id, name, attributes)
+        token = self._current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set_attribute("error", repr(e))
+            raise
+        finally:
+            self._current.reset(token)
+            self._finish(span)
+
+    def traced(self, name: str):
+        """Decorator wrapping every call of a sync or async function in a span"""
+        def decorator(func):
+            if asyncio.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    with self.span(name):
+                        return await func(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def record_span(self, name: str, seconds: float, **attributes) -> None:
+        """Add a child span that ended just now and lasted ``seconds``"""
+        parent = self._current.get()
+        if parent is None:
+            return
+        span = Span(parent.trace_id, parent.span_id, name, attributes)
+        span.end_ns = time.time_ns()
+        span.start_ns = span.end_ns - int(seconds * 1e9)
+        self.exporter.export(span)
+
+    def _finish(self, span: Span) -> None:
+        span.end_ns = time.time_ns()
+        try:
+            self.exporter.export(span)
+        except Exception as e:
+            logger.warning(f"Failed to export span {span.name}: {e}")
+
+
+class TracingInstrumentation:
+    """TaxEngine instrumentation emitting a span per calculator
+
+    Wraps the shared CalculatorTimings so engine runs are timed when either
+    the timings sampler picks them or the current trace is sampled, and each
+    consumer only sees the runs it asked for.
+    """
+
+    def __init__(self, tracer: Tracer, timings: Optional[CalculatorTimings] = None):
+        self.tracer = tracer
+        self.timings = timings
+        self._timing_run: ContextVar[bool] = ContextVar("timing_run", default=False)
+
+    def should_sample(self) -> bool:
+        timed = self.timings is not None and self.timings.should_sample()
+        self._timing_run.set(timed)
+        return timed or self.tracer.current_span() is not None
+
+    def record(self, calculator: str, seconds: float) -> None:
+        if self._timing_run.get():
+            self.timings.record(calculator, seconds)
+        self.tracer.record_span(f"calculator.{calculator}", seconds)
+
+
+class TracingMiddleware:
+    """ASGI middleware opening the root span of each sampled request"""
+
+    def __init__(self, app, tracer: Tracer):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for key, value in scope.get("headers", ()):
+            if key == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+
+        started = self.tracer.start_trace(
+            f"{scope['method']} {scope['path']}",
+            traceparent,
+            {"http.method": scope["method"], "http.target": scope["path"]},
+        )
+        if started is None:
+            await self.app(scope, receive, send)
+            return
+
+        span = started[0]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                span.set_attribute("http.status_code", message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            if route is not None:
+                span.name = f"{scope['method']} {getattr(route, 'path', scope['path'])}"
+            self.tracer.end_trace(started)
+
+
+# Global instance; without an exporter tracing is disabled entirely
+tracer = Tracer(
+    JsonlExporter(
+        settings.TRACE_EXPORT_PATH,
+        max_queue=settings.TRACE_EXPORT_QUEUE_SIZE,
+        max_bytes=settings.TRACE_EXPORT_MAX_MB * 1024 * 1024,
+    ) if settings.TRACING_ENABLED else None,
+    sample_rate=settings.TRACE_SAMPLE_RATE,
+    trust_upstream=settings.TRACE_TRUST_UPSTREAM,
+)
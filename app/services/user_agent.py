@@ -0,0 +1,120 @@
+"""Compiled user agent classifier for submission logging
+
+A handful of user agents make up most of our traffic, so classification is a
+single precompiled regex scan fronted by a bounded LRU keyed on the raw string.
+"""
+import re
+from dataclasses import dataclass, asdict
+from functools import lru_cache
+from typing import Optional
+
+# Distinct user agents kept in the classifier cache
+UA_CACHE_SIZE = 512
+
+# Column widths from scripts/supabase_setup.sql
+_VERSION_MAX_LEN = 20
+
+# One alternation over every token we care about, scanned once per UA.
+# Order within the alternation only matters for tokens sharing a prefix.
+_TOKEN_RE = re.compile(
+    r"(?P<edge>Edg(?:e|A|iOS)?)/(?P<edge_v>[\d.]+)"
+    r"|(?P<opera>OPR|Opera)/(?P<opera_v>[\d.]+)"
+    r"|(?P<samsung>SamsungBrowser)/(?P<samsung_v>[\d.]+)"
+    r"|(?P<firefox>Firefox|FxiOS)/(?P<firefox_v>[\d.]+)"
+    r"|(?P<chrome>Chrome|CriOS)/(?P<chrome_v>[\d.]+)"
+    r"|Version/(?P<safari_v>[\d.]+)"
+    r"|(?P<safari>Safari)/"
+    r"|Windows NT (?P<windows_v>[\d.]+)"
+    r"|(?P<iphone>iPhone|iPod)"
+    r"|(?P<ipad>iPad)"
+    r"|OS (?P<ios_v>\d+(?:_\d+)*) like Mac OS X"
+    r"|Mac OS X (?P<mac_v>\d+(?:[_.]\d+)*)"
+    r"|(?P<android>Android)(?: (?P<android_v>[\d.]+))?"
+    r"|(?P<cros>CrOS)"
+    r"|(?P<linux>Linux)"
+    r"|(?P<mobile>Mobi)"
+    r"|(?P<tablet>Tablet)",
+    re.IGNORECASE,
+)
+
+# (token group, version group, display name) in precedence order. Chromium
+# derivatives also advertise Chrome and Safari, so they must come first.
+_BROWSERS = (
+    ("edge", "edge_v", "Edge"),
+    ("opera", "opera_v", "Opera"),
+    ("samsung", "samsung_v", "Samsung Internet"),
+    ("firefox", "firefox_v", "Firefox"),
+    ("chrome", "chrome_v", "Chrome"),
+    ("safari", "safari_v", "Safari"),
+)
+
+# Mobile platforms advertise "Linux" / "Mac OS X" too, so they come first
+_OPERATING_SYSTEMS = (
+    ("ios_v", "ios_v", "iOS"),
+    ("iphone", "ios_v", "iOS"),
+    ("ipad", "ios_v", "iOS"),
+    ("android", "android_v", "Android"),
+    ("windows_v", "windows_v", "Windows"),
+    ("cros", None, "ChromeOS"),
+    ("mac_v", "mac_v", "macOS"),
+    ("linux", None, "Linux"),
+)
+
+
+@dataclass(frozen=True)
+class UserAgentInfo:
+    """Classified user agent, matching the submissions table columns"""
+    browser: str
+    browser_version: Optional[str]
+    os: str
+    os_version: Optional[str]
+    device_type: str
+
+    def as_dict(self) -> dict[str, Optional[str]]:
+        """Return a fresh dict safe for the caller to mutate"""
+        return asdict(self)
+
+
+def _normalize_version(version: Optional[str]) -> Optional[str]:
+    """Convert underscore-separated versions and clip to the column width"""
+    if not version:
+        return None
+    return version.replace("_", ".")[:_VERSION_MAX_LEN]
+
+
+@lru_cache(maxsize=UA_CACHE_SIZE)
+def classify_user_agent(user_agent: str) -> UserAgentInfo:
+    """Classify a raw user agent string into browser, OS and device type"""
+    found: dict[str, Optional[str]] = {}
+    for match in _TOKEN_RE.finditer(user_agent):
+        for group, value in match.groupdict().items():
+            if value is not None and group not in found:
+                found[group] = value
+
+    browser, browser_version = "Other", None
+    for token, version_group, name in _BROWSERS:
+        if token in found:
+            browser, browser_version = name, found.get(version_group)
+            break
+
+    os_name, os_version = "Other", None
+    for token, version_group, name in _OPERATING_SYSTEMS:
+        if token in found:
+            os_name = name
+            os_version = found.get(version_group) if version_group else None
+            break
+
+    if "ipad" in found or "tablet" in found or ("android" in found and "mobile" not in found):
+        device_type = "tablet"
+    elif "iphone" in found or "mobile" in found:
+        device_type = "mobile"
+    else:
+        device_type = "desktop"
+
+    return UserAgentInfo(
+        browser=browser,
+        browser_version=_normalize_version(browser_version),
+        os=os_name,
+        os_version=_normalize_version(os_version),
+        device_type=device_type,
+    )
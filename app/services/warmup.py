@@ -0,0 +1,125 @@
+"""Startup warmup and readiness
+
+The first /calc on a fresh instance would otherwise pay for parsing the rates
+YAML, compiling the Jinja templates and first-use initialisation. The app
+lifespan runs these steps in a worker thread, ending with a canary
+calculation, and /ready answers 503 until they have all succeeded.
+"""
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from app.config import settings
+from app.domain.engine import TaxEngine
+from app.domain.profiles import build_profiles
+from app.services.rates_cache import rates_cache
+
+# Touches every calculator with a non-trivial value
+CANARY_INPUTS = {
+    "annual_salary": 420_000.0,
+    "annual_bonus": 20_000.0,
+    "retirement_contrib": 30_000.0,
+    "age": 35,
+    "medical_members": 2,
+    "std_vat_spend_month": 9_000.0,
+    "litres_petrol_month": 80.0,
+    "electricity_kwh_month": 500.0,
+    "sugary_drink_litres_month": 4.0,
+    "beer_litres_month": 6.0,
+    "wine_litres_month": 2.0,
+    "spirits_litres_month": 0.5,
+    "cigarette_packs_20_month": 2,
+    "plastic_bags_per_month": 10,
+    "tyres_purchased_per_year": 2,
+    "tv_licenses_count": 1,
+    "monthly_imported_goods_spend": 500.0,
+    "monthly_international_online_spend": 300.0,
+    "vehicle_licence_fees_annual": 600.0,
+    "tolls_annual": 1_200.0,
+    "municipal_rates_services_annual": 12_000.0,
+    "buying_property_price": 1_500_000.0,
+    "vehicle_monthly_installment": 6_000.0,
+    "vehicle_is_imported": True,
+    "municipal_water_monthly": 400.0,
+    "sa_dividends_annual": 5_000.0,
+    "taxable_cgt_base_annual": 60_000.0,
+    "domestic_flights_per_year": 2,
+    "international_flights_per_year": 1,
+    "annual_accommodation_spend": 8_000.0,
+}
+
+
+class Warmup:
+    """Runs named warmup steps once and reports readiness"""
+
+    def __init__(self):
+        self.ready = False
+        self.error: Optional[str] = None
+        self.steps: Dict[str, float] = {}
+        self.duration: Optional[float] = None
+
+    def run(self, steps: List[Tuple[str, Callable[[], Any]]]) -> bool:
+        """Run each step in order; stops at the first failure"""
+        started = time.perf_counter()
+        for name, step in steps:
+            step_started = time.perf_counter()
+            try:
+                step()
+            except Exception as e:
+                self.error = f"{name}: {type(e).__name__}: {e}"
+                print(f"Warmup failed at {self.error}")
+                return False
+            self.steps[name] = round((time.perf_counter() - step_started) * 1000, 2)
+        self.duration = time.perf_counter() - started
+        self.ready = True
+        return True
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "status": "ready" if self.ready else ("failed" if self.error else "warming"),
+            "steps_ms": self.steps,
+            "warmup_ms": round(self.duration * 1000, 2) if self.duration is not None else None,
+            "error": self.error,
+        }
+
+
+def default_steps(templates) -> List[Tuple[str, Callable[[], Any]]]:
+    """Load rates, compile templates, then run and render a canary calculation"""
+    from app.api.schemas import CalcRequest
+    from app.views.prerendered import page_cache
+    from app.views.templating import compile_all
+
+    def load_rates():
+        rates_cache.get()
+
+    def compile_templates():
+        compile_all(templates)
+    
+    def prerender_pages():
+        for name in ("index.html", "results.html"):
+            page_cache.get(name)
+
+    def canary():
+        rates, _ = rates_cache.get()
+        breakdown, total = TaxEngine(rates).run(*build_profiles(CANARY_INPUTS))
+        if total <= 0 or not breakdown:
+            raise RuntimeError(f"canary calculation returned total={total!r}")
+        CalcRequest.model_validate({
+            section: {name: CANARY_INPUTS[name] for name in field.annotation.model_fields if name in CANARY_INPUTS}
+            for section, field in CalcRequest.model_fields.items()
+        })
+        sorted_breakdown = sorted(breakdown.items(), key=lambda x: x[1], reverse=True)
+        gross_income = CANARY_INPUTS["annual_salary"] + CANARY_INPUTS["annual_bonus"]
+        templates.get_template("_breakdown_table.html").render(
+            breakdown=sorted_breakdown,
+            total=total,
+            monthly_total=total / 12,
+            effective_rate=total / gross_income * 100.0,
+            gross_income=gross_income,
+            settings=settings,
+        )
+
+    return [
+        ("rates", load_rates),
+        ("templates", compile_templates),
+        ("pages", prerender_pages),
+        ("canary", canary),
+    ]
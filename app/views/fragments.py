@@ -0,0 +1,143 @@
+"""Rendered HTML fragments cached by a hash of their inputs
+
+The breakdown fragment depends only on the calculation result, the settings
+and the template sources, and many visitors submit identical inputs. Its HTML
+is stored in a byte-bounded LRU keyed by a hash of (template version, rates
+version, settings fingerprint, context), so a repeated result is served
+without touching Jinja. Entries are dropped when the rates version changes,
+on ``invalidate()`` (called after /admin/rates edits) and, outside
+production, when the template or any template it includes is edited.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import jinja2
+from jinja2 import meta
+from app.config import settings
+from app.views.prerendered import settings_fingerprint
+from app.views.templating import templates
+
+
+class LoadedTemplate:
+    """A template plus everything it includes, with a hash of their sources"""
+
+    def __init__(self, env: jinja2.Environment, name: str):
+        self.template = env.get_template(name)
+        sources: Dict[str, str] = {}
+        pending = [name]
+        while pending:
+            current = pending.pop()
+            if current in sources:
+                continue
+            sources[current] = env.loader.get_source(env, current)[0]
+            pending.extend(n for n in meta.find_referenced_templates(env.parse(sources[current])) if n)
+        self.parts: List[jinja2.Template] = [env.get_template(n) for n in sorted(sources)]
+        self.version = hashlib.blake2b(
+            "\0".join(sources[n] for n in sorted(sources)).encode(), digest_size=8
+        ).hexdigest()
+
+    @property
+    def is_up_to_date(self) -> bool:
+        return all(part.is_up_to_date for part in self.parts)
+
+
+class FragmentCache:
+    """LRU of rendered, UTF-8 encoded fragments, bounded in bytes"""
+
+    def __init__(self, env: jinja2.Environment = templates.env, max_bytes: int = 16 * 1024 * 1024):
+        self.env = env
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[bytes, bytes]" = OrderedDict()
+        self._templates: Dict[str, LoadedTemplate] = {}
+        self._rates_version = None
+        self._lock = threading.Lock()
+
+    def _load(self, name: str) -> LoadedTemplate:
+        loaded = self._templates.get(name)
+        if loaded is not None and (not settings.TEMPLATES_AUTO_RELOAD or loaded.is_up_to_date):
+            return loaded
+        loaded = LoadedTemplate(self.env, name)
+        with self._lock:
+            if name in self._templates:
+                # Edited template: entries rendered from the old source are unreachable
+                self._clear()
+            self._templates[name] = loaded
+        return loaded
+
+    def render(self, name: str, rates_version: str, **context) -> Tuple[bytes, bool]:
+        """Rendered ``name`` for ``context`` and whether it came from the cache
+
+        ``context`` values must have a stable ``repr`` (numbers, strings and
+        lists/tuples of them); ``settings`` is added automatically.
+        """
+        return self.render_keyed(name, rates_version, sorted(context.items()), lambda: context)
+
+    def render_keyed(
+        self, name: str, rates_version: str, identity: Any, make_context: Callable[[], Dict[str, Any]]
+    ) -> Tuple[bytes, bool]:
+        """Like ``render``, for content identified by ``identity`` alone
+
+        ``make_context`` is only called on a miss, so pages whose context is
+        costly to build (e.g. a saved scenario's chart data) skip that too.
+        ``identity`` must determine the context completely and, like
+        context values, have a stable ``repr``.
+        """
+        loaded, key = self._key(name, rates_version, identity)
+        html = self._lookup(key)
+        if html is not None:
+            return html, True
+
+        html = loaded.template.render(settings=settings, **make_context()).encode("utf-8")
+        self._store(key, html)
+        return html, False
+
+    def _key(self, name: str, rates_version: str, identity: Any) -> Tuple[LoadedTemplate, bytes]:
+        if rates_version != self._rates_version:
+            with self._lock:
+                self._clear()
+                self._rates_version = rates_version
+
+        loaded = self._load(name)
+        # settings_fingerprint is memoised, so this is a lookup, not a walk over settings
+        canonical = repr((name, loaded.version, rates_version, settings_fingerprint(), identity))
+        return loaded, hashlib.blake2b(canonical.encode(), digest_size=16).digest()
+
+    def _lookup(self, key: bytes) -> Optional[bytes]:
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return html
+            self.misses += 1
+            return None
+
+    def _store(self, key: bytes, html: bytes) -> None:
+        if len(html) <= self.max_bytes // 4:
+            with self._lock:
+                if key not in self._entries:
+                    self._entries[key] = html
+                    self.size += len(html)
+                while self.size > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self.size -= len(evicted)
+
+    def _clear(self) -> None:
+        self._entries.clear()
+        self.size = 0
+
+    def invalidate(self) -> None:
+        """Drop every rendered fragment (e.g. after the rates file changes)"""
+        with self._lock:
+            self._clear()
+            self._templates.clear()
+
+    def stats(self) -> Tuple[int, int]:
+        return self.hits, self.misses
+
+
+fragment_cache = FragmentCache(max_bytes=settings.FRAGMENT_CACHE_MAX_MB * 1024 * 1024)
@@ -1,84 +1,46 @@
 """View handlers for server-rendered pages"""
 import hashlib
+import json
 from typing import Optional
-from fastapi import APIRouter, Request, Depends, Form
+from fastapi import APIRouter, Request, Depends, Form, HTTPException
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
-from app.config import settings
-from app.domain.rates import TaxRates
-from app.domain.profiles import PersonalProfile, ConsumptionProfile, TransportAndPropertyProfile, InvestmentProfile, TravelProfile
+from markupsafe import Markup
+from app.views.templating import templates
+from app.views.prerendered import page_cache, serve
+from app.views.fragments import fragment_cache
+from app.domain.profiles import PersonalProfile, ConsumptionProfile, TransportAndPropertyProfile, InvestmentProfile, TravelProfile, flatten_profiles
 from app.domain.engine import TaxEngine
 from app.services.logger import submission_logger
+from app.services import flight_recorder, metrics
+from app.services.rates_cache import rates_cache
+from app.services.result_store import result_store
+from app.services.tracing import tracer
+from db.session import get_session
 
 router = APIRouter()
-templates = Jinja2Templates(directory=str(settings.TEMPLATES_DIR))
 
 
-# Tax explanation tooltips - emphasizing money flow to government
-TAX_EXPLANATIONS = {
-    "PAYE (Income Tax)": "Money to Government: Progressive income tax deducted from every paycheck. Government takes 18%-45% based on 7 tax brackets, minus age-based rebates. This flows directly to National Treasury.",
-    "UIF": "Money to Government: 1% of your salary (capped at R177.12/month) goes to the Unemployment Insurance Fund. Both you and your employer contribute.",
-    "VAT": "Money to Government: 15% of every Rand you spend on most goods and services goes straight to SARS. Every purchase you make includes this government charge.",
-    "Fuel Levy (Petrol)": "Money to Government: R6.33 of every litre of petrol goes to government (R4.01 General Fuel Levy + R2.18 RAF + R0.14 Carbon Tax). Based on your monthly fuel consumption.",
-    "Fuel Levy (Diesel)": "Money to Government: R6.20 of every litre of diesel goes to government (R3.85 General Fuel Levy + R2.18 RAF + R0.17 Carbon Tax). Based on your monthly fuel consumption.",
-    "Electricity Environmental Levy": "Money to Government: R0.035 per kWh of your electricity bill goes to government for renewable energy funding. Adds up with every unit consumed.",
-    "Health Promotion Levy (HPL)": "Money to Government: R0.021 per gram of sugar above 4g/100ml threshold. Government collects this 'sin tax' on sugary beverages to discourage consumption.",
-    "Beer Excise": "Money to Government: R121.41 per litre of absolute alcohol (LAA) goes to SARS. Formula: Litres × (ABV%/100) × R121.41 × 12 months. Example: 20L at 5% ABV = R1,456.92/year to government.",
-    "Wine Excise": "Money to Government: R4.96 per litre of wine (regardless of alcohol content) goes to SARS. Formula: Litres × R4.96 × 12 months. Example: 6L/month = R357.12/year to government.",
-    "Spirits Excise": "Money to Government: R249.20 per litre of absolute alcohol goes to SARS. Formula: Litres × (ABV%/100) × R249.20 × 12 months. Example: 1L at 40% ABV = R1,196.16/year to government.",
-    "Cigarette Excise": "Money to Government: SARS takes max of R18.22 per 20-pack or 30% of retail price - whichever is higher. Heavy 'sin tax' on tobacco products.",
-    "Cigar Excise": "Money to Government: R10.96 per gram of cigars smoked goes to SARS annually. Luxury tobacco excise tax.",
-    "Pipe Tobacco Excise": "Money to Government: R5.44 per gram of pipe tobacco consumed goes to government coffers annually.",
-    "Plastic Bag Levy": "Money to Government: R0.32 per plastic bag goes to environmental fund. Small but adds up with every shopping trip.",
-    "Vehicle License Fees": "Money to Government: Annual license fees go to provincial government. Varies by vehicle type, weight, and province - mandatory to legally drive.",
-    "Toll Fees": "Money to Government: Road usage fees collected on toll routes - funds road maintenance but operated by SANRAL (state-owned entity).",
-    "Municipal Rates": "Money to Government: Property rates and service charges go to your local municipality (government). Based on property value and services consumed.",
-    "Transfer Duty": "Money to Government: One-time property purchase tax (3%-13% on amounts above R1.21M) goes straight to SARS when you buy property.",
-    "Vehicle Import Duty (in installments)": "Money to Government: 25% import duty on vehicles NOT assembled in SA. If financing imported vehicle, ~20% of EVERY monthly installment is government duty. DUTY-FREE (locally assembled): VW Polo/Vivo, Toyota Corolla Cross/Fortuner, Mercedes C-Class, BMW X3. IMPORTED (25% to government): Most European/Asian brands.",
-    "Dividends Tax": "Money to Government: 20% of dividend income withheld by SARS before you receive payment. Government takes its cut before money reaches your account.",
-    "Capital Gains Tax (CGT)": "Money to Government: 18% effective rate (40% inclusion × 45% marginal) on profit from asset sales above R40k annual exclusion. Government's share of your investment gains.",
-    
-    # Embedded Corporate Taxes - highlighting hidden government revenue
-    "Corporate Income Tax (embedded)": "HIDDEN Money to Government: Companies pay 27% CIT on profits, but YOU pay through higher prices. Economic research shows 40-50% of corporate tax burden passes to consumers. This is government revenue hidden in every price tag.",
-    "SDL/UIF Employer Contribution (embedded)": "HIDDEN Money to Government: Employers pay 1% SDL + 1% UIF, but costs pass to you through prices. Employment taxes funded by your purchases, estimated at ~15% of embedded government revenue.",
-    "Tax Administration Costs (embedded)": "HIDDEN Money to Government: Companies spend 0.5-1% of revenue on tax compliance systems and audits - these costs are built into your prices. Government regulations create costs you ultimately bear.",
-    "Regulatory Compliance Costs (embedded)": "HIDDEN Money to Government: BBBEE compliance, labour audits, environmental regulations, industry levies - businesses pay 2-5% of turnover in regulatory costs, all passed to you through pricing. Government-mandated expenses in every purchase.",
-    "Supply Chain Tax Cascade (embedded)": "HIDDEN Money to Government: Each supplier (raw materials → manufacturer → distributor → retailer) pays corporate taxes before reaching you. Multiple layers of government revenue hidden in final price. ~15% of total embedded tax burden.",
-    
-    # Additional levies
-    "Tyre Levy": "Money to Government: R2.30 per kg of tyre mass goes to government environmental fund. Typical passenger car tyre (~10kg) = R23 per tyre. Formula: Tyres × Weight × R2.30. Funds waste management and recycling programs.",
-    "TV License": "Money to Government: R265 per year goes to SABC (state broadcaster) if you own a TV or device capable of receiving broadcasts. Legally required even if you don't watch SABC channels. Enforcement through detector vans and penalties for non-compliance.",
-    "Import Duties (Consumer Goods)": "Money to Government: 15-40% customs duty on imported clothing, footwear, electronics, and other goods goes to SARS. Clothing (40%), footwear (30%), general goods (20%). Calculated on your monthly imported goods spending. These duties are IN ADDITION to VAT.",
-    "Import VAT (Online Purchases)": "Money to Government: 15% VAT charged on ALL international online purchases (no minimum threshold). Applied to (item cost + shipping + import duty). SARS collects before delivery. Every overseas online order includes this government charge.",
-    "Import Duties (Online Purchases)": "Money to Government: Customs duties (averaging 20%) on international online purchases flow to SARS. Combined with 15% Import VAT, government takes ~35-40% of your overseas online shopping total before you receive the item.",
-    "Airport Taxes (Domestic)": "Money to Government: ~R125 per domestic flight (R100 airport tax + R25 passenger service charge) goes to government/state entities. Hidden in your ticket price but flows to ACSA (state-owned) and aviation authorities.",
-    "Airport Taxes & Tourism Levy (International)": "Money to Government: ~R295 per international departure (R190 airport tax + R75 passenger service charge + R30 tourism levy) goes to government. SARS collects the tourism levy; ACSA (state-owned) gets airport taxes. Built into every international ticket.",
-    "Accommodation Tourism Levy": "Money to Government: 1% of ALL accommodation charges (hotels, B&Bs, guesthouses, Airbnb, lodges) flows to provincial tourism boards (government entities). Typical family holiday R10,000 accommodation = R100 to government. Business travelers spending R50,000/year = R500. Collected by accommodation providers and remitted to provincial treasuries.",
-    
-    # Municipal Services - 100% to government
-    "Municipal Water Charges": "Money to Government: 100% of water charges flow to government entities. Your municipality bills you, but sources water from state-owned water boards (Rand Water, Umgeni Water, etc.) regulated by Department of Water and Sanitation. Typical household: R300-R800/month = R3,600-R9,600/year to government coffers.",
-    "Municipal Sewerage Charges": "Money to Government: 100% of sewerage/sanitation charges go to your local municipality (government entity). Funds wastewater treatment plants and sewer infrastructure. Typically 70-90% of your water charge. R250-R600/month = R3,000-R7,200/year flowing to government.",
-    "Municipal Refuse Removal": "Money to Government: 100% of refuse removal fees go to local municipality. Government-provided waste collection and landfill management service. Fixed monthly charge typically R200-R400 = R2,400-R4,800/year to government.",
-    "Other Municipal Charges": "Money to Government: Stormwater drainage fees, water meter rental, sewerage connection fees - all flow 100% to your municipality (government). These 'other' municipal charges add R50-R200/month = R600-R2,400/year to government revenue.",
-}
-
-
-def get_tax_engine() -> TaxEngine:
+def get_tax_engine(request: Request) -> TaxEngine:
     """Load tax rates and create engine"""
-    rates = TaxRates.load_from_yaml(settings.TAX_RATES_PATH)
-    return TaxEngine(rates)
+    with metrics.stage(request, "engine_lookup"):
+        rates, hit = rates_cache.get()
+        engine = TaxEngine(rates, instrumentation=metrics.engine_instrumentation)
+    flight_recorder.record_cache_status(request, "rates", hit)
+    metrics.set_rates_version(rates.version)
+    return engine
 
 
 @router.get("/", response_class=HTMLResponse)
 async def index(request: Request):
     """Main calculation form page"""
-    return templates.TemplateResponse("index.html", {
-        "request": request,
-        "settings": settings
-    })
+    with metrics.stage(request, "render"):
+        page, hit = page_cache.get("index.html")
+        flight_recorder.record_cache_status(request, "page", hit)
+        return serve(request, page)
 
 
 @router.post("/calc", response_class=HTMLResponse)
+@tracer.traced("view.calculate")
 async def calculate(
     request: Request,
     # Personal
@@ -147,6 +109,7 @@ async def calculate(
     engine: TaxEngine = Depends(get_tax_engine)
 ):
     """Calculate and return results partial (HTMX target)"""
+    metrics.mark_handler_start(request)
     
     # Build profiles
     personal = PersonalProfile(
@@ -202,7 +165,8 @@ async def calculate(
     )
     
     # Calculate
-    breakdown, total = engine.run(personal, consumption, transport_property, investment, travel)
+    with metrics.stage(request, "engine_run"):
+        breakdown, total = engine.run(personal, consumption, transport_property, investment, travel)
     
     # Calculate effective rate
     gross_income = personal.annual_salary + personal.annual_bonus
@@ -211,41 +175,23 @@ async def calculate(
     # Sort breakdown by amount (descending)
     sorted_breakdown = sorted(breakdown.items(), key=lambda x: x[1], reverse=True)
     
+    inputs = flatten_profiles((personal, consumption, transport_property, investment, travel))
+    
+    # Keep the result so export/share links can fetch it by handle
+    stored = await result_store.put_async(
+        inputs,
+        sorted_breakdown,
+        total,
+        gross_income,
+        engine.rates.version,
+    )
+    
     # Log submission to Supabase (async, non-blocking)
     try:
-        # Prepare form data (all inputs)
-        form_data = {
-            'annual_salary': annual_salary,
-            'annual_bonus': annual_bonus,
-            'age': age,
-            'medical_members': medical_members,
-            'std_vat_spend_month': std_vat_spend_month,
-            'litres_petrol_month': litres_petrol_month,
-            'litres_diesel_month': litres_diesel_month,
-            'electricity_kwh_month': electricity_kwh_month,
-            'beer_litres_month': beer_litres_month,
-            'wine_litres_month': wine_litres_month,
-            'spirits_litres_month': spirits_litres_month,
-            'cigarette_packs_20_month': cigarette_packs_20_month,
-            'tv_licenses_count': tv_licenses_count,
-            'tyres_purchased_per_year': tyres_purchased_per_year,
-            'monthly_imported_goods_spend': monthly_imported_goods_spend,
-            'monthly_international_online_spend': monthly_international_online_spend,
-            'domestic_flights_per_year': domestic_flights_per_year,
-            'international_flights_per_year': international_flights_per_year,
-            'annual_accommodation_spend': annual_accommodation_spend,
-            'vehicle_licence_fees_annual': vehicle_licence_fees_annual,
-            'tolls_annual': tolls_annual,
-            'municipal_rates_services_annual': municipal_rates_services_annual,
-            'vehicle_monthly_installment': vehicle_monthly_installment,
-            'vehicle_is_imported': vehicle_is_imported == "true",
-            'municipal_water_monthly': municipal_water_monthly,
-            'municipal_sewerage_monthly': municipal_sewerage_monthly,
-            'municipal_refuse_monthly': municipal_refuse_monthly,
-            'municipal_other_monthly': municipal_other_monthly,
-            'sa_dividends_annual': sa_dividends_annual,
-            'taxable_cgt_base_annual': taxable_cgt_base_annual,
-        }
+        # Every profile field, so logged rows can be recomputed exactly
+        form_data = dict(inputs)
+        
+        flight_recorder.attach_inputs(request, form_data, engine.rates.version)
         
         # Prepare results summary
         results_summary = {
@@ -254,6 +200,7 @@ async def calculate(
             'percentage': effective_rate,
             'gross_income': gross_income,
             'breakdown': dict(sorted_breakdown),
+            'rates_version': engine.rates.version,
         }
         
         # Collect request metadata
@@ -282,32 +229,32 @@ async def calculate(
             'session_id': session_id,
         }
         
-        # Log to Supabase (async)
-        import asyncio
-        asyncio.create_task(
-            submission_logger.log_submission(
+        # Log to Supabase (deduplicated, sampled, runs in the background)
+        with metrics.stage(request, "logging_enqueue"):
+            submission_logger.enqueue(
                 form_data=form_data,
                 results=results_summary,
                 request_data=request_data
             )
-        )
     except Exception as e:
         # Never fail the main request due to logging errors
         print(f"Logging error (non-critical): {e}")
     
-    return templates.TemplateResponse(
-        "_breakdown_table.html",
-        {
-            "request": request,
-            "breakdown": sorted_breakdown,
-            "total": total,
-            "monthly_total": total / 12,
-            "effective_rate": effective_rate,
-            "gross_income": gross_income,
-            "tax_explanations": TAX_EXPLANATIONS,
-            "settings": settings
-        }
-    )
+    with metrics.stage(request, "render"):
+        html, hit = fragment_cache.render(
+            "_breakdown_table.html",
+            engine.rates.version,
+            breakdown=sorted_breakdown,
+            total=total,
+            monthly_total=total / 12,
+            effective_rate=effective_rate,
+            gross_income=gross_income,
+        )
+        flight_recorder.record_cache_status(request, "fragment", hit)
+        # The handle depends on the inputs, not just the result, so it is
+        # rendered separately to keep the fragment cache keyed on results
+        actions = templates.get_template("_result_actions.html").render(result_handle=stored.handle)
+        return HTMLResponse(html + actions.encode("utf-8"))
 
 
 @router.get("/results", response_class=HTMLResponse)
@@ -315,4 +262,60 @@ async def results_page(request: Request):
     """Full results page with charts"""
     # This would typically load from a saved scenario
     # For now, just show the template
-    return templates.TemplateResponse("results.html", {"request": request})
+    page, hit = page_cache.get("results.html")
+    flight_recorder.record_cache_status(request, "page", hit)
+    return serve(request, page)
+
+
+def scenario_chart_data(outputs: dict) -> dict:
+    """Chart series for a saved scenario: category shares and monthly vs annual amounts"""
+    breakdown = sorted(
+        ((name, amount) for name, amount in outputs.get("breakdown", {}).items() if amount > 0),
+        key=lambda x: x[1],
+        reverse=True,
+    )
+    total = outputs.get("total", 0.0)
+    return {
+        "labels": [name for name, _ in breakdown],
+        "annual": [round(amount, 2) for _, amount in breakdown],
+        "monthly": [round(amount / 12, 2) for _, amount in breakdown],
+        "share": [round(amount / total * 100.0, 1) if total > 0 else 0.0 for _, amount in breakdown],
+    }
+
+
+def compact_json(data) -> Markup:
+    """JSON without whitespace, safe to embed in a <script> element"""
+    text = json.dumps(data, separators=(",", ":"))
+    return Markup(text.replace("<", "\\u003c").replace(">", "\\u003e").replace("&", "\\u0026"))
+
+
+@router.get("/results/{scenario_id}", response_class=HTMLResponse)
+def scenario_page(scenario_id: str, request: Request, session=Depends(get_session)):
+    """Saved scenario with its breakdown charts
+    
+    Scenarios are immutable, so the rendered page is cached per scenario id
+    and rates version; a repeat view costs one primary-key lookup.
+    """
+    from db.models import Scenario
+    
+    with metrics.stage(request, "db_lookup"):
+        scenario = session.get(Scenario, scenario_id)
+    if not scenario:
+        raise HTTPException(status_code=404, detail="Scenario not found")
+    
+    rates, hit = rates_cache.get()
+    flight_recorder.record_cache_status(request, "rates", hit)
+    
+    def context():
+        outputs = scenario.outputs
+        return {
+            "scenario": scenario,
+            "outputs": outputs,
+            "chart_data": compact_json(scenario_chart_data(outputs)),
+            "current_rates_version": rates.version,
+        }
+    
+    with metrics.stage(request, "render"):
+        html, hit = fragment_cache.render_keyed("scenario.html", rates.version, ("scenario", scenario_id), context)
+        flight_recorder.record_cache_status(request, "fragment", hit)
+        return HTMLResponse(html)
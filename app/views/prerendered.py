@@ -0,0 +1,134 @@
+"""Pages whose HTML depends only on settings, rendered once and pre-compressed
+
+The index and results pages are rendered on first request (or at warmup) for
+the current settings, stored as identity/gzip/brotli/zstd bytes and served
+with a strong ETag and Last-Modified, answering conditional requests with 304.
+The cache key includes a hash of the settings (computed once per process),
+and outside production the template sources are re-checked so edits show up
+without a restart.
+"""
+import functools
+import hashlib
+import threading
+from dataclasses import dataclass
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+from fastapi import Request, Response
+from app.config import settings
+from app.services.compression import compress_all, negotiate
+from app.views.templating import templates
+
+CACHE_CONTROL = "no-cache"
+
+
+@functools.lru_cache(maxsize=None)
+def settings_fingerprint() -> str:
+    """Hash of every setting (the pages may depend on any of them)
+
+    Settings are fixed for the life of the process, so this is computed
+    once; call ``settings_fingerprint.cache_clear()`` after changing them.
+    """
+    values = sorted((name, repr(getattr(settings, name))) for name in dir(settings) if name.isupper())
+    return hashlib.blake2b(repr(values).encode(), digest_size=8).hexdigest()
+
+
+@dataclass
+class RenderedPage:
+    """One page rendered for one settings fingerprint"""
+    variants: Dict[str, bytes]
+    etag: str
+    last_modified: str
+    last_modified_ts: int
+    template: object
+
+    def etag_for(self, encoding: str) -> str:
+        """Each encoded representation gets its own strong ETag"""
+        return f'"{self.etag}"' if encoding == "identity" else f'"{self.etag}-{encoding}"'
+
+
+class PageCache:
+    """Rendered pages keyed by (template name, settings fingerprint)"""
+
+    def __init__(self, env=templates.env):
+        self.env = env
+        self.hits = 0
+        self.misses = 0
+        self._pages: Dict[Tuple[str, str], RenderedPage] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> Tuple[RenderedPage, bool]:
+        """Return the rendered page and whether it came from the cache"""
+        key = (name, settings_fingerprint())
+        page = self._pages.get(key)
+        if page is not None and (not settings.TEMPLATES_AUTO_RELOAD or page.template.is_up_to_date):
+            self.hits += 1
+            return page, True
+
+        with self._lock:
+            page = self._render(name)
+            self._pages = {k: v for k, v in self._pages.items() if k[0] != name}
+            self._pages[key] = page
+            self.misses += 1
+        return page, False
+
+    def _render(self, name: str) -> RenderedPage:
+        template = self.env.get_template(name)
+        body = template.render(settings=settings).encode("utf-8")
+        mtime = int(max(
+            (settings.TEMPLATES_DIR / t).stat().st_mtime for t in self.env.list_templates() if t.endswith(".html")
+        ))
+        return RenderedPage(
+            variants=compress_all(body),
+            etag=hashlib.blake2b(body, digest_size=12).hexdigest(),
+            last_modified=formatdate(mtime, usegmt=True),
+            last_modified_ts=mtime,
+            template=template,
+        )
+
+    def stats(self) -> Tuple[int, int]:
+        return self.hits, self.misses
+
+
+def _etag_matches(header: str, page: RenderedPage) -> bool:
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        # Any encoding of the same content is a match
+        if candidate.strip('"').split("-")[0] == page.etag:
+            return True
+    return False
+
+
+def _not_modified_since(header: str, page: RenderedPage) -> bool:
+    try:
+        return page.last_modified_ts <= parsedate_to_datetime(header).timestamp()
+    except (TypeError, ValueError):
+        return False
+
+
+def serve(request: Request, page: RenderedPage) -> Response:
+    """Respond with the best encoding, or 304 if the client's copy is current"""
+    encoding = negotiate(request.headers.get("accept-encoding", ""), page.variants)
+    headers = {
+        "ETag": page.etag_for(encoding),
+        "Last-Modified": page.last_modified,
+        "Cache-Control": CACHE_CONTROL,
+        "Vary": "Accept-Encoding",
+    }
+
+    if_none_match: Optional[str] = request.headers.get("if-none-match")
+    if_modified_since: Optional[str] = request.headers.get("if-modified-since")
+    if (if_none_match and _etag_matches(if_none_match, page)) or (
+        if_none_match is None and if_modified_since and _not_modified_since(if_modified_since, page)
+    ):
+        return Response(status_code=304, headers=headers)
+
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(page.variants[encoding], media_type="text/html", headers=headers)
+
+
+page_cache = PageCache()
@@ -0,0 +1,57 @@
+"""Shared Jinja2 environment for every router
+
+One environment means each template is compiled once per worker, and the
+filesystem bytecode cache lets new workers and restarted containers load the
+compiled code instead of compiling again. Cached bytecode is keyed by the
+template source checksum, so an edited template is never served stale.
+
+Precompile everything into the cache (e.g. while building the image):
+    python -m app.views.templating
+"""
+from pathlib import Path
+from typing import List, Optional
+import jinja2
+from fastapi.templating import Jinja2Templates
+from app.config import settings
+from app.domain.categories import category_code
+from app.services.assets import static_url
+
+
+def build_environment(cache_dir: Optional[str] = settings.TEMPLATE_CACHE_DIR) -> jinja2.Environment:
+    """Environment over TEMPLATES_DIR with the on-disk bytecode cache"""
+    bytecode_cache = None
+    if cache_dir:
+        path = settings.BASE_DIR / cache_dir
+        try:
+            path.mkdir(parents=True, exist_ok=True)
+            bytecode_cache = jinja2.FileSystemBytecodeCache(str(path))
+        except OSError as e:
+            print(f"Warning: template bytecode cache disabled: {e}")
+
+    env = jinja2.Environment(
+        loader=jinja2.FileSystemLoader(str(settings.TEMPLATES_DIR)),
+        autoescape=True,
+        auto_reload=settings.TEMPLATES_AUTO_RELOAD,
+        bytecode_cache=bytecode_cache,
+    )
+    env.globals["static_url"] = static_url
+    env.globals["category_code"] = category_code
+    return env
+
+
+templates = Jinja2Templates(env=build_environment())
+
+
+def compile_all(env: jinja2.Environment = templates.env) -> List[str]:
+    """Load every HTML template (compiling it or reading cached bytecode)"""
+    names = [name for name in env.list_templates() if name.endswith(".html")]
+    for name in names:
+        env.get_template(name)
+    return names
+
+
+if __name__ == "__main__":
+    compiled = compile_all()
+    cache = templates.env.bytecode_cache
+    where = Path(cache.directory) if cache is not None else "nowhere (cache disabled)"
+    print(f"Compiled {len(compiled)} templates into {where}")
@@ -0,0 +1 @@
+"""Performance benchmarks (pytest-benchmark), kept out of the default test run"""
@@ -0,0 +1,38 @@
+"""Benchmarks for rate loading, the engine and individual calculators"""
+import pytest
+from app.config import settings
+from app.domain.rates import TaxRates
+
+# Engine attribute and the profile arguments (by position in PROFILE_TYPES) it takes
+CALCULATORS = {
+    "PAYECalculator": ("paye_calc", (0,)),
+    "IndirectTaxesCalculator": ("indirect_calc", (1,)),
+    "AlcoholTaxCalculator": ("alcohol_calc", (1,)),
+    "TobaccoTaxCalculator": ("tobacco_calc", (1,)),
+    "PropertyTransportCalculator": ("property_calc", (2,)),
+    "InvestmentTaxesCalculator": ("investment_calc", (3,)),
+    "EmbeddedCorporateTaxCalculator": ("embedded_calc", (1,)),
+    "OtherLeviesCalculator": ("other_levies_calc", (1, 4)),
+    "MunicipalServicesCalculator": ("municipal_calc", (2,)),
+}
+
+
+def test_load_rates_yaml(benchmark):
+    """TaxRates.load_from_yaml (read, parse, validate, hash)"""
+    rates = benchmark(TaxRates.load_from_yaml, settings.TAX_RATES_PATH)
+    assert rates.version
+
+
+def test_engine_run(benchmark, engine, profiles):
+    """TaxEngine.run on each representative profile"""
+    breakdown, total = benchmark(engine.run, *profiles)
+    assert total > 0
+
+
+@pytest.mark.parametrize("name", sorted(CALCULATORS))
+def test_calculator(benchmark, engine, profiles, name):
+    """Each calculator's calculate() on each representative profile"""
+    attribute, positions = CALCULATORS[name]
+    calculator = getattr(engine, attribute)
+    result = benchmark(calculator.calculate, *(profiles[i] for i in positions))
+    assert isinstance(result, dict)
@@ -0,0 +1,70 @@
+"""Benchmarks for the request paths, template rendering and logging payload"""
+from app.services.logger import SubmissionLogger
+from app.views.templating import templates
+from app.config import settings
+from benchmarks.scenarios import api_body, form_body
+
+
+def test_api_calc(benchmark, client, scenario):
+    """POST /api/calc through the ASGI test client"""
+    body = api_body(scenario[1])
+    response = benchmark(client.post, "/api/calc", json=body)
+    assert response.status_code == 200
+
+
+def test_calc_form(benchmark, client, scenario):
+    """POST /calc (form parsing, engine, logging enqueue, HTML render)"""
+    body = form_body(scenario[1])
+    response = benchmark(client.post, "/calc", data=body)
+    assert response.status_code == 200
+
+
+def test_render_breakdown_table(benchmark, engine, profiles):
+    """Rendering _breakdown_table.html for a computed breakdown"""
+    breakdown, total = engine.run(*profiles)
+    gross_income = profiles[0].annual_salary + profiles[0].annual_bonus
+    context = {
+        "breakdown": sorted(breakdown.items(), key=lambda x: x[1], reverse=True),
+        "total": total,
+        "monthly_total": total / 12,
+        "effective_rate": total / gross_income * 100.0,
+        "gross_income": gross_income,
+        "settings": settings,
+    }
+    template = templates.get_template("_breakdown_table.html")
+    html = benchmark(template.render, context)
+    assert "<" in html
+
+
+def test_build_submission_payload(benchmark, engine, scenario):
+    """SubmissionLogger.build_submission (UA/referrer parsing, encoding)"""
+    from app.domain.profiles import build_profiles
+
+    inputs = scenario[1]
+    breakdown, total = engine.run(*build_profiles(inputs))
+    results = {
+        "total_annual": total,
+        "monthly_total": total / 12,
+        "percentage": 31.4,
+        "gross_income": inputs["annual_salary"],
+        "breakdown": breakdown,
+        "rates_version": engine.rates.version,
+    }
+    request_data = {
+        "ip_address": "196.25.1.1",
+        "user_agent": (
+            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+            "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+        ),
+        "referrer": "https://www.google.com/search?q=tax&utm_source=google&utm_medium=cpc",
+        "language": "en-ZA",
+        "languages": "en-ZA,en;q=0.9",
+        "screen_width": 1920,
+        "screen_height": 1080,
+        "session_id": "3f2504e0-4f89-11d3-9a0c-0305e82c3301",
+    }
+    geo_data = {"country_code": "ZA", "region": "Gauteng", "city": "Johannesburg", "latitude": -26.2, "longitude": 28.0}
+    submission = benchmark(
+        SubmissionLogger().build_submission, inputs, results, request_data, geo_data
+    )
+    assert submission["browser"] == "Chrome"
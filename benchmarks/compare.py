@@ -0,0 +1,106 @@
+"""Compare a benchmark run against the stored baseline
+
+Exits non-zero if any benchmark's statistic regressed by more than the
+threshold, so it can gate CI or a pre-merge check. The minimum is compared by
+default since it is the statistic least affected by a noisy machine.
+
+Baselines are only comparable on similar hardware: re-save on the machine
+that runs the comparison after intentional performance changes.
+
+Usage:
+    python -m benchmarks.compare benchmarks/baseline.json .benchmarks/latest.json
+    python -m benchmarks.compare baseline.json latest.json --threshold 10 --stat median
+    python -m benchmarks.compare benchmarks/baseline.json .benchmarks/latest.json --save
+"""
+import argparse
+import json
+import sys
+from typing import Dict, List, Optional
+
+
+def load_stats(path: str, stat: str) -> Dict[str, float]:
+    """Map benchmark fullname to the chosen statistic (seconds)"""
+    with open(path, "r") as f:
+        data = json.load(f)
+    return {bench["fullname"]: bench["stats"][stat] for bench in data["benchmarks"]}
+
+
+def save_baseline(current_path: str, baseline_path: str) -> None:
+    """Store a run as the baseline, without the per-round raw timings"""
+    with open(current_path, "r") as f:
+        data = json.load(f)
+    for bench in data["benchmarks"]:
+        bench["stats"].pop("data", None)
+    with open(baseline_path, "w") as f:
+        json.dump(data, f, indent=1, sort_keys=True)
+        f.write("\n")
+
+
+def compare(
+    baseline: Dict[str, float],
+    current: Dict[str, float],
+    threshold: float,
+    min_delta: float = 0.0,
+) -> List[dict]:
+    """Per-benchmark change in percent, flagging regressions over the threshold
+
+    Slowdowns smaller than ``min_delta`` seconds are never flagged, so
+    sub-microsecond benchmarks don't fail on timer jitter.
+    """
+    rows = []
+    for name in sorted(set(baseline) | set(current)):
+        before, after = baseline.get(name), current.get(name)
+        change = (after - before) / before * 100.0 if before and after is not None else None
+        rows.append({
+            "name": name,
+            "baseline": before,
+            "current": after,
+            "change_pct": change,
+            "regressed": change is not None and change > threshold and after - before > min_delta,
+        })
+    return rows
+
+
+def _format_us(seconds: Optional[float]) -> str:
+    return f"{seconds * 1e6:12.1f}" if seconds is not None else f"{'-':>12}"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point; returns the process exit code"""
+    parser = argparse.ArgumentParser(description="Fail on benchmark regressions against a baseline")
+    parser.add_argument("baseline", help="Stored baseline (pytest-benchmark JSON)")
+    parser.add_argument("current", help="New run (pytest-benchmark JSON)")
+    parser.add_argument("--threshold", type=float, default=15.0, help="Allowed slowdown in percent")
+    parser.add_argument("--stat", default="min", choices=("min", "median", "mean"))
+    parser.add_argument("--min-delta-us", type=float, default=1.0, help="Ignore slowdowns smaller than this")
+    parser.add_argument("--save", action="store_true", help="Store the current run as the baseline instead")
+    args = parser.parse_args(argv)
+
+    if args.save:
+        save_baseline(args.current, args.baseline)
+        print(f"Saved {args.current} as baseline {args.baseline}")
+        return 0
+
+    rows = compare(
+        load_stats(args.baseline, args.stat),
+        load_stats(args.current, args.stat),
+        args.threshold,
+        args.min_delta_us / 1e6,
+    )
+
+    print(f"{'benchmark':70} {'baseline us':>12} {'current us':>12} {'change':>8}")
+    for row in rows:
+        change = f"{row['change_pct']:+7.1f}%" if row["change_pct"] is not None else f"{'new' if row['baseline'] is None else 'gone':>8}"
+        flag = "  REGRESSION" if row["regressed"] else ""
+        print(f"{row['name'][-70:]:70} {_format_us(row['baseline'])} {_format_us(row['current'])} {change}{flag}")
+
+    regressions = [row for row in rows if row["regressed"]]
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) regressed by more than {args.threshold}% ({args.stat})")
+        return 1
+    print(f"\nNo regressions beyond {args.threshold}% ({args.stat})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,40 @@
+"""Shared fixtures for the benchmark suite"""
+import pytest
+from fastapi.testclient import TestClient
+from app.config import settings
+from app.domain.engine import TaxEngine
+from app.domain.profiles import build_profiles
+from app.domain.rates import TaxRates
+from app.main import create_app
+from benchmarks.scenarios import SCENARIOS
+
+
+@pytest.fixture(scope="session")
+def rates():
+    """Tax rates loaded once"""
+    return TaxRates.load_from_yaml(settings.TAX_RATES_PATH)
+
+
+@pytest.fixture(scope="session")
+def engine(rates):
+    """Engine without instrumentation"""
+    return TaxEngine(rates)
+
+
+@pytest.fixture(params=sorted(SCENARIOS))
+def scenario(request):
+    """(name, inputs) for each representative profile"""
+    return request.param, SCENARIOS[request.param]
+
+
+@pytest.fixture
+def profiles(scenario):
+    """Profiles for TaxEngine.run built from the scenario inputs"""
+    return build_profiles(scenario[1])
+
+
+@pytest.fixture(scope="session")
+def client():
+    """Test client sharing one app across benchmarks"""
+    with TestClient(create_app()) as client:
+        yield client
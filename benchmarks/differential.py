@@ -0,0 +1,290 @@
+"""Differential harness: reference TaxEngine.run vs an alternate engine
+
+Any fast engine path (batch, compiled, memoized, incremental) has to produce
+the same breakdown as the scalar ``TaxEngine.run``. This generates random but
+valid profiles across every field in ``app/domain/profiles.py``, runs both
+engines, and checks category-by-category agreement within tolerance.
+
+Failures are shrunk to a minimal profile: fields are reset to their defaults
+and numbers simplified for as long as the mismatch persists. Work is spread
+over all cores with multiprocessing.
+
+The candidate is any ``module:callable`` taking ``TaxRates`` and returning an
+object with ``run(*profiles)``. The default candidate is the instrumented
+engine path (``_run_timed``), which must match the plain one.
+
+Usage:
+    python -m benchmarks.differential --count 1000000
+    python -m benchmarks.differential --candidate mypkg.fast:FastEngine --count 200000 --workers 8
+
+For pytest, ``profile_inputs()`` is the equivalent Hypothesis strategy.
+"""
+import argparse
+import importlib
+import json
+import math
+import multiprocessing
+import os
+import random
+import sys
+import time
+from dataclasses import MISSING, fields
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from app.config import settings
+from app.domain.engine import TaxEngine
+from app.domain.instrumentation import CalculatorTimings
+from app.domain.profiles import PROFILE_TYPES, build_profiles
+from app.domain.rates import TaxRates
+
+REL_TOL = 1e-9
+ABS_TOL = 1e-6
+
+# Upper bounds of generated values; anything not listed uses the type default
+FIELD_BOUNDS: Dict[str, float] = {
+    "annual_salary": 20_000_000,
+    "annual_bonus": 5_000_000,
+    "retirement_contrib": 1_000_000,
+    "age": 120,
+    "medical_members": 12,
+    "beer_avg_abv": 100,
+    "wine_avg_abv": 100,
+    "spirits_avg_abv": 100,
+    "imported_goods_avg_duty_rate": 1,
+    "sugary_avg_g_per_100ml": 50,
+    "tyre_avg_weight_kg": 60,
+    "buying_property_price": 50_000_000,
+    "vehicle_licence_fees_annual": 50_000,
+    "tolls_annual": 200_000,
+    "municipal_rates_services_annual": 500_000,
+    "sa_dividends_annual": 10_000_000,
+    "taxable_cgt_base_annual": 20_000_000,
+    "annual_accommodation_spend": 1_000_000,
+}
+DEFAULT_FLOAT_BOUND = 100_000
+DEFAULT_INT_BOUND = 200
+
+
+def _field_specs() -> List[Tuple[str, str, float, Any]]:
+    """(name, kind, upper bound, default) for every profile field"""
+    specs = []
+    for profile_type in PROFILE_TYPES:
+        for f in fields(profile_type):
+            if f.type is bool:
+                kind = "bool"
+            elif f.type is int:
+                kind = "int"
+            elif f.name == "buying_property_price":
+                kind = "optional_float"
+            else:
+                kind = "float"
+            bound = FIELD_BOUNDS.get(f.name, DEFAULT_INT_BOUND if kind == "int" else DEFAULT_FLOAT_BOUND)
+            default = f.default if f.default is not MISSING else 0.0
+            specs.append((f.name, kind, bound, default))
+    return specs
+
+
+FIELD_SPECS = _field_specs()
+
+
+def random_inputs(rng: random.Random) -> Dict[str, Any]:
+    """Random valid inputs: each field is default, zero, a round number or arbitrary"""
+    inputs: Dict[str, Any] = {}
+    for name, kind, bound, default in FIELD_SPECS:
+        roll = rng.random()
+        if kind == "bool":
+            inputs[name] = roll < 0.5
+            continue
+        if roll < 0.3 and name != "annual_salary":
+            continue  # leave at the profile default
+        if kind == "optional_float" and roll < 0.6:
+            inputs[name] = None
+            continue
+        if roll < 0.4:
+            value = 0
+        elif roll < 0.6:
+            # Bracket edges and thresholds tend to sit on round numbers
+            value = round(rng.uniform(0, bound), -rng.randint(0, 4))
+        else:
+            value = rng.uniform(0, bound)
+        inputs[name] = int(min(value, bound)) if kind == "int" else float(min(value, bound))
+    return inputs
+
+
+def profile_inputs():
+    """Hypothesis strategy producing the same kind of inputs as random_inputs"""
+    from hypothesis import strategies as st
+
+    strategies = {}
+    for name, kind, bound, _ in FIELD_SPECS:
+        if kind == "bool":
+            strategy = st.booleans()
+        elif kind == "int":
+            strategy = st.integers(0, int(bound))
+        else:
+            strategy = st.floats(0, bound, allow_nan=False, allow_infinity=False)
+            if kind == "optional_float":
+                strategy = st.none() | strategy
+        strategies[name] = strategy
+    required = {"annual_salary": strategies.pop("annual_salary")}
+    return st.fixed_dictionaries(required, optional=strategies)
+
+
+def compare_results(
+    expected: Tuple[Dict[str, float], float],
+    actual: Tuple[Dict[str, float], float],
+    rel_tol: float = REL_TOL,
+    abs_tol: float = ABS_TOL,
+) -> List[str]:
+    """Category-by-category differences beyond tolerance (empty if they agree)"""
+    (expected_breakdown, expected_total), (actual_breakdown, actual_total) = expected, actual
+    problems = []
+    for category in sorted(set(expected_breakdown) | set(actual_breakdown)):
+        if category not in actual_breakdown:
+            problems.append(f"{category}: missing from candidate")
+        elif category not in expected_breakdown:
+            problems.append(f"{category}: not produced by reference")
+        elif not math.isclose(expected_breakdown[category], actual_breakdown[category], rel_tol=rel_tol, abs_tol=abs_tol):
+            problems.append(f"{category}: {expected_breakdown[category]!r} != {actual_breakdown[category]!r}")
+    if not math.isclose(expected_total, actual_total, rel_tol=rel_tol, abs_tol=abs_tol):
+        problems.append(f"total: {expected_total!r} != {actual_total!r}")
+    return problems
+
+
+def timed_engine(rates: TaxRates) -> TaxEngine:
+    """Default candidate: the instrumented path, timing every run"""
+    return TaxEngine(rates, instrumentation=CalculatorTimings(sample_every=1))
+
+
+def load_candidate(spec: str) -> Callable[[TaxRates], Any]:
+    """Resolve ``module:callable``"""
+    module_name, _, attribute = spec.partition(":")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def mismatch(reference, candidate, inputs: Dict[str, Any]) -> List[str]:
+    """Differences between the engines for one input dict"""
+    profiles = build_profiles(inputs)
+    try:
+        actual = candidate.run(*profiles)
+    except Exception as e:
+        return [f"candidate raised {type(e).__name__}: {e}"]
+    return compare_results(reference.run(*profiles), actual)
+
+
+def shrink(inputs: Dict[str, Any], fails: Callable[[Dict[str, Any]], bool], max_rounds: int = 20) -> Dict[str, Any]:
+    """Greedily simplify a failing input while it keeps failing"""
+    current = dict(inputs)
+    for _ in range(max_rounds):
+        progressed = False
+        for name in list(current):
+            if name == "annual_salary":
+                candidates = []
+            else:
+                candidates = [None]  # drop the field (profile default)
+            value = current[name]
+            if isinstance(value, (int, float)) and not isinstance(value, bool) and value:
+                candidates += [0, type(value)(round(value)), type(value)(round(value, -3)), value / 2]
+            for replacement in candidates:
+                trial = dict(current)
+                if replacement is None:
+                    del trial[name]
+                elif replacement == value:
+                    continue
+                else:
+                    trial[name] = replacement
+                if fails(trial):
+                    current = trial
+                    progressed = True
+                    break
+        if not progressed:
+            break
+    return current
+
+
+_worker_engines: Optional[Tuple[Any, Any]] = None
+
+
+def _init_worker(candidate_spec: str) -> None:
+    global _worker_engines
+    rates = TaxRates.load_from_yaml(settings.TAX_RATES_PATH)
+    _worker_engines = (TaxEngine(rates), load_candidate(candidate_spec)(rates))
+
+
+def _check_chunk(task: Tuple[int, int, int]) -> Tuple[int, List[Dict[str, Any]]]:
+    """Check ``count`` random inputs seeded by (seed, chunk); return failures"""
+    seed, chunk, count = task
+    reference, candidate = _worker_engines
+    rng = random.Random(f"{seed}:{chunk}")
+    failures = []
+    for _ in range(count):
+        inputs = random_inputs(rng)
+        if mismatch(reference, candidate, inputs):
+            failures.append(inputs)
+            if len(failures) >= 5:
+                break
+    return count, failures
+
+
+def run(
+    count: int,
+    candidate_spec: str = "benchmarks.differential:timed_engine",
+    workers: Optional[int] = None,
+    seed: int = 0,
+    chunk_size: int = 10_000,
+) -> Dict[str, Any]:
+    """Check ``count`` random profiles across ``workers`` processes
+
+    Returns:
+        Dict with the number checked and any failures, each shrunk
+    """
+    workers = workers or os.cpu_count() or 1
+    tasks = [(seed, i, min(chunk_size, count - i * chunk_size)) for i in range(math.ceil(count / chunk_size))]
+    checked, failures = 0, []
+
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(candidate_spec,)) as pool:
+        for done, chunk_failures in pool.imap_unordered(_check_chunk, tasks):
+            checked += done
+            failures.extend(chunk_failures)
+            if len(failures) >= 5:
+                pool.terminate()
+                break
+
+    if not failures:
+        return {"checked": checked, "failures": []}
+
+    _init_worker(candidate_spec)
+    reference, candidate = _worker_engines
+    shrunk = []
+    for inputs in failures[:5]:
+        minimal = shrink(inputs, lambda trial: bool(mismatch(reference, candidate, trial)))
+        shrunk.append({"inputs": minimal, "differences": mismatch(reference, candidate, minimal)})
+    return {"checked": checked, "failures": shrunk}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point; returns the process exit code"""
+    parser = argparse.ArgumentParser(description="Compare an alternate engine against TaxEngine.run")
+    parser.add_argument("--candidate", default="benchmarks.differential:timed_engine", help="module:callable(rates)")
+    parser.add_argument("--count", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=None, help="Processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    result = run(args.count, args.candidate, workers=args.workers, seed=args.seed)
+    elapsed = time.perf_counter() - started
+    print(f"Checked {result['checked']:,} profiles in {elapsed:.1f}s ({result['checked'] / elapsed:,.0f}/s)")
+
+    if not result["failures"]:
+        print(f"{args.candidate} agrees with TaxEngine.run")
+        return 0
+    for failure in result["failures"]:
+        print("\nMinimal failing inputs:")
+        print(json.dumps(failure["inputs"], indent=2, sort_keys=True))
+        for line in failure["differences"]:
+            print(f"  {line}")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
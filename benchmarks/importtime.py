@@ -0,0 +1,112 @@
+"""Import-time budget check using ``python -X importtime``
+
+New containers and CLI/batch tools (export, flight recorder replay) pay for
+every module imported at startup. Each entry point is imported in a fresh
+interpreter several times; the fastest cumulative import time is compared
+against its budget, and heavy optional dependencies that should only load on
+first use must not be imported at all.
+
+Usage:
+    python -m benchmarks.importtime
+    python -m benchmarks.importtime --runs 10 --top 15
+"""
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Cumulative import time budgets in milliseconds
+BUDGETS: Dict[str, float] = {
+    "app.main": 800,
+    "app.domain.engine": 100,
+    "app.services.export": 150,
+    "app.services.flight_recorder": 200,
+}
+
+# Loaded on first use (lifespan, first DB access, export) rather than on import
+DEFERRED: Dict[str, Tuple[str, ...]] = {
+    "app.main": ("supabase", "httpx", "sqlalchemy", "sqlmodel", "pyarrow"),
+    "app.services.export": ("supabase", "pyarrow", "fastapi"),
+}
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """(module, depth, self_us, cumulative_us) for each ``-X importtime`` line"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return entries
+
+
+def measure(module: str, runs: int = 5) -> Tuple[float, List[Tuple[str, int, int, int]], List[str]]:
+    """Import ``module`` ``runs`` times in fresh interpreters
+
+    Returns:
+        Fastest cumulative time in ms, the entries of that run, and which
+        modules it loaded out of ``sys.modules``
+    """
+    code = f"import sys, {module}; print(' '.join(sorted(sys.modules)))"
+    best = None
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        )
+        entries = parse_importtime(result.stderr)
+        total = next(cum for name, depth, _, cum in reversed(entries) if name == module and depth == 0)
+        if best is None or total < best[0]:
+            best = (total, entries, result.stdout.split())
+    total, entries, loaded = best
+    return total / 1000.0, entries, loaded
+
+
+def check(runs: int = 5, top: int = 10, verbose: bool = True) -> List[str]:
+    """Measure every entry point against its budget; returns the violations"""
+    violations = []
+    for module, budget in BUDGETS.items():
+        total_ms, entries, loaded = measure(module, runs)
+        status = "ok" if total_ms <= budget else "OVER"
+        if total_ms > budget:
+            violations.append(f"{module}: {total_ms:.0f} ms > budget {budget:.0f} ms")
+        unexpected = [name for name in DEFERRED.get(module, ()) if name in loaded]
+        for name in unexpected:
+            violations.append(f"{module}: imports {name} eagerly")
+
+        if verbose:
+            print(f"{module:32} {total_ms:8.1f} ms  (budget {budget:.0f} ms)  {status}")
+            if unexpected:
+                print(f"  eagerly imports: {', '.join(unexpected)}")
+            top_level = sorted(
+                (e for e in entries if e[1] == 1 and e[0] != module), key=lambda e: e[3], reverse=True
+            )[:top]
+            for name, _, _, cumulative in top_level:
+                print(f"    {cumulative / 1000.0:8.1f} ms  {name}")
+    return violations
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point; returns the process exit code"""
+    parser = argparse.ArgumentParser(description="Check import times against budgets")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per module (fastest counts)")
+    parser.add_argument("--top", type=int, default=10, help="Direct imports to show per module")
+    args = parser.parse_args(argv)
+
+    violations = check(runs=args.runs, top=args.top)
+    if violations:
+        print("\nImport-time budget exceeded:")
+        for line in violations:
+            print(f"  {line}")
+        return 1
+    print("\nAll import times within budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,334 @@
+"""Load generator replaying realistic /calc and /api/calc traffic
+
+Request bodies come from exported submissions (the JSON lines rows read by
+``app.services.export.JsonlSource``, or the Parquet dataset it writes) or from
+a seeded synthetic generator.
+
+Two arrival models:
+  * open loop (``--rate N``): requests arrive as a Poisson process at N/s
+    regardless of how fast the server answers. Latency is measured from the
+    scheduled arrival time, so time spent queued behind ``--concurrency``
+    in-flight requests counts (no coordinated omission).
+  * closed loop (``--rate 0``): ``--concurrency`` clients send back to back.
+
+``--spawn`` starts the Supabase/geo-IP stand-in and a local uvicorn with
+submission logging pointed at it, so the logger's work is included.
+
+Usage:
+    python -m benchmarks.loadtest --spawn --rate 50 --duration 30
+    python -m benchmarks.loadtest --url http://127.0.0.1:8000 --concurrency 16 --rate 0
+    python -m benchmarks.loadtest --spawn --source submissions.jsonl --mix calc=1
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+import httpx
+from app.services.submission_codec import decode_inputs
+from benchmarks.scenarios import api_body, form_body
+
+ENDPOINTS = {"calc": "/calc", "api": "/api/calc"}
+
+
+def synthetic_inputs(rng: random.Random) -> Dict[str, Any]:
+    """One plausible household; most optional spending is left at zero"""
+    inputs: Dict[str, Any] = {
+        "annual_salary": round(min(rng.lognormvariate(12.6, 0.6), 5_000_000), -2),
+        "age": rng.randint(21, 70),
+        "medical_members": rng.choice((0, 0, 1, 2, 3, 4)),
+        "std_vat_spend_month": round(rng.uniform(2000, 20000), -2),
+    }
+
+    def maybe(probability: float, name: str, value) -> None:
+        if rng.random() < probability:
+            inputs[name] = value
+
+    maybe(0.3, "annual_bonus", round(inputs["annual_salary"] * rng.uniform(0.05, 0.2), -2))
+    maybe(0.4, "retirement_contrib", round(inputs["annual_salary"] * rng.uniform(0.05, 0.15), -2))
+    maybe(0.7, "litres_petrol_month", rng.randint(20, 250))
+    maybe(0.1, "litres_diesel_month", rng.randint(20, 200))
+    maybe(0.8, "electricity_kwh_month", rng.randint(200, 1200))
+    maybe(0.5, "beer_litres_month", rng.randint(1, 20))
+    maybe(0.4, "wine_litres_month", rng.randint(1, 10))
+    maybe(0.2, "spirits_litres_month", rng.randint(1, 4))
+    maybe(0.15, "cigarette_packs_20_month", rng.randint(5, 40))
+    maybe(0.5, "tyres_purchased_per_year", rng.choice((2, 4)))
+    maybe(0.6, "tv_licenses_count", 1)
+    maybe(0.4, "monthly_imported_goods_spend", round(rng.uniform(200, 5000), -1))
+    maybe(0.3, "monthly_international_online_spend", round(rng.uniform(100, 3000), -1))
+    maybe(0.3, "domestic_flights_per_year", rng.randint(1, 8))
+    maybe(0.1, "international_flights_per_year", rng.randint(1, 4))
+    maybe(0.2, "annual_accommodation_spend", round(rng.uniform(1000, 30000), -2))
+    maybe(0.7, "vehicle_licence_fees_annual", rng.randint(500, 2500))
+    maybe(0.4, "tolls_annual", rng.randint(500, 10000))
+    maybe(0.5, "municipal_rates_services_annual", rng.randint(5000, 40000))
+    maybe(0.5, "vehicle_monthly_installment", rng.randint(3000, 15000))
+    maybe(0.2, "vehicle_is_imported", True)
+    maybe(0.6, "municipal_water_monthly", rng.randint(200, 1200))
+    maybe(0.6, "municipal_sewerage_monthly", rng.randint(150, 900))
+    maybe(0.6, "municipal_refuse_monthly", rng.randint(150, 450))
+    maybe(0.15, "sa_dividends_annual", rng.randint(1000, 100000))
+    maybe(0.05, "taxable_cgt_base_annual", rng.randint(10000, 500000))
+    return inputs
+
+
+def load_recorded_inputs(path: str | Path) -> List[Dict[str, Any]]:
+    """Inputs from exported submissions: JSON lines rows or a Parquet dataset"""
+    path = Path(path)
+    if path.suffix == ".jsonl":
+        with open(path, "r") as f:
+            return [decode_inputs(json.loads(line)) for line in f if line.strip()]
+
+    import pyarrow.dataset as ds
+    from app.services.export import INPUT_COLUMNS
+
+    table = ds.dataset(path, format="parquet", partitioning="hive").to_table(
+        columns=list(INPUT_COLUMNS)
+    )
+    return [
+        {k: v for k, v in row.items() if v is not None}
+        for row in table.to_pylist()
+    ]
+
+
+def input_stream(seed: int, recorded: Optional[List[Dict[str, Any]]] = None) -> Iterator[Dict[str, Any]]:
+    """Endless stream of inputs: shuffled replay of recordings, or synthetic"""
+    rng = random.Random(seed)
+    while True:
+        if recorded:
+            yield rng.choice(recorded)
+        else:
+            yield synthetic_inputs(rng)
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """Parse ``calc=0.7,api=0.3`` into endpoint weights"""
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint {name!r} (choose from {', '.join(ENDPOINTS)})")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    """Nearest-rank percentile of pre-sorted values"""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))]
+
+
+@dataclass
+class EndpointStats:
+    latencies: List[float] = field(default_factory=list)
+    statuses: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    errors: int = 0
+
+    def record(self, latency: float, status: str, ok: bool) -> None:
+        self.latencies.append(latency)
+        self.statuses[status] += 1
+        if not ok:
+            self.errors += 1
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        ordered = sorted(self.latencies)
+        count = len(ordered)
+        return {
+            "requests": count,
+            "throughput_rps": count / elapsed if elapsed else 0.0,
+            "error_rate": self.errors / count if count else 0.0,
+            "statuses": dict(self.statuses),
+            "p50_ms": percentile(ordered, 0.50) * 1000.0,
+            "p95_ms": percentile(ordered, 0.95) * 1000.0,
+            "p99_ms": percentile(ordered, 0.99) * 1000.0,
+            "max_ms": ordered[-1] * 1000.0 if ordered else 0.0,
+        }
+
+
+async def _send(client: httpx.AsyncClient, endpoint: str, inputs: Dict[str, Any]) -> httpx.Response:
+    if endpoint == "calc":
+        return await client.post(ENDPOINTS[endpoint], data=form_body(inputs))
+    return await client.post(ENDPOINTS[endpoint], json=api_body(inputs))
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    duration: float,
+    rate: float = 0.0,
+    concurrency: int = 8,
+    mix: Optional[Dict[str, float]] = None,
+    seed: int = 1,
+    recorded: Optional[List[Dict[str, Any]]] = None,
+) -> Dict[str, Any]:
+    """Drive load for ``duration`` seconds and summarize per endpoint
+
+    Args:
+        client: HTTP client with base_url set to the app under test
+        duration: Seconds to keep generating new requests
+        rate: Open-loop arrivals per second; 0 for closed-loop clients
+        concurrency: Max requests in flight (open loop) or clients (closed loop)
+        mix: Endpoint weights, e.g. {"calc": 0.7, "api": 0.3}
+        seed: Seed for arrivals, endpoint choice and synthetic bodies
+        recorded: Recorded inputs to replay instead of synthetic ones
+    """
+    mix = mix or {"calc": 0.7, "api": 0.3}
+    names, weights = list(mix), list(mix.values())
+    rng = random.Random(seed)
+    inputs = input_stream(seed, recorded)
+    stats: Dict[str, EndpointStats] = defaultdict(EndpointStats)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(endpoint: str, body: Dict[str, Any], scheduled: float) -> None:
+        async with semaphore:
+            try:
+                response = await _send(client, endpoint, body)
+                status, ok = str(response.status_code), response.status_code < 400
+            except httpx.HTTPError as e:
+                status, ok = type(e).__name__, False
+        stats[endpoint].record(time.perf_counter() - scheduled, status, ok)
+
+    started = time.perf_counter()
+    deadline = started + duration
+
+    if rate > 0:
+        tasks = []
+        next_arrival = started
+        while next_arrival < deadline:
+            delay = next_arrival - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            endpoint = rng.choices(names, weights)[0]
+            tasks.append(asyncio.create_task(one(endpoint, next(inputs), next_arrival)))
+            next_arrival += rng.expovariate(rate)
+        await asyncio.gather(*tasks)
+    else:
+        async def closed_loop_client() -> None:
+            while time.perf_counter() < deadline:
+                endpoint = rng.choices(names, weights)[0]
+                await one(endpoint, next(inputs), time.perf_counter())
+
+        await asyncio.gather(*(closed_loop_client() for _ in range(concurrency)))
+
+    elapsed = time.perf_counter() - started
+    return {
+        "mode": "open" if rate > 0 else "closed",
+        "target_rate": rate,
+        "concurrency": concurrency,
+        "elapsed_s": elapsed,
+        "endpoints": {name: s.summary(elapsed) for name, s in sorted(stats.items())},
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    mode = f"open loop at {report['target_rate']}/s" if report["mode"] == "open" else "closed loop"
+    print(f"\n{mode}, concurrency {report['concurrency']}, {report['elapsed_s']:.1f}s")
+    print(f"{'endpoint':10} {'requests':>9} {'rps':>8} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for name, s in report["endpoints"].items():
+        print(
+            f"{name:10} {s['requests']:9d} {s['throughput_rps']:8.1f} {s['error_rate']:7.2%} "
+            f"{s['p50_ms']:8.1f} {s['p95_ms']:8.1f} {s['p99_ms']:8.1f} {s['max_ms']:8.1f}"
+        )
+
+
+def _wait_until_up(url: str, timeout: float = 20.0, successes: int = 1) -> None:
+    """Poll ``url`` until it answers below 500 ``successes`` times in a row"""
+    deadline = time.monotonic() + timeout
+    streak = 0
+    while time.monotonic() < deadline:
+        try:
+            ok = httpx.get(url, timeout=1.0).status_code < 500
+        except httpx.HTTPError:
+            ok = False
+        streak = streak + 1 if ok else 0
+        if streak >= successes:
+            return
+        if not ok:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def spawn_servers(app_port: int, stub_port: int, workers: int, stub_latency_ms: float) -> List[subprocess.Popen]:
+    """Start the Supabase stand-in and the app (with logging pointed at it)"""
+    stub_url = f"http://127.0.0.1:{stub_port}"
+    stub = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.supabase_stub:app", "--port", str(stub_port), "--log-level", "warning"],
+        env={**os.environ, "STUB_LATENCY_MS": str(stub_latency_ms)},
+    )
+    app_env = {
+        **os.environ,
+        "ENABLE_SUBMISSION_LOGGING": "True",
+        "SUPABASE_URL": stub_url,
+        "SUPABASE_KEY": "stub",
+        "GEO_LOOKUP_URL": f"{stub_url}/json/{{ip}}",
+    }
+    app = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(app_port),
+         "--workers", str(workers), "--log-level", "warning"],
+        env=app_env,
+    )
+    _wait_until_up(f"{stub_url}/stats")
+    # /ready is 503 until warmup has run, so measurements never include cold starts.
+    # Each poll reaches one worker; several in a row make it likely every one is warm.
+    _wait_until_up(f"http://127.0.0.1:{app_port}/ready", timeout=60.0, successes=3 * workers)
+    return [app, stub]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Replay calculator traffic against a running app")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="App base URL (ignored with --spawn)")
+    parser.add_argument("--spawn", action="store_true", help="Start uvicorn and the Supabase stand-in locally")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers when spawning")
+    parser.add_argument("--stub-latency-ms", type=float, default=30.0, help="Stand-in response delay")
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--rate", type=float, default=20.0, help="Open-loop arrivals/s (0 = closed loop)")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--mix", default="calc=0.7,api=0.3")
+    parser.add_argument("--source", help="Exported submissions (.jsonl rows or Parquet dataset dir)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args(argv)
+
+    recorded = load_recorded_inputs(args.source) if args.source else None
+    processes: List[subprocess.Popen] = []
+    base_url = args.url
+    if args.spawn:
+        app_port, stub_port = 8765, 54321
+        processes = spawn_servers(app_port, stub_port, args.workers, args.stub_latency_ms)
+        base_url = f"http://127.0.0.1:{app_port}"
+
+    async def run() -> Dict[str, Any]:
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+            return await run_load(
+                client, args.duration, rate=args.rate, concurrency=args.concurrency,
+                mix=parse_mix(args.mix), seed=args.seed, recorded=recorded,
+            )
+
+    try:
+        report = asyncio.run(run())
+        if args.spawn:
+            report["stub"] = httpx.get(f"http://127.0.0.1:{stub_port}/stats").json()
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait(timeout=10)
+
+    print_report(report)
+    if "stub" in report:
+        print(f"stand-in received: {report['stub']}")
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
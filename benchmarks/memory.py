@@ -0,0 +1,243 @@
+"""Per-request memory allocation benchmarks using tracemalloc
+
+For each operation this reports:
+  * peak_bytes: the most extra memory live at any point during one call, i.e.
+    the transient garbage a worker must have headroom for per request
+  * retained_bytes / retained_blocks: memory still allocated after the call
+    (averaged over many calls), i.e. growth from caches or leaks
+  * the top allocation sites of retained memory
+
+Requests are driven straight through the ASGI app (no HTTP client), so the
+numbers only include the app: routing, form/JSON parsing, the form_data /
+request_data / results_summary dicts, the engine, rendering and middleware.
+
+Results can be saved as a baseline and compared against later runs; every
+run is also appended to .benchmarks/memory_history.jsonl.
+
+Usage:
+    python -m benchmarks.memory
+    python -m benchmarks.memory --save       # store benchmarks/memory_baseline.json
+    python -m benchmarks.memory --compare    # exit 1 on >10% growth
+"""
+import argparse
+import asyncio
+import gc
+import json
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlencode
+from app.config import settings
+from app.domain.engine import TaxEngine
+from app.domain.profiles import build_profiles
+from app.domain.rates import TaxRates
+from benchmarks.scenarios import TYPICAL, api_body, form_body
+
+BASELINE_PATH = Path(__file__).parent / "memory_baseline.json"
+HISTORY_PATH = Path(".benchmarks") / "memory_history.jsonl"
+METRICS = ("peak_bytes", "retained_bytes", "retained_blocks")
+
+
+def measure(operation: Callable[[], Any], iterations: int = 50, warmup: int = 10, top: int = 10) -> Dict[str, Any]:
+    """Measure peak and retained allocations of ``operation``"""
+    for _ in range(warmup):
+        operation()
+
+    gc.collect()
+    tracemalloc.start(1)
+    try:
+        # Peak working memory per call
+        peaks = []
+        for _ in range(iterations):
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            operation()
+            peaks.append(tracemalloc.get_traced_memory()[1] - current)
+
+        # Memory retained across many calls
+        gc.collect()
+        before = tracemalloc.take_snapshot()
+        for _ in range(iterations):
+            operation()
+        gc.collect()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    ignore = (tracemalloc.Filter(False, tracemalloc.__file__),)
+    diff = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), "lineno")
+    retained_bytes = sum(stat.size_diff for stat in diff)
+    retained_blocks = sum(stat.count_diff for stat in diff)
+    peaks.sort()
+
+    return {
+        "iterations": iterations,
+        "peak_bytes": peaks[len(peaks) // 2],
+        "peak_bytes_max": peaks[-1],
+        "retained_bytes": retained_bytes / iterations,
+        "retained_blocks": retained_blocks / iterations,
+        "top_sites": [
+            {
+                "site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                "bytes_per_call": stat.size_diff / iterations,
+                "blocks_per_call": stat.count_diff / iterations,
+            }
+            for stat in sorted(diff, key=lambda s: s.size_diff, reverse=True)[:top]
+            if stat.size_diff > 0
+        ],
+    }
+
+
+class ASGIDriver:
+    """Send single requests straight into an ASGI app on a private event loop"""
+
+    def __init__(self, app):
+        self.app = app
+        self.loop = asyncio.new_event_loop()
+
+    def request(self, method: str, path: str, body: bytes = b"", content_type: str = "") -> int:
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "root_path": "",
+            "query_string": b"",
+            "headers": [
+                (b"host", b"localhost"),
+                (b"content-type", content_type.encode()),
+                (b"content-length", str(len(body)).encode()),
+                (b"user-agent", b"Mozilla/5.0 (X11; Linux x86_64) Firefox/121.0"),
+            ],
+            "client": ("127.0.0.1", 50000),
+            "server": ("localhost", 80),
+        }
+        messages = [{"type": "http.request", "body": body, "more_body": False}]
+        status = {}
+
+        async def receive():
+            return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+
+        self.loop.run_until_complete(self.app(scope, receive, send))
+        return status["code"]
+
+    def close(self) -> None:
+        self.loop.close()
+
+
+def run_suite(iterations: int = 50, top: int = 10) -> Dict[str, Dict[str, Any]]:
+    """Measure every tracked operation"""
+    from app.main import create_app
+
+    engine = TaxEngine(TaxRates.load_from_yaml(settings.TAX_RATES_PATH))
+    profiles = build_profiles(TYPICAL)
+    driver = ASGIDriver(create_app())
+
+    form = urlencode(form_body(TYPICAL)).encode()
+    api = json.dumps(api_body(TYPICAL)).encode()
+
+    def calc():
+        assert driver.request("POST", "/calc", form, "application/x-www-form-urlencoded") == 200
+
+    def api_calc():
+        assert driver.request("POST", "/api/calc", api, "application/json") == 200
+
+    operations = {
+        "engine_run": lambda: engine.run(*profiles),
+        "calc_request": calc,
+        "api_calc_request": api_calc,
+    }
+    try:
+        return {name: measure(op, iterations=iterations, top=top) for name, op in operations.items()}
+    finally:
+        driver.close()
+
+
+def compare(baseline: Dict[str, Dict[str, Any]], current: Dict[str, Dict[str, Any]], threshold: float) -> List[str]:
+    """Describe every metric that grew by more than ``threshold`` percent
+
+    Growth of less than 1 KiB (or 10 blocks) per call is treated as noise.
+    """
+    regressions = []
+    for name, stats in current.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        for metric in METRICS:
+            floor = 10 if metric.endswith("blocks") else 1024
+            old, new = before[metric], stats[metric]
+            if new - old > floor and new > old * (1 + threshold / 100.0):
+                regressions.append(f"{name}.{metric}: {old:,.0f} -> {new:,.0f}")
+    return regressions
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(results: Dict[str, Dict[str, Any]]) -> None:
+    print(f"{'operation':18} {'peak KiB':>10} {'max KiB':>10} {'retained B':>11} {'blocks':>8}")
+    for name, r in results.items():
+        print(
+            f"{name:18} {r['peak_bytes'] / 1024:10.1f} {r['peak_bytes_max'] / 1024:10.1f} "
+            f"{r['retained_bytes']:11.1f} {r['retained_blocks']:8.2f}"
+        )
+    for name, r in results.items():
+        if r["top_sites"]:
+            print(f"\nTop retained allocation sites for {name}:")
+            for site in r["top_sites"]:
+                print(f"  {site['bytes_per_call']:10.1f} B/call  {site['blocks_per_call']:6.2f} blocks  {site['site']}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point; returns the process exit code"""
+    parser = argparse.ArgumentParser(description="tracemalloc allocation benchmarks")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--top", type=int, default=10, help="Allocation sites to show per operation")
+    parser.add_argument("--save", action="store_true", help=f"Store results as {BASELINE_PATH.name}")
+    parser.add_argument("--compare", action="store_true", help="Fail on growth against the baseline")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed growth in percent")
+    args = parser.parse_args(argv)
+
+    results = run_suite(iterations=args.iterations, top=args.top)
+    print_report(results)
+
+    HISTORY_PATH.parent.mkdir(exist_ok=True)
+    with open(HISTORY_PATH, "a") as f:
+        summary = {name: {m: r[m] for m in METRICS} for name, r in results.items()}
+        f.write(json.dumps({"timestamp": time.time(), "commit": _git_commit(), "results": summary}) + "\n")
+
+    if args.save:
+        BASELINE_PATH.write_text(json.dumps(
+            {name: {m: r[m] for m in METRICS} for name, r in results.items()}, indent=1, sort_keys=True
+        ) + "\n")
+        print(f"\nSaved baseline to {BASELINE_PATH}")
+
+    if args.compare:
+        regressions = compare(json.loads(BASELINE_PATH.read_text()), results, args.threshold)
+        if regressions:
+            print(f"\nAllocation regressions beyond {args.threshold}%:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\nNo allocation regressions beyond {args.threshold}%")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""Representative calculator inputs shared by the benchmarks and load tools
+
+Inputs are flat dicts of profile fields (see ``build_profiles``), converted
+to a /calc form body or an /api/calc JSON body as needed.
+"""
+from dataclasses import fields
+from typing import Any, Dict
+from app.api.schemas import CalcRequest
+from app.domain.profiles import PROFILE_TYPES
+
+# Only what the form requires
+MINIMAL = {"annual_salary": 180000, "age": 28}
+
+# A household with a car, some drinking and municipal services
+TYPICAL = {
+    "annual_salary": 420000,
+    "annual_bonus": 35000,
+    "retirement_contrib": 30000,
+    "age": 38,
+    "medical_members": 3,
+    "std_vat_spend_month": 9000,
+    "litres_petrol_month": 120,
+    "electricity_kwh_month": 650,
+    "beer_litres_month": 8,
+    "wine_litres_month": 3,
+    "tyres_purchased_per_year": 2,
+    "tv_licenses_count": 1,
+    "monthly_imported_goods_spend": 1200,
+    "domestic_flights_per_year": 2,
+    "vehicle_licence_fees_annual": 900,
+    "tolls_annual": 2400,
+    "municipal_rates_services_annual": 14000,
+    "vehicle_monthly_installment": 6500,
+    "municipal_water_monthly": 550,
+    "municipal_sewerage_monthly": 420,
+    "municipal_refuse_monthly": 260,
+    "sa_dividends_annual": 8000,
+}
+
+
+def _everything_filled() -> Dict[str, Any]:
+    """Every profile field set to a plausible non-default value"""
+    inputs: Dict[str, Any] = {}
+    for profile_type in PROFILE_TYPES:
+        for f in fields(profile_type):
+            if f.type is bool:
+                inputs[f.name] = True
+            elif f.type is int:
+                inputs[f.name] = 45 if f.name == "age" else 4
+            else:
+                inputs[f.name] = 2500.0
+    inputs.update({
+        "annual_salary": 1250000.0,
+        "sugary_avg_g_per_100ml": 10.6,
+        "beer_avg_abv": 5.5,
+        "wine_avg_abv": 13.0,
+        "spirits_avg_abv": 40.0,
+        "cigarette_avg_price_per_pack": 52.0,
+        "tyre_avg_weight_kg": 11.0,
+        "imported_goods_avg_duty_rate": 0.25,
+        "buying_property_price": 2400000.0,
+    })
+    return inputs
+
+
+FULL = _everything_filled()
+
+SCENARIOS = {"minimal": MINIMAL, "typical": TYPICAL, "full": FULL}
+
+
+def form_body(inputs: Dict[str, Any]) -> Dict[str, str]:
+    """Inputs as a /calc form post (booleans as the form's "true"/"false")"""
+    return {
+        key: ("true" if value else "false") if isinstance(value, bool) else str(value)
+        for key, value in inputs.items()
+        if value is not None
+    }
+
+
+def api_body(inputs: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Inputs as an /api/calc JSON body, keeping the fields the API accepts"""
+    body = {}
+    for section, field in CalcRequest.model_fields.items():
+        accepted = field.annotation.model_fields
+        body[section] = {k: v for k, v in inputs.items() if k in accepted and v is not None}
+    return body
@@ -0,0 +1,62 @@
+"""Local stand-in for Supabase and the geo-IP service during load tests
+
+Accepts PostgREST inserts (``POST /rest/v1/<table>``) and answers ip-api.com
+style lookups (``GET /json/<ip>``), optionally with artificial latency, so
+the submission logger does its full amount of work without leaving the box.
+
+Usage:
+    STUB_LATENCY_MS=40 uvicorn benchmarks.supabase_stub:app --port 54321
+
+then run the app with::
+
+    ENABLE_SUBMISSION_LOGGING=True SUPABASE_URL=http://127.0.0.1:54321 \
+    SUPABASE_KEY=stub GEO_LOOKUP_URL=http://127.0.0.1:54321/json/{ip} uvicorn app.main:app
+"""
+import asyncio
+import itertools
+import os
+from collections import Counter
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+LATENCY = float(os.getenv("STUB_LATENCY_MS", "0")) / 1000.0
+
+app = FastAPI(title="Supabase stub")
+_ids = itertools.count(1)
+inserted: Counter = Counter()
+geo_lookups = Counter()
+
+
+@app.post("/rest/v1/{table}")
+async def insert(table: str, request: Request):
+    """PostgREST insert: echo rows back with ids"""
+    body = await request.json()
+    rows = body if isinstance(body, list) else [body]
+    if LATENCY:
+        await asyncio.sleep(LATENCY)
+    inserted[table] += len(rows)
+    return JSONResponse([{**row, "id": next(_ids)} for row in rows], status_code=201)
+
+
+@app.get("/json/{ip}")
+async def geo_lookup(ip: str):
+    """ip-api.com compatible response"""
+    if LATENCY:
+        await asyncio.sleep(LATENCY)
+    geo_lookups["total"] += 1
+    return {
+        "status": "success",
+        "countryCode": "ZA",
+        "country": "South Africa",
+        "regionName": "Gauteng",
+        "city": "Johannesburg",
+        "timezone": "Africa/Johannesburg",
+        "lat": -26.2041,
+        "lon": 28.0473,
+    }
+
+
+@app.get("/stats")
+async def stats():
+    """Rows received per table and geo lookups served"""
+    return {"inserted": dict(inserted), "geo_lookups": geo_lookups["total"]}
@@ -1,17 +1,42 @@
-"""Database session management"""
-from sqlmodel import create_engine, Session, SQLModel
+"""Database session management
+
+sqlmodel/SQLAlchemy take a large share of import time and only the saved
+scenario endpoints use the database, so both are imported on first use.
+"""
+import threading
+from typing import TYPE_CHECKING
 from app.config import settings
 
-# Create engine
-engine = create_engine(settings.DATABASE_URL, echo=settings.DEBUG)
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Engine
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> "Engine":
+    """Create the engine and tables on first use (normally from the app lifespan)"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                from sqlmodel import SQLModel, create_engine
+                import db.models  # noqa: F401  (registers the tables)
+                
+                engine = create_engine(settings.DATABASE_URL, echo=settings.DEBUG)
+                SQLModel.metadata.create_all(engine)
+                _engine = engine
+    return _engine
 
 
 def create_db_and_tables():
     """Create database tables"""
-    SQLModel.metadata.create_all(engine)
+    get_engine()
 
 
 def get_session():
     """FastAPI dependency for database sessions"""
-    with Session(engine) as session:
+    from sqlmodel import Session
+    
+    with Session(get_engine()) as session:
         yield session
@@ -14,6 +14,7 @@ CREATE TABLE IF NOT EXISTS submissions (
     annual_salary INTEGER,
     total_to_govt NUMERIC(12,2),
     effective_rate NUMERIC(5,2),
+    sample_weight NUMERIC(8,2) DEFAULT 1, -- 1 / logging sample rate, weight aggregates by this
     
     -- Full data as JSON
     form_data JSONB NOT NULL,
@@ -78,6 +79,11 @@ CREATE TABLE IF NOT EXISTS submissions (
 -- Add new columns if table already exists (safe to run multiple times)
 DO $$ 
 BEGIN
+    -- Sampling
+    IF NOT EXISTS (SELECT 1 FROM information_schema.columns WHERE table_name='submissions' AND column_name='sample_weight') THEN
+        ALTER TABLE submissions ADD COLUMN sample_weight NUMERIC(8,2) DEFAULT 1;
+    END IF;
+    
     -- Geographic data
     IF NOT EXISTS (SELECT 1 FROM information_schema.columns WHERE table_name='submissions' AND column_name='country_code') THEN
         ALTER TABLE submissions ADD COLUMN country_code VARCHAR(2);
@@ -278,8 +284,9 @@ COMMENT ON TABLE submissions IS 'Stores all calculator form submissions with ful
 COMMENT ON COLUMN submissions.annual_salary IS 'User annual salary in Rand (extracted for quick queries)';
 COMMENT ON COLUMN submissions.total_to_govt IS 'Total annual amount flowing to government';
 COMMENT ON COLUMN submissions.effective_rate IS 'Effective tax rate as percentage of gross income';
-COMMENT ON COLUMN submissions.form_data IS 'Full form input data as JSON';
-COMMENT ON COLUMN submissions.results IS 'Calculation results including breakdown';
+COMMENT ON COLUMN submissions.form_data IS 'Non-default form inputs as JSON (compact encoding, see app/services/submission_codec.py)';
+COMMENT ON COLUMN submissions.results IS 'Rates version and optional breakdown keyed by category code';
+COMMENT ON COLUMN submissions.sample_weight IS 'Inverse of the adaptive logging sample rate (1 when unsampled)';
 COMMENT ON COLUMN submissions.ip_hash IS 'SHA-256 hash of IP address (for abuse prevention, not tracking)';
 
 -- Disable Row Level Security for public submissions
@@ -1,7 +1,23 @@
 """Pytest configuration and fixtures"""
 import sys
 from pathlib import Path
+import pytest
 
 # Add project root to Python path so tests can import app modules
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
+
+
+@pytest.fixture(scope="session", autouse=True)
+def isolated_database(tmp_path_factory):
+    """Point the app at a throwaway SQLite file so tests never write into db/"""
+    from app.config import settings
+    import db.session
+
+    url = f"sqlite:///{tmp_path_factory.mktemp('db') / 'test.db'}"
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("DATABASE_URL", url)
+        mp.setattr(settings, "DATABASE_URL", url)
+        mp.setattr(db.session, "_engine", None)
+        yield url
+    db.session._engine = None
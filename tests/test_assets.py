@@ -0,0 +1,76 @@
+"""Tests for the static asset fingerprinting pipeline"""
+import gzip
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.services.assets import AssetManifest, StaticAssets, build
+from app.views.templating import templates
+
+CSS = b"body { color: #333; }\n" * 200
+
+
+@pytest.fixture
+def static_dir(tmp_path):
+    (tmp_path / "css").mkdir()
+    (tmp_path / "css" / "site.css").write_bytes(CSS)
+    (tmp_path / "images").mkdir()
+    (tmp_path / "images" / "logo.png").write_bytes(b"\x89PNG" + bytes(range(256)) * 4)
+    (tmp_path / "images" / ".gitkeep").write_bytes(b"")
+    return tmp_path
+
+
+@pytest.fixture
+def client(static_dir):
+    build(static_dir)
+    app = FastAPI()
+    app.mount("/static", StaticAssets(directory=str(static_dir)), name="static")
+    return TestClient(app)
+
+
+def test_build_fingerprints_and_precompresses(static_dir):
+    manifest = build(static_dir)
+
+    assert set(manifest) == {"css/site.css", "images/logo.png"}
+    css = static_dir / manifest["css/site.css"]
+    assert css.read_bytes() == CSS
+    assert css.name.startswith("site.") and css.name != "site.css"
+    assert gzip.decompress((css.parent / (css.name + ".gz")).read_bytes()) == CSS
+    # PNGs are already compressed
+    assert not (static_dir / (manifest["images/logo.png"] + ".gz")).exists()
+
+    # Same content, same name
+    assert build(static_dir) == manifest
+
+
+def test_manifest_urls_fall_back_to_plain_paths(static_dir):
+    manifest = build(static_dir)
+    urls = AssetManifest(static_dir)
+
+    assert urls.url("css/site.css") == f"/static/{manifest['css/site.css']}"
+    assert urls.url("/js/unbuilt.js") == "/static/js/unbuilt.js"
+    assert "static_url" in templates.env.globals
+
+
+def test_hashed_assets_served_precompressed_and_immutable(client, static_dir):
+    path = "/static/" + AssetManifest(static_dir).entries["css/site.css"]
+
+    compressed = client.get(path, headers={"Accept-Encoding": "gzip"})
+    plain = client.get(path, headers={"Accept-Encoding": "identity"})
+
+    assert compressed.status_code == 200
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.headers["content-type"].startswith("text/css")
+    assert "immutable" in compressed.headers["cache-control"]
+    assert compressed.content == CSS  # decoded by the client
+    assert "content-encoding" not in plain.headers
+    assert plain.content == CSS
+
+    revalidated = client.get(path, headers={"Accept-Encoding": "gzip", "If-None-Match": compressed.headers["etag"]})
+    assert revalidated.status_code == 304
+
+
+def test_unhashed_assets_are_not_immutable(client):
+    response = client.get("/static/css/site.css")
+
+    assert response.status_code == 200
+    assert "cache-control" not in response.headers
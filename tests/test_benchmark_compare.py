@@ -0,0 +1,35 @@
+"""Test the benchmark baseline comparison"""
+import json
+from benchmarks.compare import compare, main
+
+
+def _write_run(path, stats):
+    path.write_text(json.dumps({"benchmarks": [
+        {"fullname": name, "stats": {"min": value, "median": value, "mean": value, "data": [value]}}
+        for name, value in stats.items()
+    ]}))
+
+
+def test_compare_flags_regressions_over_threshold():
+    """Test threshold and absolute noise floor"""
+    rows = compare(
+        {"slow": 1e-3, "jitter": 2e-7, "fast": 1e-3, "gone": 1e-3},
+        {"slow": 1.3e-3, "jitter": 4e-7, "fast": 0.9e-3, "new": 1e-3},
+        threshold=15.0,
+        min_delta=1e-6,
+    )
+    flagged = {row["name"] for row in rows if row["regressed"]}
+    assert flagged == {"slow"}
+
+
+def test_main_exit_code_and_save(tmp_path):
+    """Test that regressions fail the command and --save strips raw data"""
+    baseline, current = tmp_path / "baseline.json", tmp_path / "current.json"
+    _write_run(current, {"a": 1e-3})
+    assert main([str(baseline), str(current), "--save"]) == 0
+    assert "data" not in json.loads(baseline.read_text())["benchmarks"][0]["stats"]
+
+    _write_run(current, {"a": 2e-3})
+    assert main([str(baseline), str(current)]) == 1
+    _write_run(current, {"a": 1.05e-3})
+    assert main([str(baseline), str(current)]) == 0
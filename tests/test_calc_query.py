@@ -0,0 +1,102 @@
+"""Tests for the cacheable GET /api/calc"""
+import pytest
+from fastapi.testclient import TestClient
+from app.main import create_app
+from app.services.calc_query import canonical_query, parse_query
+
+
+@pytest.fixture
+def client():
+    return TestClient(create_app())
+
+
+def test_canonical_query_sorts_and_omits_defaults():
+    inputs = parse_query([
+        ("litres_petrol_month", "80.0"), ("annual_salary", "450000"), ("age", "35"),
+        ("beer_avg_abv", "5"), ("vehicle_is_imported", "true"), ("wine_litres_month", "2.5"),
+    ])
+
+    query = canonical_query(inputs)
+
+    assert query == "annual_salary=450000&litres_petrol_month=80&vehicle_is_imported=1&wine_litres_month=2.5"
+    assert canonical_query(parse_query([tuple(p.split("=")) for p in query.split("&")])) == query
+
+
+@pytest.mark.parametrize("params, message", [
+    ([("age", "30")], "Missing required field"),
+    ([("annual_salary", "1"), ("salary", "2")], "Unknown field"),
+    ([("annual_salary", "1"), ("annual_salary", "2")], "Repeated field"),
+    ([("annual_salary", "-5")], "non-negative"),
+    ([("annual_salary", "1"), ("medical_members", "1.5")], "whole number"),
+])
+def test_parse_query_rejects_bad_input(params, message):
+    with pytest.raises(ValueError, match=message):
+        parse_query(params)
+
+
+def test_get_matches_post_and_is_cacheable(client):
+    response = client.get("/api/calc?annual_salary=300000&litres_petrol_month=50")
+    posted = client.post("/api/calc", json={
+        "personal": {"annual_salary": 300000, "age": 35},
+        "consumption": {"litres_petrol_month": 50},
+        "transport_property": {},
+        "investment": {},
+    })
+
+    assert response.status_code == 200
+    assert response.json()["total"] == pytest.approx(posted.json()["total"])
+    assert response.headers["cache-control"].startswith("public, max-age=")
+    # Validator and version header describe the same loaded rates
+    assert response.headers["etag"].startswith(f'W/"{response.headers["x-rates-version"]}-')
+    assert "Accept-Encoding" in response.headers["vary"]
+
+    again = client.get("/api/calc?annual_salary=300000&litres_petrol_month=50")
+    assert again.content == response.content
+    assert again.headers["etag"] == response.headers["etag"]
+
+
+def test_non_canonical_query_redirects(client):
+    response = client.get("/api/calc?litres_petrol_month=50.0&age=35&annual_salary=300000", follow_redirects=False)
+
+    assert response.status_code == 301
+    assert response.headers["location"] == "/api/calc?annual_salary=300000&litres_petrol_month=50"
+    assert client.get("/api/calc?annual_salary=abc").status_code == 422
+
+
+def test_etag_revalidation_skips_engine(client, monkeypatch):
+    url = "/api/calc?annual_salary=275000"
+    etag = client.get(url).headers["etag"]
+
+    from app.domain.engine import TaxEngine
+
+    def fail(*args, **kwargs):
+        raise AssertionError("engine should not run")
+
+    monkeypatch.setattr(TaxEngine, "run", fail)
+    response = client.get(url, headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+
+
+def test_get_and_post_build_the_same_profiles(client, monkeypatch):
+    """Test that both forms of /api/calc run on and record the same full profiles"""
+    from app.services.flight_recorder import flight_recorder
+
+    monkeypatch.setattr(flight_recorder, "threshold", 0.0)
+    monkeypatch.setattr(flight_recorder, "inputs_mode", "raw")
+    flight_recorder.clear()
+    got = client.get("/api/calc?age=52&annual_salary=410000&beer_litres_month=8&tolls_annual=3000")
+    posted = client.post("/api/calc", json={
+        "personal": {"annual_salary": 410000, "age": 52},
+        "consumption": {"beer_litres_month": 8},
+        "transport_property": {"tolls_annual": 3000},
+        "investment": {},
+    })
+    posted_entry, got_entry = flight_recorder.snapshot()["entries"]
+    flight_recorder.clear()
+
+    assert got.json()["breakdown"] == posted.json()["breakdown"]
+    assert got.json()["total"] == posted.json()["total"]
+    assert posted_entry["inputs"] == got_entry["inputs"]
+    assert posted_entry["inputs"]["domestic_flights_per_year"] == 0  # default travel profile included
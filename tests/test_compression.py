@@ -0,0 +1,91 @@
+"""Tests for negotiated response compression"""
+import json
+import zlib
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from app.services.compression import CompressedBodyCache, CompressionMiddleware, StreamCompressor
+
+ROWS = [{"category": f"Tax {i}", "amount": i * 101.5} for i in range(200)]
+
+
+@pytest.fixture
+def cache():
+    return CompressedBodyCache()
+
+
+@pytest.fixture
+def client(cache):
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=1000, cache=cache)
+
+    @app.get("/rows")
+    def rows():
+        return ROWS
+
+    @app.get("/small")
+    def small():
+        return {"ok": True}
+
+    @app.get("/image")
+    def image():
+        return Response(b"\x89PNG" + bytes(4000), media_type="image/png")
+
+    @app.get("/encoded")
+    def encoded():
+        return Response(b"x" * 2000, media_type="text/plain", headers={"Content-Encoding": "identity"})
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse((json.dumps(row) + "\n" for row in ROWS), media_type="application/x-ndjson")
+
+    return TestClient(app)
+
+
+def test_large_bodies_compressed_once_and_cached(client, cache):
+    first = client.get("/rows", headers={"Accept-Encoding": "gzip"})
+    second = client.get("/rows", headers={"Accept-Encoding": "gzip"})
+
+    assert first.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in first.headers["vary"]
+    assert first.json() == ROWS
+    assert second.json() == ROWS
+    assert int(first.headers["content-length"]) < len(json.dumps(ROWS)) / 4
+    assert cache.stats() == (1, 1)
+
+
+def test_passthrough_cases(client):
+    assert "content-encoding" not in client.get("/rows", headers={"Accept-Encoding": "identity"}).headers
+    assert "content-encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+    assert "content-encoding" not in client.get("/image", headers={"Accept-Encoding": "gzip"}).headers
+    assert client.get("/encoded", headers={"Accept-Encoding": "gzip"}).headers["content-encoding"] == "identity"
+
+
+def test_streaming_responses_compressed_incrementally(client):
+    response = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert [json.loads(line) for line in response.text.splitlines()] == ROWS
+
+
+def test_stream_compressor_flushes_each_chunk():
+    compressor = StreamCompressor("gzip")
+    decompressor = zlib.decompressobj(31)
+
+    assert decompressor.decompress(compressor.chunk(b'{"a": 1}\n')) == b'{"a": 1}\n'
+    assert decompressor.decompress(compressor.chunk(b'{"b": 2}\n', final=True)) == b'{"b": 2}\n'
+    assert decompressor.eof
+
+
+def test_cache_evicts_least_recently_used():
+    cache = CompressedBodyCache(max_bytes=200)
+    bodies = [bytes([i]) * 5000 for i in range(10)]
+    for body in bodies:
+        cache.get_or_compress(body, "gzip")
+
+    assert cache.size <= 200
+    cache.get_or_compress(bodies[-1], "gzip")
+    cache.get_or_compress(bodies[0], "gzip")
+    assert cache.stats() == (1, 11)
@@ -0,0 +1,70 @@
+"""Tests for the reference-vs-candidate engine differential harness"""
+import pytest
+from pathlib import Path
+from hypothesis import given, settings as hypothesis_settings
+from app.domain.engine import TaxEngine
+from app.domain.rates import TaxRates
+from benchmarks.differential import (
+    FIELD_SPECS,
+    compare_results,
+    mismatch,
+    profile_inputs,
+    shrink,
+    timed_engine,
+)
+
+
+@pytest.fixture(scope="module")
+def rates():
+    """Load tax rates"""
+    rates_path = Path(__file__).parent.parent / "data" / "tax_rates.yml"
+    return TaxRates.load_from_yaml(rates_path)
+
+
+class SkewedEngine(TaxEngine):
+    """Candidate that drifts on fuel spend, to check failures are caught"""
+
+    def run(self, *profiles):
+        breakdown, total = super().run(*profiles)
+        if profiles[1].litres_petrol_month > 100 and "VAT" in breakdown:
+            breakdown = dict(breakdown, VAT=breakdown["VAT"] + 1.0)
+        return breakdown, total
+
+
+def test_field_specs_cover_every_profile_field():
+    names = [name for name, *_ in FIELD_SPECS]
+    assert len(names) == len(set(names))
+    assert {"annual_salary", "buying_property_price", "vehicle_is_imported", "taxable_cgt_base_annual"} <= set(names)
+
+
+@hypothesis_settings(max_examples=50, deadline=None)
+@given(profile_inputs())
+def test_instrumented_engine_matches_reference(rates, inputs):
+    assert mismatch(TaxEngine(rates), timed_engine(rates), inputs) == []
+
+
+def test_compare_results_reports_each_category():
+    expected = ({"VAT": 100.0, "UIF": 10.0}, 110.0)
+    actual = ({"VAT": 100.0 + 1e-10, "Fuel Levy": 5.0}, 105.0)
+
+    problems = compare_results(expected, actual)
+
+    assert problems == ["Fuel Levy: not produced by reference", "UIF: missing from candidate", "total: 110.0 != 105.0"]
+
+
+def test_shrink_finds_minimal_failing_profile(rates):
+    reference, candidate = TaxEngine(rates), SkewedEngine(rates)
+    inputs = {
+        "annual_salary": 734_512.37,
+        "age": 51,
+        "std_vat_spend_month": 8_250.5,
+        "litres_petrol_month": 372.91,
+        "tolls_annual": 1_800.0,
+    }
+    assert mismatch(reference, candidate, inputs)
+
+    minimal = shrink(inputs, lambda trial: bool(mismatch(reference, candidate, trial)))
+
+    assert set(minimal) <= {"annual_salary", "std_vat_spend_month", "litres_petrol_month"}
+    assert "litres_petrol_month" in minimal
+    assert mismatch(reference, candidate, minimal)
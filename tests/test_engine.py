@@ -6,9 +6,11 @@ from app.domain.profiles import (
     PersonalProfile,
     ConsumptionProfile,
     TransportAndPropertyProfile,
-    InvestmentProfile
+    InvestmentProfile,
+    TravelProfile
 )
-from app.domain.engine import TaxEngine
+from app.domain.engine import CALCULATOR_STEPS, TaxEngine
+from app.domain.instrumentation import CalculatorTimings
 
 
 @pytest.fixture
@@ -212,3 +214,55 @@ def test_engine_age_rebates(engine):
     
     # Senior should pay less tax due to additional rebate
     assert total_senior < total_young
+
+
+def test_engine_timed_run_matches_untimed(rates):
+    """Test that sampled, instrumented runs return identical results"""
+    timings = CalculatorTimings(sample_every=1)
+    timed_engine = TaxEngine(rates, instrumentation=timings)
+    profiles = (
+        PersonalProfile(annual_salary=600000, age=45, medical_members=3),
+        ConsumptionProfile(std_vat_spend_month=15000, litres_petrol_month=100, beer_litres_month=10,
+                           cigarette_packs_20_month=5, tyres_purchased_per_year=4),
+        TransportAndPropertyProfile(vehicle_monthly_installment=8000, vehicle_is_imported=True,
+                                    municipal_water_monthly=500),
+        InvestmentProfile(sa_dividends_annual=20000),
+        TravelProfile(domestic_flights_per_year=4),
+    )
+    
+    timed, untimed = timed_engine.run(*profiles), TaxEngine(rates).run(*profiles)
+    assert timed == untimed
+    assert list(timed[0]) == list(untimed[0])
+    
+    summary = timings.summary()
+    assert set(summary) == {type(getattr(timed_engine, attr)).__name__ for attr, _ in CALCULATOR_STEPS}
+    assert summary["PAYECalculator"]["count"] == 1
+    assert summary["PAYECalculator"]["max_us"] >= summary["PAYECalculator"]["p50_us"]
+
+
+@pytest.mark.parametrize("profiles", [
+    (PersonalProfile(annual_salary=0), ConsumptionProfile(), TransportAndPropertyProfile(), InvestmentProfile()),
+    (PersonalProfile(annual_salary=350000, age=70), ConsumptionProfile(wine_litres_month=6, plastic_bags_per_month=20),
+     TransportAndPropertyProfile(buying_property_price=2500000), InvestmentProfile(taxable_cgt_base_annual=50000)),
+    (PersonalProfile(annual_salary=900000), ConsumptionProfile(monthly_imported_goods_spend=3000),
+     TransportAndPropertyProfile(tolls_annual=4000), InvestmentProfile(),
+     TravelProfile(international_flights_per_year=2, annual_accommodation_spend=20000)),
+])
+def test_engine_direct_and_step_paths_agree(rates, profiles):
+    """Test that run()'s direct calls and the CALCULATOR_STEPS path give identical breakdowns"""
+    direct = TaxEngine(rates).run(*profiles)
+    stepped = TaxEngine(rates, instrumentation=CalculatorTimings(sample_every=1)).run(*profiles)
+    
+    assert list(direct[0].items()) == list(stepped[0].items())
+    assert direct[1] == stepped[1]
+
+
+def test_engine_timing_sampling(rates):
+    """Test that only one in N runs is timed"""
+    timings = CalculatorTimings(sample_every=5)
+    timed_engine = TaxEngine(rates, instrumentation=timings)
+    for _ in range(10):
+        timed_engine.run(PersonalProfile(annual_salary=240000), ConsumptionProfile(),
+                         TransportAndPropertyProfile(), InvestmentProfile())
+    
+    assert timings.summary()["PAYECalculator"]["count"] == 2
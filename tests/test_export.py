@@ -0,0 +1,128 @@
+"""Test Parquet export of logged submissions"""
+import json
+import pytest
+from pathlib import Path
+from app.domain.rates import TaxRates
+from app.domain.engine import TaxEngine
+from app.domain.profiles import build_profiles
+from app.services.export import JsonlSource, export_submissions, flatten_row, iter_pages, load_state
+from app.services.submission_codec import encode_inputs, encode_results
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+@pytest.fixture
+def engine():
+    """Create tax engine"""
+    rates_path = Path(__file__).parent.parent / "data" / "tax_rates.yml"
+    return TaxEngine(TaxRates.load_from_yaml(rates_path))
+
+
+def _row(row_id, timestamp, salary, engine):
+    """Build a submission row as SubmissionLogger stores it"""
+    inputs = {"annual_salary": salary, "age": 30, "std_vat_spend_month": 5000.0}
+    breakdown, total = engine.run(*build_profiles(inputs))
+    results = {"breakdown": breakdown, "rates_version": engine.rates.version}
+    return {
+        "id": row_id,
+        "timestamp": timestamp,
+        "annual_salary": salary,
+        "total_to_govt": round(total, 2),
+        "effective_rate": round(total / salary * 100, 2),
+        "sample_weight": 2,
+        "form_data": encode_inputs(inputs),
+        "results": encode_results(results),
+        "browser": "Chrome",
+        "touch_support": True,
+    }
+
+
+@pytest.fixture
+def source_file(tmp_path, engine):
+    """Local stand-in store with rows across two months"""
+    path = tmp_path / "submissions.jsonl"
+    rows = [
+        _row(1, "2025-09-30T23:59:00", 300000, engine),
+        _row(2, "2025-10-01T08:00:00+00:00", 450000, engine),
+        _row(5, "2025-10-02T09:30:00", 600000, engine),
+    ]
+    path.write_text("\n".join(json.dumps(r) for r in rows) + "\n")
+    return path
+
+
+def test_flatten_row_types(engine, source_file):
+    """Test that inputs and breakdown become typed scalar columns"""
+    row = JsonlSource(source_file).fetch_page(0, 1)[0]
+    flat = flatten_row(row, engine)
+
+    assert flat["annual_salary"] == 300000.0
+    assert flat["age"] == 30
+    assert flat["vehicle_is_imported"] is False
+    assert flat["sample_weight"] == 2.0
+    assert flat["tax_vat"] == pytest.approx(5000 * 0.15 * 12)
+    assert flat["tax_beer"] == 0.0
+    assert flat["timestamp"].tzinfo is not None
+
+
+def test_export_partitions_by_month(tmp_path, engine, source_file):
+    """Test that rows land in month partitions with a typed schema"""
+    out_dir = tmp_path / "export"
+    assert export_submissions(JsonlSource(source_file), out_dir, page_size=2, engine=engine) == 3
+
+    months = sorted(p.name for p in out_dir.glob("month=*"))
+    assert months == ["month=2025-09", "month=2025-10"]
+
+    table = pq.read_table(out_dir / "month=2025-10")
+    assert sorted(table.column("id").to_pylist()) == [2, 5]
+    assert str(table.schema.field("age").type) == "int64"
+    assert load_state(out_dir) == 5
+
+
+def test_export_resumes_incrementally(tmp_path, engine, source_file):
+    """Test that a second run only exports rows added since the first"""
+    out_dir = tmp_path / "export"
+    export_submissions(JsonlSource(source_file), out_dir, engine=engine)
+    assert export_submissions(JsonlSource(source_file), out_dir, engine=engine) == 0
+
+    with open(source_file, "a") as f:
+        f.write(json.dumps(_row(9, "2025-11-05T10:00:00", 250000, engine)) + "\n")
+
+    assert export_submissions(JsonlSource(source_file), out_dir, engine=engine) == 1
+    assert load_state(out_dir) == 9
+    assert (out_dir / "month=2025-11").exists()
+
+
+def test_jsonl_source_reads_each_line_once(tmp_path, monkeypatch):
+    """Test that paging resumes from the last offset instead of rescanning the file"""
+    from app.services import export
+
+    path = tmp_path / "rows.jsonl"
+    path.write_text("".join(json.dumps({"id": i}) + "\n" for i in range(1, 51)))
+    parsed = []
+    loads = json.loads
+
+    def counting_loads(line):
+        parsed.append(line)
+        return loads(line)
+
+    monkeypatch.setattr(export.json, "loads", counting_loads)
+
+    source = JsonlSource(path)
+    ids = [row["id"] for page in iter_pages(source, 0, 7) for row in page]
+
+    assert ids == list(range(1, 51))
+    assert len(parsed) == 50
+
+    with open(path, "a") as f:
+        f.write(json.dumps({"id": 51}) + "\n")
+    assert source.fetch_page(50, 7) == [{"id": 51}]
+
+
+def test_jsonl_source_sorts_out_of_order_files(tmp_path):
+    """Test that a file not in id order still pages in id order"""
+    path = tmp_path / "rows.jsonl"
+    path.write_text("".join(json.dumps({"id": i}) + "\n" for i in (3, 1, 4, 2, 6, 5)))
+
+    pages = list(iter_pages(JsonlSource(path), 1, 2))
+
+    assert [[row["id"] for row in page] for page in pages] == [[2, 3], [4, 5], [6]]
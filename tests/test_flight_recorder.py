@@ -0,0 +1,104 @@
+"""Test the slow-request flight recorder"""
+import pytest
+from fastapi.testclient import TestClient
+from app.config import settings
+from app.domain.engine import TaxEngine
+from app.domain.rates import TaxRates
+from app.main import create_app
+from app.services.flight_recorder import FlightRecorder, bucket_inputs, flight_recorder, replay
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """Create test client recording every request with exact inputs"""
+    monkeypatch.setattr(flight_recorder, "threshold", 0.0)
+    monkeypatch.setattr(flight_recorder, "inputs_mode", "raw")
+    flight_recorder.clear()
+    yield TestClient(create_app())
+    flight_recorder.clear()
+
+
+def test_fast_requests_are_not_recorded():
+    """Test that only requests over the threshold are kept"""
+    recorder = FlightRecorder(threshold_ms=100, capacity=2)
+    scope = {"method": "GET", "path": "/"}
+    assert not recorder.observe(scope, 0.05, 200)
+    for _ in range(3):
+        assert recorder.observe(scope, 0.2, 200)
+    snapshot = recorder.snapshot()
+    assert snapshot["recorded_total"] == 3
+    assert len(snapshot["entries"]) == 2
+
+
+def test_hash_only_mode_drops_inputs():
+    """Test that inputs can be reduced to a hash"""
+    recorder = FlightRecorder(threshold_ms=0, inputs_mode="hash")
+    scope = {"flight_inputs": ({"annual_salary": 300000, "age": 35, "x": None}, "abc")}
+    recorder.observe(scope, 1.0, 200)
+    entry = recorder.snapshot()["entries"][0]
+    assert entry["inputs"] is None
+    assert entry["input_hash"]
+    assert entry["rates_version"] == "abc"
+
+
+def test_inputs_bucketed_by_default():
+    """Test that exact amounts are only kept when raw capture is opted into"""
+    inputs = {"annual_salary": 523456.0, "age": 44, "beer_avg_abv": 7.25, "medical_members": 3, "vehicle_is_imported": True}
+    scope = {"flight_inputs": (inputs, "abc")}
+
+    bucketed = FlightRecorder(threshold_ms=0)
+    bucketed.observe(scope, 1.0, 200)
+    raw = FlightRecorder(threshold_ms=0, inputs_mode="raw")
+    raw.observe(scope, 1.0, 200)
+
+    entry = bucketed.snapshot()["entries"][0]
+    assert entry["inputs_mode"] == "bucketed"
+    assert entry["inputs"] == {"age": 40, "annual_salary": 520000.0, "beer_avg_abv": 7.2,
+                               "medical_members": 3, "vehicle_is_imported": True}
+    assert entry["input_hash"] == raw.snapshot()["entries"][0]["input_hash"]
+    assert raw.snapshot()["entries"][0]["inputs"]["annual_salary"] == 523456.0
+    assert bucket_inputs(entry["inputs"]) == entry["inputs"]
+    with pytest.raises(ValueError):
+        FlightRecorder(inputs_mode="everything")
+
+
+def test_slow_calc_is_recorded_and_replayable(client):
+    """Test that a recorded /calc entry reproduces the same total offline"""
+    response = client.post("/calc", data={"annual_salary": 300000, "age": 35, "litres_petrol_month": 80})
+    assert response.status_code == 200
+
+    response = client.get("/admin/slow-requests")
+    assert response.status_code == 200
+    entry = next(e for e in response.json()["entries"] if e["path"] == "/calc")
+    assert entry["status"] == 200
+    assert entry["route"] == "/calc"
+    assert {"engine_lookup", "engine_run", "render"} <= set(entry["stages_ms"])
+    assert entry["inputs"]["litres_petrol_month"] == 80
+    assert entry["inputs"]["beer_avg_abv"] == 5.0  # every profile field, not just the logged ones
+    assert "ip_address" not in entry["inputs"]
+    assert entry["worker"]
+
+    engine = TaxEngine(TaxRates.load_from_yaml(settings.TAX_RATES_PATH))
+    result = replay(entry, engine)
+    assert result["same_rates"]
+    assert result["exact_inputs"]
+    assert result["total"] > 0
+
+
+def test_api_calc_is_recorded(client):
+    """Test that JSON API requests are flattened into replayable inputs"""
+    payload = {
+        "personal": {"annual_salary": 240000, "age": 35},
+        "consumption": {"std_vat_spend_month": 5000},
+        "transport_property": {},
+        "investment": {},
+    }
+    total = client.post("/api/calc", json=payload).json()["total"]
+
+    response = client.get("/admin/slow-requests/download")
+    assert "attachment" in response.headers["content-disposition"]
+    entry = next(e for e in response.json()["entries"] if e["path"] == "/api/calc")
+    assert entry["inputs"]["std_vat_spend_month"] == 5000
+
+    engine = TaxEngine(TaxRates.load_from_yaml(settings.TAX_RATES_PATH))
+    assert replay(entry, engine)["total"] == pytest.approx(total)
@@ -0,0 +1,95 @@
+"""Tests for the rendered breakdown fragment cache"""
+import os
+import jinja2
+import pytest
+from fastapi.testclient import TestClient
+from app.config import settings
+from app.main import create_app
+from app.views.fragments import FragmentCache, fragment_cache
+from app.views.prerendered import settings_fingerprint
+
+CONTEXT = {"breakdown": [("VAT", 1200.0), ("UIF", 300.0)], "total": 1500.0}
+
+
+@pytest.fixture
+def templates_dir(tmp_path):
+    (tmp_path / "fragment.html").write_text(
+        "{% for c, a in breakdown %}{{ c }}={{ a }};{% endfor %}{% include '_footer.html' %}"
+    )
+    (tmp_path / "_footer.html").write_text("total={{ total }}")
+    return tmp_path
+
+
+@pytest.fixture
+def cache(templates_dir):
+    env = jinja2.Environment(loader=jinja2.FileSystemLoader(str(templates_dir)), auto_reload=True)
+    return FragmentCache(env=env)
+
+
+def test_repeated_context_skips_rendering(cache):
+    first, hit_first = cache.render("fragment.html", "2025", **CONTEXT)
+    second, hit_second = cache.render("fragment.html", "2025", **CONTEXT)
+    other, _ = cache.render("fragment.html", "2025", breakdown=[("VAT", 1.0)], total=1.0)
+
+    assert first == b"VAT=1200.0;UIF=300.0;total=1500.0"
+    assert second == first
+    assert (hit_first, hit_second) == (False, True)
+    assert other == b"VAT=1.0;total=1.0"
+    assert cache.stats() == (1, 2)
+
+
+def test_settings_fingerprint_not_recomputed_per_render(cache):
+    settings_fingerprint()
+    computed = settings_fingerprint.cache_info().misses
+
+    for _ in range(3):
+        cache.render("fragment.html", "2025", **CONTEXT)
+
+    assert settings_fingerprint.cache_info().misses == computed
+
+
+def test_rates_version_change_invalidates(cache):
+    cache.render("fragment.html", "2025", **CONTEXT)
+    _, hit = cache.render("fragment.html", "2026", **CONTEXT)
+
+    assert not hit
+    assert cache.size == len(b"VAT=1200.0;UIF=300.0;total=1500.0")
+
+
+def test_included_template_edit_invalidates(cache, templates_dir, monkeypatch):
+    monkeypatch.setattr(settings, "TEMPLATES_AUTO_RELOAD", True)
+    cache.render("fragment.html", "2025", **CONTEXT)
+
+    footer = templates_dir / "_footer.html"
+    footer.write_text("sum={{ total }}")
+    stat = footer.stat()
+    os.utime(footer, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    html, hit = cache.render("fragment.html", "2025", **CONTEXT)
+    assert not hit
+    assert html.endswith(b"sum=1500.0")
+
+
+def test_lru_bound(templates_dir):
+    env = jinja2.Environment(loader=jinja2.FileSystemLoader(str(templates_dir)))
+    cache = FragmentCache(env=env, max_bytes=200)
+    for i in range(20):
+        cache.render("fragment.html", "2025", breakdown=[("VAT", float(i))], total=float(i))
+
+    assert cache.size <= 200
+    _, hit = cache.render("fragment.html", "2025", breakdown=[("VAT", 19.0)], total=19.0)
+    assert hit
+
+
+def test_calc_serves_cached_fragment():
+    client = TestClient(create_app())
+    form = {"annual_salary": 412345, "age": 41, "litres_petrol_month": 55}
+    hits, misses = fragment_cache.stats()
+
+    first = client.post("/calc", data=form)
+    second = client.post("/calc", data=form)
+
+    assert first.status_code == second.status_code == 200
+    assert first.text == second.text
+    assert "Total" in first.text
+    assert fragment_cache.stats() == (hits + 1, misses + 1)
@@ -0,0 +1,26 @@
+"""Tests for deferred imports and the import-time budget check"""
+import pytest
+from benchmarks.importtime import DEFERRED, measure, parse_importtime
+
+SAMPLE = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     _io
+import time:      2000 |       5000 |   app.config
+import time:      3000 |       8000 | app.main
+"""
+
+
+def test_parse_importtime():
+    assert parse_importtime(SAMPLE) == [
+        ("_io", 2, 120, 120),
+        ("app.config", 1, 2000, 5000),
+        ("app.main", 0, 3000, 8000),
+    ]
+
+
+@pytest.mark.parametrize("module", sorted(DEFERRED))
+def test_heavy_dependencies_are_not_imported_eagerly(module):
+    total_ms, entries, loaded = measure(module, runs=1)
+
+    assert total_ms > 0
+    assert [name for name in DEFERRED[module] if name in loaded] == []
@@ -0,0 +1,67 @@
+"""Test the load generator against the in-process app"""
+import asyncio
+import json
+import random
+import httpx
+from app.api.schemas import CalcRequest
+from app.main import create_app
+from benchmarks import loadtest
+from benchmarks.loadtest import input_stream, load_recorded_inputs, parse_mix, percentile, run_load, synthetic_inputs
+from benchmarks.scenarios import api_body
+
+
+def test_synthetic_inputs_are_seeded_and_valid():
+    """Test that the generator is reproducible and produces valid API bodies"""
+    first = [synthetic_inputs(random.Random(7)) for _ in range(2)]
+    assert first[0] == first[1]
+    for _, inputs in zip(range(50), input_stream(3)):
+        CalcRequest(**api_body(inputs))
+
+
+def test_recorded_inputs_from_jsonl(tmp_path):
+    """Test replaying exported submission rows"""
+    path = tmp_path / "submissions.jsonl"
+    path.write_text(json.dumps({"id": 1, "annual_salary": 250000, "form_data": {"_enc": 1, "age": 40}}) + "\n")
+    inputs = load_recorded_inputs(path)
+    assert inputs[0]["annual_salary"] == 250000
+    assert inputs[0]["age"] == 40
+
+
+def test_percentile_and_mix():
+    """Test report helpers"""
+    values = [i / 100 for i in range(1, 101)]
+    assert percentile(values, 0.5) == 0.5
+    assert percentile(values, 0.99) == 0.99
+    assert parse_mix("calc=3,api") == {"calc": 3.0, "api": 1.0}
+
+
+def test_open_loop_run_reports_per_endpoint():
+    """Test a short open-loop run through an ASGI transport"""
+    async def run():
+        transport = httpx.ASGITransport(app=create_app())
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await run_load(client, duration=0.5, rate=20, concurrency=4)
+
+    report = asyncio.run(run())
+    assert report["mode"] == "open"
+    assert set(report["endpoints"]) <= {"calc", "api"}
+    for stats in report["endpoints"].values():
+        assert stats["requests"] > 0
+        assert stats["error_rate"] == 0.0
+        assert stats["p50_ms"] <= stats["p99_ms"] <= stats["max_ms"]
+
+
+def test_wait_until_ready_needs_consecutive_successes(monkeypatch):
+    """Test that a 503 from a still-warming worker resets the readiness streak"""
+    statuses = iter([503, 200, 503, 200, 200, 500])
+    calls = []
+
+    def fake_get(url, timeout):
+        calls.append(url)
+        return httpx.Response(next(statuses))
+
+    monkeypatch.setattr(loadtest.httpx, "get", fake_get)
+    monkeypatch.setattr(loadtest.time, "sleep", lambda seconds: None)
+    loadtest._wait_until_up("http://app/ready", successes=2)
+
+    assert len(calls) == 5
@@ -0,0 +1,55 @@
+"""Test event loop lag measurement and blocking detection"""
+import asyncio
+import time
+from fastapi.testclient import TestClient
+from app.main import create_app
+from app.services.loop_monitor import LoopMonitor, LagHistogram
+
+
+def test_lag_histogram_quantiles():
+    """Test bucket counts and quantile estimates"""
+    histogram = LagHistogram(buckets_ms=(1, 10, 100))
+    for value in (0.5, 0.5, 5, 50, 500):
+        histogram.observe(value)
+
+    snapshot = histogram.snapshot()
+    assert snapshot["count"] == 5
+    assert snapshot["buckets"] == {"le_1": 2, "le_10": 1, "le_100": 1, "le_inf": 1}
+    assert histogram.quantile(0.4) == 1.0
+    assert histogram.quantile(1.0) == 500
+
+
+def blocking_call():
+    """Synchronous work that stalls the event loop"""
+    time.sleep(0.3)
+
+
+def test_monitor_captures_blocking_stack():
+    """Test that a blocking call is detected with its stack and duration"""
+    monitor = LoopMonitor(interval_ms=10, block_threshold_ms=100)
+
+    async def scenario():
+        monitor.start()
+        await asyncio.sleep(0.05)
+        blocking_call()
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+
+    asyncio.run(scenario())
+
+    assert len(monitor.stalls) == 1
+    stall = monitor.stalls[0]
+    assert "blocking_call" in stall["stack"]
+    assert stall["duration_ms"] >= 250
+    assert monitor.histogram.max_ms >= 250
+    assert not monitor.running
+
+
+def test_admin_loop_endpoint():
+    """Test that the lifespan starts the monitor and admin exposes it"""
+    with TestClient(create_app()) as client:
+        response = client.get("/admin/loop")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["running"] is True
+        assert "lag" in data and "stalls" in data
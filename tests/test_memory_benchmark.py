@@ -0,0 +1,28 @@
+"""Test the tracemalloc allocation benchmark helpers"""
+from benchmarks.memory import compare, measure
+
+
+def test_measure_reports_retained_allocations_and_sites():
+    """Test that memory kept by an operation is attributed to its line"""
+    kept = []
+    result = measure(lambda: kept.append(bytearray(4096)), iterations=20, warmup=2)
+
+    assert result["retained_bytes"] >= 4096
+    assert result["peak_bytes"] >= 4096
+    assert __file__ in result["top_sites"][0]["site"]
+
+
+def test_measure_transient_allocations_are_not_retained():
+    """Test that garbage freed within the call only shows up as peak"""
+    result = measure(lambda: bytearray(64 * 1024), iterations=20, warmup=2)
+
+    assert result["peak_bytes"] >= 64 * 1024
+    assert result["retained_bytes"] < 1024
+
+
+def test_compare_flags_growth_beyond_threshold_and_noise_floor():
+    """Test regression detection"""
+    baseline = {"calc_request": {"peak_bytes": 400_000, "retained_bytes": 100, "retained_blocks": 2}}
+    assert compare(baseline, {"calc_request": {"peak_bytes": 420_000, "retained_bytes": 900, "retained_blocks": 9}}, 10.0) == []
+    regressions = compare(baseline, {"calc_request": {"peak_bytes": 500_000, "retained_bytes": 100, "retained_blocks": 2}}, 10.0)
+    assert regressions == ["calc_request.peak_bytes: 400,000 -> 500,000"]
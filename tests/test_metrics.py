@@ -0,0 +1,102 @@
+"""Test metrics collection and the /metrics endpoint"""
+import gc
+import threading
+import pytest
+from fastapi.testclient import TestClient
+from app.main import create_app
+from app.services.metrics import Counter, Histogram, MetricsRegistry
+
+
+@pytest.fixture
+def client():
+    """Create test client"""
+    return TestClient(create_app())
+
+
+def test_counter_sums_thread_shards():
+    """Test that increments from many threads are all collected"""
+    counter = Counter("test_total", "test", ("kind",))
+
+    def work():
+        for _ in range(1000):
+            counter.inc("a")
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    counter.inc("b", amount=2.5)
+
+    assert counter.collect() == {("a",): 4000.0, ("b",): 2.5}
+
+
+def test_dead_thread_shards_are_retired():
+    """Test that exited threads' counts are kept without keeping their shards"""
+    counter = Counter("test_total", "test")
+    histogram = Histogram("test_seconds", "test", buckets=(0.1, 1.0))
+
+    def work():
+        counter.inc()
+        histogram.observe(0.5)
+
+    for _ in range(50):
+        thread = threading.Thread(target=work)
+        thread.start()
+        thread.join()
+    gc.collect()
+
+    assert counter._shards == [] and histogram._shards == []
+    assert counter.collect() == {(): 50.0}
+    assert histogram.collect() == {(): [0, 50, 0, 25.0]}
+
+
+def test_histogram_renders_cumulative_buckets():
+    """Test Prometheus histogram exposition"""
+    registry = MetricsRegistry()
+    histogram = registry.register(Histogram("test_seconds", "test", ("route",), buckets=(0.1, 1.0)))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, "/calc")
+
+    text = registry.render()
+    assert "# TYPE test_seconds histogram" in text
+    assert 'test_seconds_bucket{route="/calc",le="0.1"} 1.0' in text
+    assert 'test_seconds_bucket{route="/calc",le="1.0"} 2.0' in text
+    assert 'test_seconds_bucket{route="/calc",le="+Inf"} 3.0' in text
+    assert 'test_seconds_count{route="/calc"} 3.0' in text
+
+
+def test_metrics_endpoint_reports_stages(client):
+    """Test that a /calc request shows up with per-stage timings"""
+    response = client.post("/calc", data={"annual_salary": 300000, "age": 35})
+    assert response.status_code == 200
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+
+    text = response.text
+    assert 'bleedrate_requests_total{route="/calc",status="200"}' in text
+    for stage in ("parse", "engine_lookup", "engine_run", "render", "gzip", "logging_enqueue"):
+        assert f'bleedrate_stage_seconds_count{{route="/calc",stage="{stage}"}}' in text
+    assert "bleedrate_rates_info{version=" in text
+    assert "bleedrate_logger_queue_depth" in text
+    assert "process_resident_memory_bytes" in text
+
+
+def test_admin_engine_timings(client, monkeypatch):
+    """Test that sampled calculator timings are exposed to admin"""
+    from app.domain.instrumentation import CalculatorTimings
+    from app.services import metrics
+
+    timings = CalculatorTimings(sample_every=1)
+    monkeypatch.setattr(metrics, "calculator_timings", timings)
+    monkeypatch.setattr(metrics, "engine_instrumentation", timings)
+    client.post("/api/calc", json={
+        "personal": {"annual_salary": 240000, "age": 35},
+        "consumption": {}, "transport_property": {}, "investment": {},
+    })
+
+    data = client.get("/admin/engine-timings").json()
+    assert data["enabled"] is True
+    assert data["calculators"]["PAYECalculator"]["count"] == 1
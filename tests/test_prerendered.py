@@ -0,0 +1,71 @@
+"""Tests for pre-rendered, pre-compressed settings-only pages"""
+import gzip
+import pytest
+from fastapi.testclient import TestClient
+from app.config import settings
+from app.main import create_app
+from app.services.compression import negotiate
+from app.views.prerendered import page_cache, settings_fingerprint
+
+
+@pytest.fixture
+def client():
+    return TestClient(create_app())
+
+
+def test_index_served_gzip_with_validators(client):
+    response = client.get("/", headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["etag"].endswith('-gzip"')
+    assert "last-modified" in response.headers
+    assert "BleedRate" in response.text
+
+
+def test_index_identity_matches_template_render(client):
+    response = client.get("/", headers={"Accept-Encoding": "identity"})
+
+    page, _ = page_cache.get("index.html")
+    assert "content-encoding" not in response.headers
+    assert response.content == page.variants["identity"]
+    assert gzip.decompress(page.variants["gzip"]) == page.variants["identity"]
+
+
+def test_conditional_requests_get_304(client):
+    first = client.get("/", headers={"Accept-Encoding": "gzip"})
+
+    by_etag = client.get("/", headers={"If-None-Match": first.headers["etag"]})
+    by_date = client.get("/results", headers={"If-Modified-Since": first.headers["last-modified"]})
+
+    assert by_etag.status_code == 304
+    assert by_etag.content == b""
+    assert by_date.status_code == 304
+    assert client.get("/", headers={"If-None-Match": '"stale"'}).status_code == 200
+
+
+def test_settings_change_rerenders(client, monkeypatch):
+    before = client.get("/").headers["etag"]
+    hits, misses = page_cache.stats()
+    assert client.get("/").headers["etag"] == before
+    assert page_cache.stats() == (hits + 1, misses)
+
+    monkeypatch.setattr(settings, "ENABLE_ADS", not settings.ENABLE_ADS)
+    # The fingerprint is computed once per process
+    assert client.get("/").headers["etag"] == before
+    settings_fingerprint.cache_clear()
+
+    assert client.get("/").headers["etag"] != before
+
+    monkeypatch.undo()
+    settings_fingerprint.cache_clear()
+    assert client.get("/").headers["etag"] == before
+
+
+def test_negotiate_prefers_highest_q_then_server_order():
+    assert negotiate("gzip, br", ("br", "gzip")) == "br"
+    assert negotiate("gzip;q=1, br;q=0.5", ("br", "gzip")) == "gzip"
+    assert negotiate("*", ("br", "gzip")) == "br"
+    assert negotiate("gzip;q=0", ("gzip",)) == "identity"
+    assert negotiate("", ("gzip",)) == "identity"
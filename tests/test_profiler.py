@@ -0,0 +1,81 @@
+"""Test on-demand request profiling"""
+import pytest
+from fastapi.testclient import TestClient
+from app.main import create_app
+from app.services.profiler import SamplingProfiler, request_profiler
+
+
+@pytest.fixture
+def client():
+    """Create test client"""
+    yield TestClient(create_app())
+    request_profiler.disarm()
+
+
+def test_arm_requires_a_bound():
+    """Test that a capture must be limited by requests or seconds"""
+    profiler = SamplingProfiler()
+    with pytest.raises(ValueError):
+        profiler.arm("/calc")
+    with pytest.raises(ValueError):
+        profiler.arm("/calc", requests=0)
+    assert not profiler.armed
+
+
+def test_unarmed_profiler_ignores_requests():
+    """Test that nothing is captured until armed"""
+    profiler = SamplingProfiler()
+    assert not profiler.matches("/calc")
+    assert profiler.status()["samples"] == 0
+
+
+def test_profile_next_requests(client):
+    """Test arming for N requests, capturing them and downloading speedscope"""
+    response = client.post("/admin/profile", params={"route": "/calc", "requests": 2})
+    assert response.status_code == 200
+    assert response.json()["armed"] is True
+
+    # Other routes don't count towards the capture
+    client.get("/health")
+    for salary in (300000, 450000):
+        assert client.post("/calc", data={"annual_salary": salary, "age": 35}).status_code == 200
+
+    status = client.get("/admin/profile").json()
+    assert status["armed"] is False
+    assert status["requests_captured"] == 2
+    assert status["samples"] > 0
+
+    response = client.get("/admin/profile/download")
+    assert response.status_code == 200
+    assert "attachment" in response.headers["content-disposition"]
+    profile = response.json()
+    assert profile["profiles"][0]["type"] == "sampled"
+    frames = profile["shared"]["frames"]
+    for stack in profile["profiles"][0]["samples"]:
+        assert all(0 <= i < len(frames) for i in stack)
+
+
+def test_arm_rejects_invalid_bounds(client):
+    """Test that the admin endpoint validates its arguments"""
+    response = client.post("/admin/profile", params={"route": "/calc", "seconds": 10000})
+    assert response.status_code == 400
+
+
+def test_helper_threads_are_not_sampled(tmp_path):
+    """Test that threads idling in app code (e.g. the trace exporter) stay out of profiles"""
+    from app.services.tracing import JsonlExporter, Span
+
+    exporter = JsonlExporter(tmp_path / "spans.jsonl")
+    exporter.export(Span("0" * 32, None, "start-writer"))
+    exporter.flush()
+    profiler = SamplingProfiler()
+    try:
+        profiler.begin_request()  # this thread now serves the "armed request"
+        profiler._sample()
+    finally:
+        profiler.end_request()
+        exporter.close()
+
+    functions = {frame[0] for stack in profiler._stacks for frame in stack}
+    assert "test_helper_threads_are_not_sampled" in functions
+    assert "_write_loop" not in functions
@@ -0,0 +1,141 @@
+"""Tests for result handles and the server-side result store"""
+import re
+import pytest
+from fastapi.testclient import TestClient
+from app.main import create_app
+from app.services.result_store import ResultStore
+
+INPUTS = {"annual_salary": 500000.0, "age": 40, "litres_petrol_month": 60.0}
+BREAKDOWN = [("PAYE (Income Tax)", 120000.0), ("VAT", 30000.0)]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_same_inputs_same_handle(clock):
+    store = ResultStore(ttl_seconds=60, clock=clock, key=b"secret")
+
+    first = store.put(INPUTS, BREAKDOWN, 150000.0, 500000.0, "2025")
+    again = store.put(dict(INPUTS), BREAKDOWN, 150000.0, 500000.0, "2025")
+    other_rates = store.put(INPUTS, BREAKDOWN, 150000.0, 500000.0, "2026")
+
+    assert re.fullmatch(r"[A-Za-z0-9_-]{12}", first.handle)
+    assert again.handle == first.handle
+    assert other_rates.handle != first.handle
+    assert ResultStore(key=b"other").put(INPUTS, BREAKDOWN, 1.0, 1.0, "2025").handle != first.handle
+
+
+def test_results_expire_and_capacity_is_bounded(clock):
+    store = ResultStore(ttl_seconds=60, capacity=2, clock=clock)
+    old = store.put(INPUTS, BREAKDOWN, 150000.0, 500000.0, "2025")
+
+    clock.now += 30
+    assert store.get(old.handle).effective_rate == pytest.approx(30.0)
+    assert store.get(old.handle).inputs["beer_avg_abv"] == 5.0  # defaults restored
+
+    clock.now += 31
+    assert store.get(old.handle) is None
+
+    handles = [store.put({**INPUTS, "age": age}, BREAKDOWN, 1.0, 1.0, "2025").handle for age in (20, 30, 40)]
+    assert store.get(handles[0]) is None
+    assert store.get(handles[2]) is not None
+    assert store.stats() == (3, 2)
+
+
+def test_sqlite_persistence_survives_restart(tmp_path, clock):
+    path = tmp_path / "results.db"
+    stored = ResultStore(ttl_seconds=60, path=path, clock=clock).put(INPUTS, BREAKDOWN, 150000.0, 500000.0, "2025")
+
+    reopened = ResultStore(ttl_seconds=60, path=path, clock=clock)
+    result = reopened.get(stored.handle)
+
+    assert result.breakdown == tuple(BREAKDOWN)
+    assert result.inputs["litres_petrol_month"] == 60.0
+    assert result.rates_version == "2025"
+    clock.now += 61
+    assert reopened.get(stored.handle) is None
+
+
+def test_put_async_writes_sqlite_off_the_event_loop(tmp_path, clock, monkeypatch):
+    """Test that async callers never run the SQLite write on the loop thread"""
+    import asyncio
+    import threading
+
+    threads = []
+
+    def record_thread(store):
+        put = store.put
+
+        def wrapper(*args):
+            threads.append(threading.get_ident())
+            return put(*args)
+
+        monkeypatch.setattr(store, "put", wrapper)
+        return store
+
+    persistent = record_thread(ResultStore(ttl_seconds=60, path=tmp_path / "results.db", clock=clock))
+    memory = record_thread(ResultStore(ttl_seconds=60, clock=clock))
+
+    async def handler():
+        loop_thread = threading.get_ident()
+        stored = await persistent.put_async(INPUTS, BREAKDOWN, 150000.0, 500000.0, "2025")
+        await memory.put_async(INPUTS, BREAKDOWN, 150000.0, 500000.0, "2025")
+        return loop_thread, stored
+
+    loop_thread, stored = asyncio.run(handler())
+
+    assert threads[0] != loop_thread
+    assert threads[1] == loop_thread  # memory-only stores skip the thread hop
+    assert ResultStore(ttl_seconds=60, path=tmp_path / "results.db", clock=clock).get(stored.handle) is not None
+
+
+def test_calc_handle_serves_export_and_scenario_without_engine(monkeypatch):
+    client = TestClient(create_app())
+    response = client.post("/calc", data={"annual_salary": 333000, "age": 52, "beer_litres_month": 6})
+    handle = re.search(r"/api/results/([A-Za-z0-9_-]{12})/export\.csv", response.text).group(1)
+
+    from app.domain.engine import TaxEngine
+
+    def fail(*args, **kwargs):
+        raise AssertionError("engine should not run")
+
+    monkeypatch.setattr(TaxEngine, "run", fail)
+
+    result = client.get(f"/api/results/{handle}").json()
+    assert result["inputs"]["annual_salary"] == 333000
+    assert result["breakdown"]["Beer Excise"] > 0
+
+    export = client.get(f"/api/results/{handle}/export.csv")
+    assert export.headers["content-type"].startswith("text/csv")
+    assert export.text.splitlines()[0] == "category,annual,monthly,share_percent"
+    assert export.text.splitlines()[-1].startswith(f"Total,{result['total']:.2f}")
+
+    saved = client.post(f"/api/results/{handle}/scenario", json={"label": "Mine"}).json()
+    assert saved["outputs"]["total"] == result["total"]
+    assert client.get("/api/results/AAAAAAAAAAAA").status_code == 404
+
+
+def test_handle_kept_out_of_fragment_cache_key():
+    """Test that different inputs with the same result share one cached fragment"""
+    from app.views.fragments import fragment_cache
+
+    client = TestClient(create_app())
+    base = {"annual_salary": 287000, "age": 33}
+    first = client.post("/calc", data={**base, "beer_avg_abv": 4.5})
+    hits, misses = fragment_cache.stats()
+    # No beer is drunk, so the ABV changes the inputs (and handle) but not the result
+    second = client.post("/calc", data={**base, "beer_avg_abv": 6.0})
+
+    handles = [re.search(r"/api/results/([A-Za-z0-9_-]{12})/", r.text).group(1) for r in (first, second)]
+    assert handles[0] != handles[1]
+    assert fragment_cache.stats() == (hits + 1, misses)
@@ -0,0 +1,116 @@
+"""Test logging duplicate suppression and adaptive sampling"""
+import asyncio
+import pytest
+from app.services.sampling import RotatingBloomFilter, AdaptiveSampler, dedup_key
+from app.services.logger import SubmissionLogger
+
+
+class FakeClock:
+    """Manually advanced monotonic clock"""
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_bloom_filter_detects_repeats():
+    """Test that a key is reported as seen on its second insertion"""
+    bloom = RotatingBloomFilter(capacity=1000)
+    assert bloom.check_and_add("a") is False
+    assert bloom.check_and_add("a") is True
+    assert bloom.check_and_add("b") is False
+
+
+def test_bloom_filter_false_positive_rate():
+    """Test that false positives stay near the configured error rate"""
+    bloom = RotatingBloomFilter(capacity=1000, error_rate=0.01)
+    for i in range(1000):
+        bloom.check_and_add(f"key-{i}")
+    false_positives = sum(bloom.check_and_add(f"other-{i}") for i in range(200))
+    assert false_positives < 10
+
+
+def test_bloom_filter_rotation_expires_keys():
+    """Test that keys are forgotten after two windows"""
+    clock = FakeClock()
+    bloom = RotatingBloomFilter(window_seconds=60, clock=clock)
+    bloom.check_and_add("a")
+
+    clock.now = 61  # rotated once: still remembered via previous generation
+    assert bloom.check_and_add("a") is True
+
+    clock.now = 250  # both generations expired
+    assert bloom.check_and_add("a") is False
+
+
+def test_dedup_key_normalises_numbers():
+    """Test that 0 and 0.0 produce the same key"""
+    assert dedup_key("s", {"x": 0, "y": True}) == dedup_key("s", {"x": 0.0, "y": True})
+    assert dedup_key("s", {"x": 1}) != dedup_key("t", {"x": 1})
+
+
+def test_sampler_keeps_everything_below_thresholds():
+    """Test that sampling is a no-op when there is no pressure"""
+    sampler = AdaptiveSampler(queue_threshold=10, lag_provider=lambda: 5.0)
+    assert sampler.sample(queue_depth=3) == (True, 1.0)
+
+
+def test_sampler_sheds_load_under_pressure():
+    """Test that rate and weight follow the worst pressure ratio"""
+    sampler = AdaptiveSampler(queue_threshold=10, lag_threshold_ms=100, min_rate=0.1, rng=lambda: 0.0)
+    assert sampler.rate(queue_depth=40) == pytest.approx(0.25)
+    assert sampler.sample(queue_depth=40) == (True, pytest.approx(4.0))
+
+    sampler.lag_provider = lambda: 2000.0
+    assert sampler.rate(queue_depth=0) == pytest.approx(0.1)
+
+
+def test_logger_enqueue_dedups_and_weights(monkeypatch):
+    """Test that re-submits are counted but only logged once"""
+    submission_logger = SubmissionLogger()
+    submission_logger.enabled = True
+    submission_logger.client = object()
+    logged = []
+
+    async def fake_log_submission(form_data, results, request_data, sample_weight=1.0):
+        logged.append(sample_weight)
+        return True
+
+    monkeypatch.setattr(submission_logger, "log_submission", fake_log_submission)
+
+    async def submit_twice():
+        request_data = {"session_id": "abc"}
+        submission_logger.enqueue({"annual_salary": 1}, {}, request_data)
+        submission_logger.enqueue({"annual_salary": 1.0}, {}, request_data)
+        await asyncio.gather(*submission_logger._pending)
+
+    asyncio.run(submit_twice())
+    assert logged == [1.0]
+    assert submission_logger.counters["duplicates"] == 1
+    assert submission_logger.queue_depth == 0
+
+
+def test_calc_dedup_key_covers_every_input(monkeypatch):
+    """Test that /calc submits differing only in rarely-changed fields aren't duplicates"""
+    from fastapi.testclient import TestClient
+    from app.main import create_app
+    from app.services import logger as logger_module
+
+    monkeypatch.setattr(logger_module.submission_logger, "enabled", True)
+    monkeypatch.setattr(logger_module.submission_logger, "client", object())
+    monkeypatch.setattr(logger_module.submission_logger, "dedup", RotatingBloomFilter())
+    monkeypatch.setattr(logger_module.submission_logger, "counters", {"received": 0, "duplicates": 0, "sampled_out": 0, "enqueued": 0})
+    monkeypatch.setattr(logger_module.submission_logger.sampler, "sample", lambda depth: (False, 1.0))
+    keys = []
+    monkeypatch.setattr(logger_module, "dedup_key", lambda *args: keys.append(dedup_key(*args)) or keys[-1])
+
+    client = TestClient(create_app())
+    base = {"annual_salary": 300000, "age": 35, "session_id": "same", "beer_litres_month": 5}
+    variants = [{}, {"retirement_contrib": 20000}, {"beer_avg_abv": 6}, {"imported_goods_avg_duty_rate": 0.205}, {}]
+    for extra in variants:
+        client.post("/calc", data={**base, **extra})
+
+    assert len(set(keys)) == 4
+    assert keys[0] == keys[-1]
+    assert logger_module.submission_logger.counters["duplicates"] == 1
@@ -0,0 +1,66 @@
+"""Tests for the server-rendered saved scenario page"""
+import json
+import re
+import pytest
+from fastapi.testclient import TestClient
+from app.main import create_app
+from app.views.fragments import fragment_cache
+from app.views.pages import compact_json, scenario_chart_data
+
+OUTPUTS = {
+    "breakdown": {"VAT": 24000.0, "PAYE (Income Tax)": 96000.0, "UIF": 0.0},
+    "total": 120000.0,
+    "effective_rate_vs_gross": 24.0,
+    "monthly_total": 10000.0,
+}
+
+
+@pytest.fixture
+def client():
+    return TestClient(create_app())
+
+
+def test_chart_data_series():
+    data = scenario_chart_data(OUTPUTS)
+
+    assert data == {
+        "labels": ["PAYE (Income Tax)", "VAT"],
+        "annual": [96000.0, 24000.0],
+        "monthly": [8000.0, 2000.0],
+        "share": [80.0, 20.0],
+    }
+    assert str(compact_json({"label": "</script>"})) == '{"label":"\\u003c/script\\u003e"}'
+
+
+def test_scenario_page_renders_from_cache_without_engine(client, monkeypatch):
+    saved = client.post("/api/scenario", json={
+        "label": "Cached <scenario>",
+        "calc_request": {
+            "personal": {"annual_salary": 400000, "age": 35},
+            "consumption": {}, "transport_property": {}, "investment": {},
+        },
+        "calc_response": OUTPUTS,
+    }).json()
+
+    from app.domain.engine import TaxEngine
+
+    def fail(*args, **kwargs):
+        raise AssertionError("engine should not run")
+
+    monkeypatch.setattr(TaxEngine, "run", fail)
+    hits, misses = fragment_cache.stats()
+
+    first = client.get(f"/results/{saved['id']}")
+    second = client.get(f"/results/{saved['id']}")
+
+    assert first.status_code == 200
+    assert second.text == first.text
+    assert fragment_cache.stats() == (hits + 1, misses + 1)
+    assert "Cached &lt;scenario&gt;" in first.text
+    embedded = re.search(r'id="scenario-chart-data">(.*?)</script>', first.text).group(1)
+    assert json.loads(embedded) == scenario_chart_data(OUTPUTS)
+
+
+def test_unknown_scenario_is_404(client):
+    assert client.get("/results/00000000-0000-0000-0000-000000000000").status_code == 404
+    assert client.get("/results").status_code == 200
@@ -0,0 +1,159 @@
+"""Test compact submission encoding and decoding"""
+import json
+import pytest
+from pathlib import Path
+from app.domain.rates import TaxRates
+from app.domain.engine import TaxEngine
+from app.domain.profiles import build_profiles
+from app.domain.categories import CATEGORY_CODES, CATEGORY_NAMES
+from app.services.submission_codec import (
+    encode_inputs,
+    encode_results,
+    decode_submission,
+    INPUT_DEFAULTS,
+)
+
+
+@pytest.fixture
+def engine():
+    """Create tax engine"""
+    rates_path = Path(__file__).parent.parent / "data" / "tax_rates.yml"
+    return TaxEngine(TaxRates.load_from_yaml(rates_path))
+
+
+@pytest.fixture
+def form_data():
+    """Form inputs as built by the /calc view (mostly defaults)"""
+    data = {key: value for key, value in INPUT_DEFAULTS.items() if value is not None}
+    data.update({
+        "annual_salary": 480000.0,
+        "age": 42,
+        "std_vat_spend_month": 12000.0,
+        "litres_petrol_month": 80.0,
+        "vehicle_is_imported": False,
+    })
+    return data
+
+
+def _logged_row(form_data, engine, store_breakdown):
+    """Build a row the way SubmissionLogger stores it"""
+    breakdown, total = engine.run(*build_profiles(form_data))
+    gross = form_data["annual_salary"]
+    results = {
+        "total_annual": total,
+        "percentage": total / gross * 100,
+        "breakdown": breakdown,
+        "rates_version": engine.rates.version,
+    }
+    return {
+        "annual_salary": int(form_data["annual_salary"]),
+        "total_to_govt": total,
+        "effective_rate": results["percentage"],
+        "form_data": encode_inputs(form_data),
+        "results": encode_results(results, store_breakdown),
+    }
+
+
+def test_category_codes_are_unique():
+    """Test that no two categories share a code"""
+    assert len(CATEGORY_NAMES) == len(CATEGORY_CODES)
+
+
+def test_encode_inputs_drops_defaults(form_data):
+    """Test that only non-default inputs are stored"""
+    encoded = encode_inputs(form_data)
+    assert set(encoded) == {"_enc", "age", "std_vat_spend_month", "litres_petrol_month"}
+
+
+def test_encode_inputs_keeps_fractional_salary():
+    """Test that salaries the INTEGER column can't hold stay in the payload"""
+    assert encode_inputs({"annual_salary": 250000.5})["annual_salary"] == 250000.5
+
+
+def test_encoded_payload_is_smaller(form_data, engine):
+    """Test that the encoded row is much smaller than the legacy one"""
+    row = _logged_row(form_data, engine, store_breakdown=True)
+    breakdown, total = engine.run(*build_profiles(form_data))
+    legacy = json.dumps({"form_data": form_data, "results": {"breakdown": breakdown, "total_annual": total}})
+    compact = json.dumps({"form_data": row["form_data"], "results": row["results"]})
+    assert len(compact) < len(legacy) / 2
+
+
+def test_decode_stored_breakdown(form_data, engine):
+    """Test round trip with the breakdown stored by category code"""
+    row = _logged_row(form_data, engine, store_breakdown=True)
+    decoded = decode_submission(row)
+
+    assert decoded["form_data"]["annual_salary"] == 480000
+    assert decoded["form_data"]["age"] == 42
+    assert decoded["form_data"]["beer_avg_abv"] == 5.0
+    assert decoded["results"]["breakdown"]["VAT"] == pytest.approx(12000 * 0.15 * 12, abs=0.01)
+
+
+def test_decode_recomputes_breakdown(form_data, engine):
+    """Test that missing breakdowns are recomputed when the rates version matches"""
+    row = _logged_row(form_data, engine, store_breakdown=False)
+    assert "b" not in row["results"]
+
+    decoded = decode_submission(row, engine)
+    breakdown, total = engine.run(*build_profiles(form_data))
+    assert decoded["results"]["breakdown"] == pytest.approx(breakdown)
+    assert decoded["results"]["total_annual"] == pytest.approx(total)
+
+
+def test_decode_without_matching_rates(form_data, engine):
+    """Test that a stale rates version leaves the breakdown unknown"""
+    row = _logged_row(form_data, engine, store_breakdown=False)
+    row["results"]["rv"] = "stale"
+
+    decoded = decode_submission(row, engine)
+    assert decoded["results"]["breakdown"] is None
+    assert decoded["results"]["total_annual"] == pytest.approx(row["total_to_govt"])
+
+
+def test_decode_legacy_row():
+    """Test that rows written before the compact encoding pass through"""
+    row = {"form_data": {"annual_salary": 100000}, "results": {"total_annual": 9000}}
+    decoded = decode_submission(row)
+    assert decoded == {"form_data": row["form_data"], "results": row["results"]}
+
+
+def test_decode_skips_recompute_for_partial_v1_rows(form_data, engine):
+    """Test that rows logged before every field was captured aren't recomputed"""
+    row = _logged_row(form_data, engine, store_breakdown=False)
+    row["form_data"]["_enc"] = 1
+
+    decoded = decode_submission(row, engine)
+    assert decoded["results"]["breakdown"] is None
+    assert decoded["results"]["total_annual"] == pytest.approx(row["total_to_govt"])
+
+
+def test_calc_logged_row_round_trips(engine, monkeypatch):
+    """Test that a row logged by /calc recomputes to the total it showed"""
+    from fastapi.testclient import TestClient
+    from app.main import create_app
+    from app.services.logger import submission_logger
+
+    captured = {}
+
+    def enqueue(form_data, results, request_data):
+        captured.update(form_data=form_data, results=results)
+        return True
+
+    monkeypatch.setattr(submission_logger, "enqueue", enqueue)
+    response = TestClient(create_app()).post("/calc", data={
+        "annual_salary": 520000, "age": 44, "retirement_contrib": 60000,
+        "beer_litres_month": 10, "beer_avg_abv": 7.5, "wine_litres_month": 4, "wine_avg_abv": 14,
+        "spirits_litres_month": 1, "spirits_avg_abv": 40, "cigarette_packs_20_month": 10,
+        "cigarette_avg_price_per_pack": 60, "tyres_purchased_per_year": 4, "tyre_avg_weight_kg": 12,
+        "monthly_imported_goods_spend": 2000, "imported_goods_avg_duty_rate": 0.3,
+    })
+    assert response.status_code == 200
+
+    row = submission_logger.build_submission(captured["form_data"], captured["results"], {}, None)
+    assert "b" not in row["results"]
+    decoded = decode_submission(row, engine)
+
+    assert decoded["results"]["total_annual"] == pytest.approx(captured["results"]["total_annual"])
+    assert decoded["form_data"]["beer_avg_abv"] == 7.5
+    assert decoded["form_data"]["retirement_contrib"] == 60000
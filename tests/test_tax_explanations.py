@@ -0,0 +1,43 @@
+"""Tests for the tax explanation tooltips served as a static asset"""
+import json
+import pytest
+from fastapi.testclient import TestClient
+from app.config import settings
+from app.domain.categories import CATEGORY_CODES
+from app.main import create_app
+from app.services.assets import build
+
+EXPLANATIONS_PATH = settings.STATIC_DIR / "data" / "tax_explanations.json"
+
+
+@pytest.fixture
+def explanations():
+    return json.loads(EXPLANATIONS_PATH.read_text())
+
+
+def test_every_category_has_an_explanation(explanations):
+    assert explanations["fallback"]
+    assert set(explanations["explanations"]) == set(CATEGORY_CODES.values())
+    assert all(text.strip() for text in explanations["explanations"].values())
+
+
+def test_breakdown_fragment_carries_codes_not_text(explanations):
+    client = TestClient(create_app())
+    response = client.post("/calc", data={"annual_salary": 300000, "age": 35, "litres_petrol_month": 80})
+
+    assert response.status_code == 200
+    assert 'data-tax-explanation="paye"' in response.text
+    assert 'data-tax-explanation="fuel"' in response.text
+    for text in explanations["explanations"].values():
+        assert text not in response.text
+
+
+def test_explanations_fingerprinted_with_other_assets(tmp_path):
+    (tmp_path / "data").mkdir()
+    (tmp_path / "data" / "tax_explanations.json").write_bytes(EXPLANATIONS_PATH.read_bytes())
+
+    manifest = build(tmp_path)
+
+    hashed = tmp_path / manifest["data/tax_explanations.json"]
+    assert hashed.name != "tax_explanations.json"
+    assert (hashed.parent / (hashed.name + ".gz")).exists()
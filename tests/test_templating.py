@@ -0,0 +1,27 @@
+"""Tests for the shared Jinja2 environment"""
+from app.api import routes_admin
+from app.views.fragments import fragment_cache
+from app.views.prerendered import page_cache
+from app.views.templating import build_environment, compile_all, templates
+
+
+def test_routers_share_one_environment():
+    assert page_cache.env is templates.env
+    assert fragment_cache.env is templates.env
+    assert routes_admin.templates is templates
+
+
+def test_bytecode_cache_is_written_and_reused(tmp_path):
+    compiled = compile_all(build_environment(str(tmp_path)))
+
+    assert "index.html" in compiled
+    cached = {p.name: p.stat().st_mtime_ns for p in tmp_path.iterdir()}
+    assert len(cached) == len(compiled)
+
+    # A fresh environment (e.g. another worker) loads the bytecode without rewriting it
+    build_environment(str(tmp_path)).get_template("index.html")
+    assert {p.name: p.stat().st_mtime_ns for p in tmp_path.iterdir()} == cached
+
+
+def test_cache_can_be_disabled():
+    assert build_environment("").bytecode_cache is None
@@ -0,0 +1,149 @@
+"""Test in-process tracing"""
+import asyncio
+import json
+import random
+import pytest
+from fastapi.testclient import TestClient
+from app.config import settings
+from app.domain.engine import TaxEngine
+from app.domain.instrumentation import CalculatorTimings
+from app.domain.profiles import PersonalProfile, ConsumptionProfile, TransportAndPropertyProfile, InvestmentProfile
+from app.domain.rates import TaxRates
+from app.main import create_app
+from app.services import metrics
+from app.services.tracing import JsonlExporter, MemoryExporter, Span, Tracer, TracingInstrumentation, tracer
+
+
+@pytest.fixture
+def memory_tracer():
+    """Tracer that samples every trace into memory"""
+    return Tracer(MemoryExporter(), sample_rate=1.0)
+
+
+def test_spans_are_noops_outside_a_trace(memory_tracer):
+    """Test that nothing is recorded without a sampled root span"""
+    with memory_tracer.span("orphan") as span:
+        assert span is None
+    assert memory_tracer.exporter.spans == []
+
+
+def test_head_sampling_and_traceparent():
+    """Test that the root decision is random and a traceparent only supplies ids"""
+    never = Tracer(MemoryExporter(), sample_rate=0.0, rng=random.Random(1))
+    assert never.start_trace("GET /") is None
+
+    trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+    # A client-sent sampled flag must not bypass the sample rate
+    assert never.start_trace("GET /", traceparent=f"00-{trace_id}-00f067aa0ba902b7-01") is None
+
+    always = Tracer(MemoryExporter(), sample_rate=1.0)
+    always.end_trace(always.start_trace("GET /", traceparent=f"00-{trace_id}-00f067aa0ba902b7-00"))
+    root = always.exporter.spans[0]
+    assert root["traceId"] == trace_id
+    assert root["parentSpanId"] == "00f067aa0ba902b7"
+
+
+def test_trusted_upstream_flag_decides_sampling():
+    """Test that TRACE_TRUST_UPSTREAM lets the traceparent flag override the rate"""
+    trusting = Tracer(MemoryExporter(), sample_rate=0.0, rng=random.Random(1), trust_upstream=True)
+    trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+
+    started = trusting.start_trace("GET /", traceparent=f"00-{trace_id}-00f067aa0ba902b7-01")
+    assert started is not None
+    trusting.end_trace(started)
+    assert trusting.start_trace("GET /", traceparent=f"00-{trace_id}-00f067aa0ba902b7-00") is None
+    assert trusting.start_trace("GET /") is None
+
+
+def test_jsonl_exporter_drops_when_queue_full(tmp_path):
+    """Test that spans beyond the queue bound are dropped and counted"""
+    exporter = JsonlExporter(tmp_path / "spans.jsonl", max_queue=2)
+    exporter._thread = object()  # writer not running, so nothing drains the queue
+    for _ in range(5):
+        exporter.export(Span("0" * 32, None, "x"))
+
+    assert exporter._queue.qsize() == 2
+    assert exporter.dropped == 3
+
+
+def test_jsonl_exporter_rotates_file(tmp_path):
+    """Test that the span file is rotated to .1 once it passes max_bytes"""
+    exporter = JsonlExporter(tmp_path / "spans.jsonl", max_bytes=1000)
+    for i in range(40):
+        exporter.export(Span("0" * 32, None, f"span.{i}"))
+    exporter.flush()
+    exporter.close()
+
+    rotated = tmp_path / "spans.jsonl.1"
+    assert rotated.exists()
+    assert exporter.path.stat().st_size < 1000 + 500
+    names = [json.loads(line)["name"] for f in (rotated, exporter.path) for line in f.read_text().splitlines()]
+    assert names[-1] == "span.39"
+    assert len(names) < 40  # older rotations are discarded
+
+
+def test_spans_propagate_to_background_tasks(memory_tracer):
+    """Test that a task created inside a span joins the same trace"""
+    async def background():
+        await asyncio.sleep(0)
+        with memory_tracer.span("background.step"):
+            pass
+
+    async def handler():
+        started = memory_tracer.start_trace("POST /calc")
+        with memory_tracer.span("enqueue"):
+            task = asyncio.create_task(background())
+        memory_tracer.end_trace(started)
+        await task
+
+    asyncio.run(handler())
+    spans = {s["name"]: s for s in memory_tracer.exporter.spans}
+    assert spans["background.step"]["traceId"] == spans["POST /calc"]["traceId"]
+    assert spans["background.step"]["parentSpanId"] == spans["enqueue"]["spanId"]
+
+
+def test_engine_emits_calculator_spans(memory_tracer):
+    """Test per-calculator spans without disturbing timing sampling"""
+    timings = CalculatorTimings(sample_every=1000)
+    timings.should_sample()  # consume the first (sampled) run
+    engine = TaxEngine(
+        TaxRates.load_from_yaml(settings.TAX_RATES_PATH),
+        instrumentation=TracingInstrumentation(memory_tracer, timings),
+    )
+    profiles = (PersonalProfile(annual_salary=300000, age=35), ConsumptionProfile(),
+                TransportAndPropertyProfile(), InvestmentProfile())
+
+    engine.run(*profiles)  # not traced, not timed
+    assert memory_tracer.exporter.spans == []
+
+    started = memory_tracer.start_trace("run")
+    engine.run(*profiles)
+    memory_tracer.end_trace(started)
+
+    names = [s["name"] for s in memory_tracer.exporter.spans]
+    assert "calculator.PAYECalculator" in names
+    assert "calculator.MunicipalServicesCalculator" in names
+    assert timings.summary() == {}
+
+
+def test_calc_request_trace(monkeypatch, tmp_path):
+    """Test that a /calc request is traced end to end into a JSON lines file"""
+    exporter = JsonlExporter(tmp_path / "spans.jsonl")
+    monkeypatch.setattr(tracer, "exporter", exporter)
+    monkeypatch.setattr(tracer, "sample_rate", 1.0)
+    monkeypatch.setattr(metrics, "engine_instrumentation", TracingInstrumentation(tracer))
+
+    client = TestClient(create_app())
+    assert client.post("/calc", data={"annual_salary": 300000, "age": 35}).status_code == 200
+    exporter.flush()
+    exporter.close()
+
+    spans = [json.loads(line) for line in exporter.path.read_text().splitlines()]
+    by_name = {s["name"]: s for s in spans}
+    root = by_name["POST /calc"]
+    assert root["attributes"]["http.status_code"] == 200
+    assert {s["traceId"] for s in spans} == {root["traceId"]}
+    for name in ("view.calculate", "stage.engine_lookup", "stage.engine_run", "stage.render",
+                 "calculator.PAYECalculator"):
+        assert name in by_name
+    assert by_name["calculator.PAYECalculator"]["parentSpanId"] == by_name["stage.engine_run"]["spanId"]
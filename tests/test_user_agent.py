@@ -0,0 +1,81 @@
+"""Test user agent classification"""
+import pytest
+from app.services.user_agent import classify_user_agent
+
+
+CHROME_WINDOWS = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+)
+EDGE_WINDOWS = CHROME_WINDOWS + " Edg/120.0.2210.91"
+SAFARI_IPHONE = (
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_1_2 like Mac OS X) AppleWebKit/605.1.15 "
+    "(KHTML, like Gecko) Version/17.1 Mobile/15E148 Safari/604.1"
+)
+SAFARI_IPAD = (
+    "Mozilla/5.0 (iPad; CPU OS 16_6 like Mac OS X) AppleWebKit/605.1.15 "
+    "(KHTML, like Gecko) Version/16.6 Mobile/15E148 Safari/604.1"
+)
+CHROME_ANDROID_PHONE = (
+    "Mozilla/5.0 (Linux; Android 14; Pixel 8) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0.6099.144 Mobile Safari/537.36"
+)
+CHROME_ANDROID_TABLET = (
+    "Mozilla/5.0 (Linux; Android 13; SM-X700) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36"
+)
+SAMSUNG_ANDROID = (
+    "Mozilla/5.0 (Linux; Android 13; SM-S911B) AppleWebKit/537.36 (KHTML, like Gecko) "
+    "SamsungBrowser/23.0 Chrome/115.0.0.0 Mobile Safari/537.36"
+)
+SAFARI_MAC = (
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 "
+    "(KHTML, like Gecko) Version/17.2 Safari/605.1.15"
+)
+FIREFOX_LINUX = "Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:121.0) Gecko/20100101 Firefox/121.0"
+CHROME_IOS = (
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_2 like Mac OS X) AppleWebKit/605.1.15 "
+    "(KHTML, like Gecko) CriOS/120.0.6099.119 Mobile/15E148 Safari/604.1"
+)
+
+
+@pytest.mark.parametrize("ua, expected", [
+    (CHROME_WINDOWS, ("Chrome", "120.0.0.0", "Windows", "10.0", "desktop")),
+    (EDGE_WINDOWS, ("Edge", "120.0.2210.91", "Windows", "10.0", "desktop")),
+    (SAFARI_IPHONE, ("Safari", "17.1", "iOS", "17.1.2", "mobile")),
+    (SAFARI_IPAD, ("Safari", "16.6", "iOS", "16.6", "tablet")),
+    (CHROME_ANDROID_PHONE, ("Chrome", "120.0.6099.144", "Android", "14", "mobile")),
+    (CHROME_ANDROID_TABLET, ("Chrome", "119.0.0.0", "Android", "13", "tablet")),
+    (SAMSUNG_ANDROID, ("Samsung Internet", "23.0", "Android", "13", "mobile")),
+    (SAFARI_MAC, ("Safari", "17.2", "macOS", "10.15.7", "desktop")),
+    (FIREFOX_LINUX, ("Firefox", "121.0", "Linux", None, "desktop")),
+    (CHROME_IOS, ("Chrome", "120.0.6099.119", "iOS", "17.2", "mobile")),
+])
+def test_classify_user_agent(ua, expected):
+    """Test browser, OS and device classification for common user agents"""
+    info = classify_user_agent(ua)
+    assert (info.browser, info.browser_version, info.os, info.os_version, info.device_type) == expected
+
+
+def test_classify_unknown_user_agent():
+    """Test that unrecognised user agents fall back to Other/desktop"""
+    info = classify_user_agent("curl/8.4.0")
+    assert info.browser == "Other"
+    assert info.os == "Other"
+    assert info.browser_version is None
+    assert info.device_type == "desktop"
+
+
+def test_classifier_is_cached():
+    """Test that repeated user agents are served from the LRU cache"""
+    classify_user_agent.cache_clear()
+    classify_user_agent(CHROME_WINDOWS)
+    classify_user_agent(CHROME_WINDOWS)
+    assert classify_user_agent.cache_info().hits == 1
+
+
+def test_as_dict_returns_fresh_copy():
+    """Test that callers can't mutate the cached classification"""
+    data = classify_user_agent(SAFARI_IPHONE).as_dict()
+    data["browser"] = "Mutated"
+    assert classify_user_agent(SAFARI_IPHONE).browser == "Safari"
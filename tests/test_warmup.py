@@ -0,0 +1,58 @@
+"""Tests for startup warmup, /ready and the rates cache"""
+import time
+from fastapi.testclient import TestClient
+from app.config import settings
+from app.main import create_app
+from app.services.rates_cache import RatesCache
+from app.services.warmup import Warmup
+
+
+def test_ready_is_503_until_warmup_runs():
+    client = TestClient(create_app())
+
+    response = client.get("/ready")
+
+    assert response.status_code == 503
+    assert response.json()["status"] == "warming"
+    assert client.get("/health").status_code == 200
+
+
+def test_ready_after_lifespan_warmup():
+    with TestClient(create_app()) as client:
+        deadline = time.monotonic() + 10
+        while (response := client.get("/ready")).status_code != 200 and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["status"] == "ready"
+        assert set(body["steps_ms"]) == {"rates", "templates", "pages", "canary"}
+
+
+def test_failed_step_keeps_instance_not_ready():
+    warmup = Warmup()
+
+    def broken():
+        raise RuntimeError("no rates")
+
+    assert warmup.run([("ok", lambda: None), ("rates", broken)]) is False
+    assert not warmup.ready
+    assert warmup.status()["status"] == "failed"
+    assert warmup.status()["error"] == "rates: RuntimeError: no rates"
+
+
+def test_rates_cache_reloads_when_file_changes(tmp_path):
+    path = tmp_path / "tax_rates.yml"
+    original = settings.TAX_RATES_PATH.read_text()
+    path.write_text(original)
+    cache = RatesCache(path)
+
+    first, hit = cache.get()
+    assert not hit
+    assert cache.get() == (first, True)
+
+    path.write_text(original + "\n# edited\n")
+    reloaded, hit = cache.get()
+    assert not hit
+    assert reloaded.version != first.version
+    assert cache.stats() == (1, 2)